@@ -0,0 +1,350 @@
+# api_server.py —— 本機 JSON API（asyncio，不載入 streamlit）：供 CRM 直接呼叫遺產稅／保單贈與試算
+#
+# 用法：
+#   python api_server.py [--host 127.0.0.1] [--port 8765] [--secrets .streamlit/secrets.toml]
+#
+# 端點（JSON in / JSON out；除 /v1/health、/v1/login 外需 Authorization: Bearer <token>）：
+#   GET  /v1/health
+#   POST /v1/login          {"username", "password"} → {"token", "expires_in", "name"}
+#   POST /v1/estate         單戶遺產稅（萬）：total_assets, spouse, adult_children, other_dependents,
+#                           disabled_people, parents[, year]
+#   POST /v1/estate/batch   多戶遺產稅：同上欄位，各欄為等長陣列或純量（total_assets 必填）
+#   POST /v1/cvgift         保單 vs. 現金贈與（元）：premiums, cash_values[, change_year, year]
+#
+# 帳號與 App 共用 secrets.toml 的 [users.*]（bcrypt 雜湊、有效期間、節流規則皆相同）；
+# 登入成功後發給 token，之後的請求不再跑 bcrypt。HTTP/1.1 keep-alive，同一連線可 pipeline，依序回應。
+import argparse, asyncio, json, os, secrets, sys, time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from modules.auth import UserIndex, account_window_error, authenticate
+from modules.taxcore.cache import CachedEstateTaxCalculator
+from modules.taxcore.estate import TaxConstants
+from modules.taxcore.rules import TaxRules, get_rules
+from modules.taxcore.schedule import GiftSchedule
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_SECRETS = BASE_DIR / ".streamlit" / "secrets.toml"
+TOKEN_TTL = 8 * 60 * 60        # 秒
+IDLE_TIMEOUT = 30.0            # keep-alive 連線閒置上限（秒）
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 16 * 1024 * 1024
+READ_CHUNK = 64 * 1024
+MAX_BATCH_ROWS = 200_000
+OFFLOAD_BYTES = 256 * 1024     # 超過此大小的批次請求改在執行緒計算，不卡住其他連線
+
+REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           501: "Not Implemented"}
+ESTATE_FIELDS = ("spouse", "adult_children", "other_dependents", "disabled_people", "parents")
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def load_users(path) -> Dict[str, Any]:
+    """讀取 secrets.toml 的 [users.*]（與 st.secrets 相同格式）。"""
+    try:
+        import tomllib
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    except ImportError:            # Python < 3.11：streamlit 依賴的 toml 套件
+        import toml
+        data = toml.load(path)
+    return dict(data.get("users", {}))
+
+# ------------------------- 計算 -------------------------
+@lru_cache(maxsize=16)
+def _calculator(rules: TaxRules) -> CachedEstateTaxCalculator:
+    return CachedEstateTaxCalculator(TaxConstants.from_rules(rules), rule_version=rules.version)
+
+def _rules(body: Dict[str, Any]) -> TaxRules:
+    year = body.get("year")
+    try:
+        return get_rules(None if year is None else int(year))
+    except (TypeError, ValueError):
+        raise ApiError(400, "year 必須為整數") from None
+    except KeyError as e:
+        raise ApiError(400, e.args[0]) from None
+
+def _count(body: Dict[str, Any], name: str) -> int:
+    v = int(body.get(name, 0) or 0)
+    if v < 0:
+        raise ApiError(400, f"{name} 不可為負數")
+    return v
+
+def _flag(value: Any, name: str) -> bool:
+    """JSON 布林值（或 0／1）；"false" 等字串一律 400，避免非空字串被當成 True。"""
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    raise ApiError(400, f"{name} 必須為 true 或 false")
+
+def estate_single(body: Dict[str, Any]) -> Dict[str, Any]:
+    calc = _calculator(_rules(body))
+    total = float(body["total_assets"])
+    if total < 0:
+        raise ApiError(400, "total_assets 不可為負數")
+    taxable, tax, deductions = calc.calculate_estate_tax(
+        total, _flag(body.get("spouse", False), "spouse"), *(_count(body, f) for f in ESTATE_FIELDS[1:])
+    )
+    return {"rule_version": calc.rule_version, "taxable_amount": taxable, "estate_tax": tax,
+            "deductions": deductions}
+
+def estate_batch(body: Dict[str, Any]) -> Dict[str, Any]:
+    import numpy as np
+    calc = _calculator(_rules(body))
+    total = np.asarray(body["total_assets"], dtype=float)
+    if total.ndim != 1:
+        raise ApiError(400, "total_assets 必須為陣列")
+    if len(total) > MAX_BATCH_ROWS:
+        raise ApiError(413, f"單次最多 {MAX_BATCH_ROWS:,} 筆")
+    cols = []
+    for name in ESTATE_FIELDS:
+        if name == "spouse":
+            col = np.asarray(body.get(name, False))
+            if col.dtype != bool and not (col.dtype.kind in "iu" and np.isin(col, (0, 1)).all()):
+                raise ApiError(400, "spouse 必須為 true 或 false")
+            col = col.astype(bool)
+        else:
+            col = np.asarray(body.get(name, 0), dtype=np.int64)
+        if col.ndim and len(col) != len(total):
+            raise ApiError(400, f"{name} 長度必須與 total_assets 相同")
+        cols.append(col)
+    if (total < 0).any() or any((c < 0).any() for c in cols[1:]):
+        raise ApiError(400, "欄位不可為負數")
+    taxable, tax, deductions = calc.calculate_estate_tax_batch(total, *cols)
+    return {"rule_version": calc.rule_version, "rows": len(total), "taxable_amount": taxable.tolist(),
+            "estate_tax": tax.tolist(), "deductions": deductions.tolist()}
+
+def cvgift(body: Dict[str, Any]) -> Dict[str, Any]:
+    """與 run_cvgift 相同：保價金不得超過累計保費，變更年度超過年期時取最後一年。"""
+    import numpy as np
+    premiums = np.asarray(body["premiums"], dtype=np.int64)
+    cash_values = np.asarray(body["cash_values"], dtype=np.int64)
+    if premiums.ndim != 1 or premiums.shape != cash_values.shape:
+        raise ApiError(400, "premiums 與 cash_values 必須為等長陣列")
+    if (premiums < 0).any() or (cash_values < 0).any():
+        raise ApiError(400, "金額不可為負數")
+    cash_values = np.minimum(cash_values, np.cumsum(premiums))
+    change_year = min(int(body.get("change_year", 1)), len(premiums))
+    try:
+        schedule = GiftSchedule(premiums, cash_values, change_year, _rules(body))
+    except ValueError as e:
+        raise ApiError(400, str(e)) from None
+    policy = schedule.policy_gift()
+    cash_tax = schedule.cash_gift_tax()
+    years, cash = schedule.years_table(), schedule.cash_gift_table()
+    return {
+        "rule_version": schedule.rules.version, "change_year": schedule.change_year,
+        "nominal_transfer": schedule.nominal_transfer(),
+        "policy": policy, "cash_gift_tax": cash_tax, "tax_saving": cash_tax - policy["tax"],
+        "years": {"year": years["年度"].tolist(), "premium": years["每年投入（元）"].tolist(),
+                  "cumulative": years["累計投入（元）"].tolist(), "cash_value": years["年末現金價值（元）"].tolist()},
+        "cash_gifts": {"year": cash["年度"].tolist(), "gift": cash["現金贈與（元）"].tolist(),
+                       "net": cash["免稅後淨額（元）"].tolist(), "tax": cash["應納贈與稅（元）"].tolist(),
+                       "rate": list(cash["適用稅率"])},
+    }
+
+# ------------------------- 認證 -------------------------
+class TokenStore:
+    """登入後發放的 bearer token（只在事件迴圈執行緒存取，不需加鎖）。"""
+    def __init__(self, ttl: float = TOKEN_TTL):
+        self.ttl = ttl
+        self._tokens: Dict[str, Tuple[str, float]] = {}   # token -> (帳號鍵, 到期 monotonic)
+
+    def issue(self, key: str) -> str:
+        now = time.monotonic()
+        if len(self._tokens) > 1024:
+            self._tokens = {t: v for t, v in self._tokens.items() if v[1] > now}
+        token = secrets.token_urlsafe(32)
+        self._tokens[token] = (key, now + self.ttl)
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        entry = self._tokens.get(token)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._tokens[token]
+            return None
+        return entry[0]
+
+# ------------------------- HTTP -------------------------
+def _response(status: int, payload: Dict[str, Any], keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\nContent-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode() + body
+
+def _parse_request(buf: bytearray):
+    """自緩衝區取出一個完整請求 (method, target, version, headers, body)；資料不足時回傳 None。"""
+    end = buf.find(b"\r\n\r\n")
+    if end < 0:
+        if len(buf) > MAX_HEADER_BYTES:
+            raise ApiError(431, "標頭過長")
+        return None
+    try:
+        request_line, *lines = buf[:end].decode("latin-1").split("\r\n")
+        method, target, version = request_line.split(" ", 2)
+        headers = {k.strip().lower(): v.strip() for k, v in (l.split(":", 1) for l in lines if l)}
+    except ValueError:
+        raise ApiError(400, "無法解析的 HTTP 請求") from None
+    raw_length = headers.get("content-length", "")
+    if raw_length and not (raw_length.isascii() and raw_length.isdigit()):   # 負數、"+5"、"1_000" 一律拒絕
+        raise ApiError(400, "Content-Length 必須為非負整數")
+    length = int(raw_length or 0)
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise ApiError(501, "不支援 chunked，請提供 Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, "請求內容過大")
+    start = end + 4
+    if len(buf) < start + length:
+        return None
+    body = bytes(buf[start:start + length])
+    del buf[:start + length]
+    return method, target, version, headers, body
+
+class ApiServer:
+    def __init__(self, users: Dict[str, Any], host: str = "127.0.0.1", port: int = 8765,
+                 token_ttl: float = TOKEN_TTL):
+        self.index = UserIndex(users)     # users 在啟動時載入一次，索引不再變動
+        self.host, self.port = host, port
+        self.tokens = TokenStore(token_ttl)
+        self.requests = 0
+        # 路徑 -> (方法, 處理函式, 是否需 token, 是否在執行緒計算)
+        self.routes: Dict[str, Tuple[str, Callable, bool, bool]] = {
+            "/v1/health": ("GET", lambda body: {"status": "ok", "requests": self.requests}, False, False),
+            "/v1/estate": ("POST", estate_single, True, False),
+            "/v1/estate/batch": ("POST", estate_batch, True, True),
+            "/v1/cvgift": ("POST", cvgift, True, False),
+        }
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> "ApiServer":
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _login(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        ok, key, info, err = await asyncio.to_thread(
+            authenticate, self.index, str(body.get("username", "")), str(body.get("password", ""))
+        )
+        if not ok:
+            raise ApiError(401, err)
+        window_err = account_window_error(info)
+        if window_err:
+            raise ApiError(401, window_err)
+        return {"token": self.tokens.issue(key), "expires_in": int(self.tokens.ttl), "name": info.get("name", key)}
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], raw: bytes) -> Tuple[int, Dict]:
+        try:
+            if path == "/v1/login":
+                if method != "POST":
+                    raise ApiError(405, "請使用 POST")
+                return 200, await self._login(json.loads(raw or b"{}"))
+            route = self.routes.get(path)
+            if route is None:
+                raise ApiError(404, f"未知的端點：{path}")
+            want, handler, needs_auth, offload = route
+            if method != want:
+                raise ApiError(405, f"請使用 {want}")
+            if needs_auth:
+                auth = headers.get("authorization", "")
+                if not auth.startswith("Bearer ") or self.tokens.resolve(auth[7:].strip()) is None:
+                    raise ApiError(401, "請先登入（Authorization: Bearer <token>）")
+            body = json.loads(raw) if raw else {}
+            if not isinstance(body, dict):
+                raise ApiError(400, "請求內容必須為 JSON 物件")
+            if offload and len(raw) > OFFLOAD_BYTES:
+                return 200, await asyncio.to_thread(handler, body)
+            return 200, handler(body)
+        except ApiError as e:
+            return e.status, {"error": str(e)}
+        except KeyError as e:
+            return 400, {"error": f"缺少欄位：{e.args[0]}"}
+        except json.JSONDecodeError as e:
+            return 400, {"error": f"JSON 格式錯誤：{e}"}
+        except (ValueError, TypeError) as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """一條連線上依序處理請求。client 可不等回應連續送出（pipelining）：緩衝區內所有完整請求
+        處理完後，回應依請求順序合併成一次寫出。"""
+        buf = bytearray()
+        try:
+            while True:
+                out, close = [], False
+                while not close:
+                    try:
+                        req = _parse_request(buf)
+                    except ApiError as e:
+                        out.append(_response(e.status, {"error": str(e)}, False))
+                        close = True
+                        break
+                    if req is None:
+                        break
+                    method, target, version, headers, raw = req
+                    conn = headers.get("connection", "").lower()
+                    keep_alive = conn != "close" and (version == "HTTP/1.1" or conn == "keep-alive")
+                    self.requests += 1
+                    status, payload = await self._dispatch(method, target.split("?", 1)[0], headers, raw)
+                    out.append(_response(status, payload, keep_alive))
+                    close = not keep_alive
+                if out:
+                    writer.write(b"".join(out))
+                    await writer.drain()
+                if close:
+                    break
+                try:
+                    chunk = await asyncio.wait_for(reader.read(READ_CHUNK), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                if not chunk:
+                    break
+                buf += chunk
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+async def _serve(args) -> None:
+    users = load_users(args.secrets)
+    if not users:
+        print(f"[api] 警告：{args.secrets} 沒有 [users.*]，所有登入都會失敗", file=sys.stderr)
+    server = await ApiServer(users, args.host, args.port).start()
+    print(f"[api] listening on http://{server.host}:{server.port}", file=sys.stderr, flush=True)
+    await server.serve_forever()
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="遺產稅／保單贈與 本機 JSON API")
+    ap.add_argument("--host", default=os.environ.get("API_HOST", "127.0.0.1"))
+    ap.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", "8765")))
+    ap.add_argument("--secrets", default=os.environ.get("API_SECRETS", str(DEFAULT_SECRETS)),
+                    help="含 [users.*] 的 secrets.toml（預設與 Streamlit 相同）")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
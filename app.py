@@ -1,43 +1,63 @@
 # app.py — 影響力傳承策略平台（logo可見性＋避開工具列＋登入後顯示姓名與到期日）
-import os, uuid, hmac
-from datetime import datetime
+import functools, os, uuid, hmac
 from pathlib import Path
-from typing import Optional, Dict, Any, Tuple
-from PIL import Image
+from typing import Optional, Dict, Any
 import streamlit as st
-import bcrypt
+from streamlit import config as st_config
 
 from modules.wrapped_estate import run_estate
 from modules.wrapped_cvgift import run_cvgift
-from modules.session_registry import SessionRegistry
+from modules.wrapped_clients import run_clients
+from modules.scenario_store import ScenarioStore
+from modules.session_registry import SessionRegistry, CachedSessionRegistry, REGISTRY_STATS
+from modules.assets import ASSET_CACHE
+from modules.session_memory import MODULES, SESSION_MEMORY, AuthState
+from modules.auth import account_window_error, authenticate, get_user_index, LOGIN_LATENCY
+from modules.taxcore.cache import RESULT_CACHE
+from modules import perf
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 
 BASE_DIR = Path(__file__).resolve().parent
 ASSETS_DIR = BASE_DIR / "assets"
-DATA_DIR = BASE_DIR / ".data"
-REGISTRY = SessionRegistry(str(DATA_DIR / "sessions.db"))
+DATA_DIR = Path(os.environ.get("APP_DATA_DIR", BASE_DIR / ".data"))   # 負載測試可指向暫存目錄
+
+@st.cache_resource
+def _get_registry() -> CachedSessionRegistry:
+    # 整個 process 共用一份：連線池＋記憶體快取（last_seen 批次寫回、過期清除在背景執行）
+    return CachedSessionRegistry(SessionRegistry(str(DATA_DIR / "sessions.db")))
+
+REGISTRY = _get_registry()
+
+@st.cache_resource
+def _get_scenario_store() -> ScenarioStore:
+    # 客戶情境庫：與 sessions.db 同目錄，依登入帳號區分
+    return ScenarioStore(str(DATA_DIR / "scenarios.db"))
+
+SCENARIOS = _get_scenario_store()
+
+_ctx = get_script_run_ctx()
+_SID = _ctx.session_id if _ctx else "-"
+perf.set_session(_SID)
 
 # ------------------------- Logo / Favicon -------------------------
 MAIN_LOGO_CANDIDATES = ["logo.png", "Logo.png", "logo.PNG", "logo.jpg", "logo.jpeg", "logo.webp"]  # 主Logo容錯
 FAVICON_CANDIDATES   = ["logo2.png", "logo.png", "logo.jpg", "logo.jpeg", "logo.webp"]             # favicon優先logo2.png
 
-def _find_first(cands) -> Optional[Path]:
-    for name in cands:
-        p = ASSETS_DIR / name
-        if p.exists():
-            return p
-    return None
-
-def _open_image_safe(p: Path) -> Optional[Image.Image]:
-    try:
-        return Image.open(p)
-    except Exception:
-        return None
+LOGO_HEIGHT = 36            # 主 Logo 顯示高度；寬度依比例、最小 120，避免看起來太小
+LOGO_MIN_WIDTH = 120
+FAVICON_SIZE = 32
 
-# 設定頁面 favicon
-favicon_path = _find_first(FAVICON_CANDIDATES)
-page_icon = _open_image_safe(favicon_path) if favicon_path else "🧭"
+# 設定頁面 favicon（ASSET_CACHE：process 共用，已縮圖並編碼；之後的 rerun 不讀檔、不解碼）
+with perf.span("header.favicon"):
+    favicon = ASSET_CACHE.image(ASSETS_DIR, FAVICON_CANDIDATES, FAVICON_SIZE)
+    page_icon = favicon.data if favicon else "🧭"
 st.set_page_config(page_title="影響力傳承策略平台", page_icon=page_icon, layout="wide")
 
+# 每個 process 的 session 上限（APP_MAX_SESSIONS；0＝不限制）
+if not SESSION_MEMORY.admit(_SID):
+    st.error("目前使用人數已達上限，請稍後再重新整理頁面。")
+    st.stop()
+
 # ------------------------- Styles -------------------------
 st.markdown("""
 <style>
@@ -72,18 +92,12 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # ------------------------- Header（主Logo用 st.image，最小寬度120） -------------------------
-logo_path = _find_first(MAIN_LOGO_CANDIDATES)
 col_logo, col_title, col_right = st.columns([1, 8, 3], vertical_alignment="center")
 
-with col_logo:
-    if logo_path:
-        img = _open_image_safe(logo_path)
-        if img is not None:
-            w, h = img.size
-            target_h = 36
-            # 依比例計算寬度，同時設定最小寬度 120，避免看起來太小
-            target_w = max(120, int(w * (target_h / max(1, h))))
-            st.image(img, width=target_w)
+with col_logo, perf.span("header.logo"):
+    logo = ASSET_CACHE.image(ASSETS_DIR, MAIN_LOGO_CANDIDATES, LOGO_HEIGHT, LOGO_MIN_WIDTH)
+    if logo is not None:
+        st.image(logo.data, width=logo.width)
 
 with col_title:
     st.markdown("<h1 class='brand-title'>影響力傳承策略平台</h1>", unsafe_allow_html=True)
@@ -99,82 +113,55 @@ def _load_users_from_secrets() -> Dict[str, Any]:
     except Exception:
         return {}
 
-def _find_user(username_input: str, users: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
-    """支援：帳號鍵或顯示名稱（皆不分大小寫）"""
-    u = (username_input or "").strip()
-    if not u: return None, None
-    lower_map = {k.lower(): k for k in users.keys()}
-    key = lower_map.get(u.lower())
-    if key:
-        return key, users[key]
-    for k, info in users.items():
-        name = str(info.get("name", "")).strip()
-        if name and name.lower() == u.lower():
-            return k, info
-    return None, None
-
-def _check_password(pwd_plain: str, pwd_hash: str) -> bool:
-    try:
-        if pwd_hash is None: return False
-        return bcrypt.checkpw((pwd_plain or "").encode(), str(pwd_hash).strip().encode())
-    except Exception:
-        return False
+def _secrets_signature() -> tuple:
+    """使用者索引的變動訊號：st.secrets 物件本身（以 is 比對）＋各 secrets 檔的 mtime／大小。
+    每次登入只做幾次 stat，不重建 users dict。"""
+    stamps = []
+    for path in st_config.get_option("secrets.files"):
+        try:
+            s = os.stat(path)
+            stamps.append((s.st_mtime_ns, s.st_size))
+        except OSError:
+            stamps.append(None)
+    return (st.secrets, tuple(stamps))
 
 def _check_credentials(username: str, password: str):
-    users = _load_users_from_secrets()
-    if not users:
-        return False, "", "", "尚未設定 users（請至 Settings ▸ Secrets 貼上使用者設定）"
-    key, info = _find_user(username, users)
-    if not info:
-        return False, "", "", "查無此使用者（請確認輸入的「帳號」或「姓名」與 Secrets 一致）"
-    if not _check_password(password, info.get("pwd_hash", "")):
-        return False, "", "", "帳密錯誤"
-
-    s, e = info.get("start_date"), info.get("end_date")
-    if s and e:
-        try:
-            start_date = datetime.fromisoformat(s)
-            end_date = datetime.fromisoformat(e)
-            if not (start_date <= datetime.today() <= end_date):
-                return False, "", "", "權限尚未啟用或已過期"
-        except Exception:
-            return False, "", "", "日期格式錯誤（YYYY-MM-DD）"
+    index = get_user_index(_secrets_signature(), _load_users_from_secrets)
+    if not index.users:
+        return False, "", "", "尚未設定 users（請至 Settings ▸ Secrets 貼上使用者設定）", ""
+    ok, key, info, err = authenticate(index, username, password)
+    if not ok:
+        return False, "", "", err, ""
+
+    window_err = account_window_error(info)
+    if window_err:
+        return False, "", "", window_err, ""
 
+    e = info.get("end_date")
     display = info.get("name", key)
     end_date_text = e if e else "未設定"
-    return True, key, display, end_date_text
+    return True, key, display, end_date_text, str(info.get("role", ""))
 
 # Session 狀態
 if "auth" not in st.session_state:
-    st.session_state.auth = {
-        "authenticated": False,
-        "username": "",
-        "name": "",
-        "session_id": "",
-        "end_date": ""
-    }
+    st.session_state.auth = AuthState()
 
 # ------------------------- 登入區（登入後隱藏表單） -------------------------
 with right_col:
-    if not st.session_state.auth["authenticated"]:
+    if not st.session_state.auth.authenticated:
         with st.form("top_login_inline", clear_on_submit=False):
             c1, c2, c3 = st.columns([2, 2, 1])
             u = c1.text_input("帳號或姓名", placeholder="帳號或姓名", label_visibility="collapsed")
             p = c2.text_input("密碼", placeholder="密碼", type="password", label_visibility="collapsed")
             ok_btn = c3.form_submit_button("登入")
             if ok_btn:
-                ok, key, display, end_date_text = _check_credentials(u, p)
+                with perf.span("auth.login"):
+                    ok, key, display, end_date_text, role = _check_credentials(u, p)
                 if ok:
                     new_sid = uuid.uuid4().hex
                     REGISTRY.upsert(key, new_sid)         # 單一登入（後登入踢前者）
-                    REGISTRY.cleanup_expired()
-                    st.session_state.auth = {
-                        "authenticated": True,
-                        "username": key,
-                        "name": display,
-                        "session_id": new_sid,
-                        "end_date": end_date_text
-                    }
+                    st.session_state.auth = AuthState(authenticated=True, username=key, name=display,
+                                                      session_id=new_sid, end_date=end_date_text, role=role)
                     st.success(f"登入成功！歡迎 {display} 😀（到期日：{end_date_text}）")
                     st.rerun()  # 讓表單消失
                 else:
@@ -183,42 +170,129 @@ with right_col:
         # 右上角顯示歡迎資訊，並預留空間避開工具列
         st.markdown(
             f"<div class='info-pill avoid-toolbar' style='text-align:right;'>"
-            f"<span class='user-pill'>歡迎 {st.session_state.auth['name']} 😀（到期日：{st.session_state.auth.get('end_date','未設定')}）</span>"
+            f"<span class='user-pill'>歡迎 {st.session_state.auth.name} 😀（到期日：{st.session_state.auth.end_date or '未設定'}）</span>"
             f"</div>",
             unsafe_allow_html=True
         )
         if st.button("登出", use_container_width=True):
-            REGISTRY.delete_if_match(st.session_state.auth["username"], st.session_state.auth["session_id"])
-            st.session_state.auth = {"authenticated": False, "username": "", "name": "", "session_id": "", "end_date": ""}
+            REGISTRY.delete_if_match(st.session_state.auth.username, st.session_state.auth.session_id)
+            st.session_state.auth = AuthState()
             st.rerun()
 
 # ------------------------- 單一登入守護 -------------------------
-def _guard_session():
+def _session_problem() -> Optional[str]:
+    """登入仍有效 → 更新 last_seen 並回傳 None；已失效或被後登入者取代 → 回傳提示文字。"""
     auth = st.session_state.auth
-    if not auth["authenticated"]:
-        return
-    row = REGISTRY.get(auth["username"])
+    if not auth.authenticated:
+        return None
+    row = REGISTRY.get(auth.username)
     if not row:
-        st.warning("你的登入已失效，請重新登入。")
-        st.session_state.auth = {"authenticated": False, "username": "", "name": "", "session_id": "", "end_date": ""}
-        st.stop()
+        return "你的登入已失效，請重新登入。"
     reg_sid, _ = row
-    if not hmac.compare_digest(reg_sid, auth["session_id"]):
-        st.warning("你已在其他裝置登入，已將此處登出。")
-        st.session_state.auth = {"authenticated": False, "username": "", "name": "", "session_id": "", "end_date": ""}
+    if not hmac.compare_digest(reg_sid, auth.session_id):
+        return "你已在其他裝置登入，已將此處登出。"
+    REGISTRY.touch(auth.username)      # 只更新記憶體；過期清除由背景排程處理
+    return None
+
+def _guard_session():
+    notice = st.session_state.pop("auth_notice", None)   # 分頁（fragment）內偵測到失效後的整頁重跑
+    if notice:
+        st.warning(notice)
+    problem = _session_problem()
+    if problem:
+        st.warning(problem)
+        st.session_state.auth = AuthState()
         st.stop()
-    REGISTRY.touch(auth["username"])
-    REGISTRY.cleanup_expired()
 
-_guard_session()
+with perf.span("auth.guard"):
+    _guard_session()
 
 st.markdown("<hr style='margin:6px 0 14px;'>", unsafe_allow_html=True)
 
+if st.session_state.auth.authenticated:
+    with perf.span("clients"):
+        run_clients(SCENARIOS, st.session_state.auth.username)
+
 # ------------------------- 兩個模組 -------------------------
+# fragment 模式（預設）：在某個分頁內操作 widget 只重跑該分頁的模組，不會重算另一個分頁。
+# 設 APP_RENDER_MODE=full 可改回每次互動整頁重跑。
+RENDER_MODE = os.environ.get("APP_RENDER_MODE", "fragment").strip().lower()
+
+def _account_memory():
+    # 本 session 的 session_state 依模組估算大小（管理者檢視「Session 記憶體」）
+    SESSION_MEMORY.record(_SID, st.session_state.auth.username, st.session_state.items())
+
+def _isolated(fn, section: str):
+    """section：分頁的 perf 區段名稱。計時放在包裝函式內，整頁重跑與 fragment 重跑都會記到。"""
+    fragment = getattr(st, "fragment", None)   # streamlit >= 1.37
+    if RENDER_MODE != "fragment" or fragment is None:
+        @functools.wraps(fn)
+        def run_full():
+            with perf.span(section):
+                fn()
+        return run_full
+
+    @functools.wraps(fn)                       # 保留原函式名稱：兩個 fragment 的 id 不同
+    def run():
+        # fragment 重跑不會經過頁首的單一登入守護，也在別的執行緒上執行：這裡補做守護與 session 設定
+        perf.set_session(_SID)
+        with perf.span("auth.guard"):
+            problem = _session_problem()
+        if problem:
+            st.session_state.auth = AuthState()
+            st.session_state.auth_notice = problem
+            st.rerun(scope="app")              # 整頁重跑：回到登入表單並顯示提示
+        with perf.span(section):
+            fn()
+        _account_memory()                      # fragment 重跑不會走到頁尾，在這裡補記
+    return fragment(run)
+
+_run_estate = _isolated(run_estate, "tab.estate")
+_run_cvgift = _isolated(run_cvgift, "tab.gift")
+
 tab1, tab2 = st.tabs(["AI秒算遺產稅", "保單贈與規劃"])
-if not st.session_state.auth["authenticated"]:
+if not st.session_state.auth.authenticated:
     with tab1: st.info("此功能需登入後使用。請在右上角先登入。")
     with tab2: st.info("此功能需登入後使用。請在右上角先登入。")
 else:
-    with tab1: run_estate()
-    with tab2: run_cvgift()
+    with tab1: _run_estate()
+    with tab2: _run_cvgift()
+_account_memory()
+
+# ------------------------- 管理者：登入效能 -------------------------
+if st.session_state.auth.is_admin:
+    with st.expander("系統效能（管理者）", expanded=False):
+        m = LOGIN_LATENCY.snapshot()
+        st.caption(f"登入次數 {m['count']}｜p50 {m['p50_ms']:.0f} ms｜p95 {m['p95_ms']:.0f} ms｜"
+                   f"p99 {m['p99_ms']:.0f} ms｜max {m['max_ms']:.0f} ms")
+        c = RESULT_CACHE.stats()
+        st.caption(f"計算快取 {c['size']:,}/{c['maxsize']:,} 筆｜命中率 {c['hit_rate']:.1%}"
+                   f"（hits {c['hits']:,}／misses {c['misses']:,}）｜evictions {c['evictions']:,}｜"
+                   f"expired {c['expirations']:,}｜約 {c['approx_bytes'] / 1024:,.0f} KB")
+        r = REGISTRY_STATS.snapshot()
+        st.caption(f"Session DB 操作 {r['ops']:,}｜平均 {r['mean_ms']:.2f} ms｜max {r['max_ms']:.0f} ms｜"
+                   f"慢操作 {r['slow_ops']:,}｜鎖逾時 {r['lock_errors']:,}｜同時連線峰值 {r['max_in_flight']}")
+
+        st.markdown("**Session 記憶體（session_state 估算）**")
+        mem = SESSION_MEMORY.snapshot()
+        cap = f"{mem['max_sessions']:,}" if mem["max_sessions"] else "不限"
+        st.caption(f"目前 {mem['sessions']:,} 個 session（上限 {cap}，已拒絕 {mem['rejected']:,}）｜"
+                   f"合計約 {mem['total_bytes'] / 1024:,.0f} KB｜"
+                   + "｜".join(f"{m} {b / 1024:,.0f} KB" for m, b in mem["modules"].items()))
+        if mem["rows"]:
+            st.dataframe([{**r, **{m: round(r.get(m, 0) / 1024, 1) for m in MODULES + ("total",)}}
+                          for r in mem["rows"][:50]], use_container_width=True, hide_index=True,
+                         column_order=["session", "user", "total", *MODULES])
+
+        st.markdown("**區段耗時（ms）**")
+        if not perf.ENABLED:
+            st.caption("計時未啟用：設定環境變數 APP_PERF=1（選用 APP_PERF_JSONL=路徑 寫出 JSONL）。")
+        else:
+            scope = st.selectbox("範圍", ["全部 session", "目前 session"] + perf.session_ids(), key="perf_scope")
+            sid = None if scope == "全部 session" else (_ctx.session_id if scope == "目前 session" and _ctx else scope)
+            rows = perf.summary(sid)
+            if rows:
+                st.dataframe(rows, use_container_width=True, hide_index=True,
+                             column_order=["section", "count", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            else:
+                st.caption("尚無資料")
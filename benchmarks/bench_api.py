@@ -0,0 +1,118 @@
+# benchmarks/bench_api.py —— 本機 JSON API 吞吐量：keep-alive 連線、不同 pipeline 深度、批次端點
+#
+# 以暫存 secrets.toml（bcrypt 雜湊）啟動 api_server.py 子行程，登入取得 token 後：
+#   1) 每個請求新開連線（無 keep-alive）
+#   2) keep-alive，pipeline 深度 1 / 16（同一連線連續送出多個請求再依序讀回應）
+#   3) /v1/estate/batch 每批 10,000 戶
+# 用法：python benchmarks/bench_api.py [--connections 8] [--requests 2000] [--depth 1 16]
+import argparse, asyncio, json, socket, subprocess, sys, tempfile, time
+from pathlib import Path
+
+import bcrypt
+
+ROOT = Path(__file__).resolve().parent.parent
+USER, PASSWORD = "bench", "bench-password"
+
+def _request(path: str, body, token: str = "", keep_alive: bool = True) -> bytes:
+    raw = json.dumps(body).encode()
+    head = (f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(raw)}\r\n")
+    if token:
+        head += f"Authorization: Bearer {token}\r\n"
+    if not keep_alive:
+        head += "Connection: close\r\n"
+    return (head + "\r\n").encode() + raw
+
+async def _read_response(reader: asyncio.StreamReader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = int(head.lower().split(b"content-length:", 1)[1].split(b"\r\n", 1)[0])
+    return status, await reader.readexactly(length)
+
+async def _login(port: int) -> str:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(_request("/v1/login", {"username": USER, "password": PASSWORD}))
+    status, body = await _read_response(reader)
+    writer.close()
+    if status != 200:
+        raise SystemExit(f"login failed: {status} {body.decode()}")
+    return json.loads(body)["token"]
+
+async def _worker(port: int, token: str, n: int, depth: int, keep_alive: bool, path: str, body) -> int:
+    req = _request(path, body, token, keep_alive)
+    errors = 0
+    if not keep_alive:
+        for _ in range(n):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(req)
+            status, _ = await _read_response(reader)
+            errors += status != 200
+            writer.close()
+        return errors
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    done = 0
+    while done < n:
+        k = min(depth, n - done)
+        writer.write(req * k)                # pipelining：一次送出 k 個請求
+        for _ in range(k):
+            status, _ = await _read_response(reader)
+            errors += status != 200
+        done += k
+    writer.close()
+    return errors
+
+async def _run_case(port, token, connections, total, depth, keep_alive, path, body):
+    per = total // connections
+    t = time.perf_counter()
+    errors = sum(await asyncio.gather(*(
+        _worker(port, token, per, depth, keep_alive, path, body) for _ in range(connections)
+    )))
+    return per * connections / (time.perf_counter() - t), errors
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def _bench(port: int, args) -> None:
+    token = await _login(port)
+    single = {"total_assets": 8000, "spouse": True, "adult_children": 2, "parents": 1}
+    print(f"{'case':<34}{'conns':>6}{'req/s':>12}{'errors':>8}")
+    rps, err = await _run_case(port, token, args.connections, args.requests // 4, 1, False, "/v1/estate", single)
+    print(f"{'estate, new connection each':<34}{args.connections:>6}{rps:>12,.0f}{err:>8}")
+    for depth in args.depth:
+        rps, err = await _run_case(port, token, args.connections, args.requests, depth, True, "/v1/estate", single)
+        print(f"{f'estate, keep-alive, depth {depth}':<34}{args.connections:>6}{rps:>12,.0f}{err:>8}")
+    cv = {"premiums": [10_000_000] * 6, "cash_values": [5_000_000, 14_000_000, 24_000_000, 34_000_000,
+                                                        45_000_000, 56_000_000], "change_year": 3}
+    rps, err = await _run_case(port, token, args.connections, args.requests, max(args.depth), True, "/v1/cvgift", cv)
+    print(f"{f'cvgift, keep-alive, depth {max(args.depth)}':<34}{args.connections:>6}{rps:>12,.0f}{err:>8}")
+    rows = 10_000
+    batch = {"total_assets": [5000 + i % 20000 for i in range(rows)], "spouse": True, "adult_children": 2}
+    rps, err = await _run_case(port, token, 2, 40, 1, True, "/v1/estate/batch", batch)
+    print(f"{f'estate/batch ({rows:,} rows/req)':<34}{2:>6}{rps:>12,.1f}{err:>8}   ≈ {rps * rows:,.0f} rows/s")
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="本機 API 吞吐量基準測試")
+    ap.add_argument("--connections", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=4000)
+    ap.add_argument("--depth", type=int, nargs="+", default=[1, 16])
+    args = ap.parse_args(argv)
+
+    pwd_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        secrets_path = Path(tmp) / "secrets.toml"
+        secrets_path.write_text(f'[users.{USER}]\nname = "基準測試"\npwd_hash = "{pwd_hash}"\n', encoding="utf-8")
+        proc = subprocess.Popen([sys.executable, str(ROOT / "api_server.py"), "--port", str(port),
+                                 "--secrets", str(secrets_path)], cwd=ROOT, stderr=subprocess.PIPE)
+        try:
+            proc.stderr.readline()            # 等待 "[api] listening on ..."
+            asyncio.run(_bench(port, args))
+        finally:
+            proc.terminate()
+            proc.wait()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
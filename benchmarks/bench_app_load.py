@@ -0,0 +1,130 @@
+# benchmarks/bench_app_load.py —— app.py 多 session 同時操作的負載測試：rerun 延遲、SQLite 競爭、每個 session 的記憶體
+#
+# 用法：python benchmarks/bench_app_load.py [--sessions 200] [--threads 16] [--edits 3] [--bcrypt-rounds 4]
+#
+# 以 streamlit AppTest 在同一個 process 內開 N 個 session（注入 secrets 中的 N 個帳號，bcrypt 雜湊），
+# 由 --threads 個 driver 同時推進：首次載入 → 登入表單 → 每輪各改一次遺產稅分頁與保單分頁的 widget
+# （每次 rerun 都會經過 _guard_session）。輸出：
+#   1) 各類 rerun 的 p50／p99（ms），以及 APP_PERF 區段（auth.guard、tab.estate、tab.gift…）
+#   2) SessionRegistry 的連線池／鎖競爭計數（modules.session_registry.REGISTRY_STATS）
+#   3) 全部 session 存活時的 RSS 增量 ÷ session 數、process 峰值 RSS，以及 session_state 依模組的估算
+# session DB 寫在暫存目錄（APP_DATA_DIR），不影響 .data/。
+import argparse, os, resource, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import bcrypt
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+PASSWORD = "load-password"
+
+def _rss_mb() -> float:
+    """目前 RSS（MB）；非 Linux 退回峰值 RSS。"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _peak_rss_mb()
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+class _Timings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ms = {}
+
+    def run(self, kind: str, at):
+        t = time.perf_counter()
+        at.run()
+        ms = (time.perf_counter() - t) * 1000
+        with self._lock:
+            self.ms.setdefault(kind, []).append(ms)
+        if at.exception:
+            raise RuntimeError(f"{kind}: {at.exception[0].message}")
+
+def _session(i: int, users, args, timings: _Timings):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=args.timeout)
+    at.secrets["users"] = users
+    timings.run("first load", at)
+
+    at.text_input[0].input(f"user{i}")
+    at.text_input[1].input(PASSWORD)
+    next(b for b in at.button if b.label == "登入").click()
+    timings.run("login", at)
+    if not at.session_state.auth.authenticated:
+        raise RuntimeError(f"user{i} 登入失敗：{[e.value for e in at.error]}")
+
+    for k in range(args.edits):
+        next(n for n in at.number_input if n.label == "總資產（萬）").set_value(5000 + 100 * ((i + k) % 50))
+        timings.run("estate edit", at)
+        at.number_input(key="y1_prem").set_value(10_000_000 + 100_000 * ((i + k) % 50))
+        timings.run("gift edit", at)
+        if not at.session_state.auth.authenticated:
+            raise RuntimeError(f"user{i} 被 _guard_session 登出")
+    return at
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="app.py 多 session 負載測試")
+    ap.add_argument("--sessions", type=int, default=200)
+    ap.add_argument("--threads", type=int, default=16, help="同時推進的 session 數")
+    ap.add_argument("--edits", type=int, default=3, help="每個 session 在兩個分頁各改幾次 widget")
+    ap.add_argument("--bcrypt-rounds", type=int, default=4, help="正式環境多為 12；調高可觀察登入延遲")
+    ap.add_argument("--timeout", type=float, default=120)
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["APP_DATA_DIR"] = tmp.name
+    os.environ.setdefault("APP_PERF", "1")
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")   # 略過 use_container_width 等棄用警告
+    from modules import perf
+    from modules.session_registry import REGISTRY_STATS
+    from modules.session_memory import MODULES, footprint
+
+    pwd_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=args.bcrypt_rounds)).decode()
+    users = {f"user{i}": {"name": f"負載{i}", "pwd_hash": pwd_hash, "end_date": "2099-12-31"}
+             for i in range(args.sessions)}
+
+    _session(0, users, argparse.Namespace(**{**vars(args), "edits": 1}), _Timings())  # 暖機：import 與快取
+    perf.reset()
+    REGISTRY_STATS.reset()
+    timings = _Timings()
+    rss0 = _rss_mb()
+    t = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        apps = list(pool.map(lambda i: _session(i, users, args, timings), range(args.sessions)))
+    wall = time.perf_counter() - t
+    rss1 = _rss_mb()
+
+    n_runs = sum(len(v) for v in timings.ms.values())
+    print(f"{args.sessions} sessions × {args.threads} threads：{n_runs:,} 次 rerun，{wall:.1f} s（{n_runs / wall:,.1f} rerun/s）\n")
+    print(f"{'rerun':<14}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for kind, ms in timings.ms.items():
+        a = np.asarray(ms)
+        print(f"{kind:<14}{len(a):>7}{np.percentile(a, 50):>10.1f}{np.percentile(a, 99):>10.1f}{a.max():>10.1f}")
+
+    if perf.ENABLED:
+        print(f"\n{'section':<22}{'count':>7}{'p50 ms':>10}{'p99 ms':>10}")
+        for r in perf.summary():
+            print(f"{r['section']:<22}{r['count']:>7}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+    r = REGISTRY_STATS.snapshot()
+    print(f"\nSessionRegistry：{r['ops']:,} 次操作｜平均 {r['mean_ms']:.2f} ms｜max {r['max_ms']:.1f} ms｜"
+          f"慢操作 {r['slow_ops']}｜鎖逾時 {r['lock_errors']}｜新開連線 {r['pool_misses']}｜"
+          f"同時連線峰值 {r['max_in_flight']}")
+    print(f"記憶體：RSS +{rss1 - rss0:,.0f} MB／{len(apps)} sessions ≈ {(rss1 - rss0) / len(apps) * 1024:,.0f} KB/session"
+          f"（含 AppTest 本身的元素樹）｜峰值 RSS {_peak_rss_mb():,.0f} MB")
+    # AppTest 的 session id 固定，SESSION_MEMORY 只會看到一個 session；這裡直接逐一估算
+    sizes = [footprint(at.session_state.items()) for at in apps]
+    modules = {m: sum(s.get(m, 0) for s in sizes) / len(sizes) / 1024 for m in MODULES}
+    print(f"session_state 估算：平均 {sum(modules.values()):,.1f} KB/session（"
+          + "｜".join(f"{m} {kb:,.1f} KB" for m, kb in modules.items()) + "）")
+    tmp.cleanup()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# benchmarks/bench_exports.py —— 匯出：每次 rerun 轉檔（舊做法）vs. 按下才產生＋快取；批次匯出的記憶體
+#
+# 用法：python benchmarks/bench_exports.py [--clients 1000 20000]
+# 1) 保單明細：pd.concat + to_csv（舊：每次 rerun 都做）vs. lazy_export 快取命中
+# 2) 批次匯出 N 位客戶（遺產稅情境＋贈與排程，CSV／XLSX）：耗時與 tracemalloc 峰值（應與 N 無關）
+import argparse, os, sys, tempfile, time, timeit, tracemalloc
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.exports import ClientInput, gift_schedule_sheets, input_key, lazy_export, write_batch
+from modules.taxcore import EstateTaxCalculator, GiftSchedule, TaxConstants
+
+PREMIUMS = (10_000_000,) * 6
+CASH_VALUES = (5_000_000, 14_000_000, 24_000_000, 34_000_000, 45_000_000, 56_000_000)
+
+def _clients(n: int):
+    return lambda: (ClientInput(f"客戶{i}", 5000 + i % 20000, i % 2 == 0, i % 4, parents=i % 3, premium=1000,
+                                claim=1500, gift=244, premiums=PREMIUMS, cash_values=CASH_VALUES,
+                                change_year=1 + i % 6) for i in range(n))
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="匯出效能")
+    ap.add_argument("--clients", type=int, nargs="+", default=[1000, 20000])
+    args = ap.parse_args(argv)
+
+    sched = GiftSchedule(PREMIUMS, CASH_VALUES, 3)
+
+    def eager():
+        df = pd.concat([pd.DataFrame(sched.years_table()), pd.DataFrame(sched.cash_gift_table())], axis=1)
+        return df.to_csv(index=False).encode("utf-8-sig")
+
+    key = input_key("cvgift", PREMIUMS, CASH_VALUES, 3)
+    lazy = lazy_export("csv", key, lambda: gift_schedule_sheets(GiftSchedule(PREMIUMS, CASH_VALUES, 3)))
+    lazy()
+    for name, fn in (("每次 rerun 轉檔（concat+to_csv）", eager), ("lazy_export 快取命中", lazy)):
+        n, _ = timeit.Timer(fn).autorange()
+        per = min(timeit.Timer(fn).repeat(5, n)) / n
+        print(f"{name:<32}{per * 1e6:>10.1f} µs")
+    print("（新做法在 rerun 時只建立 callable；上面的命中成本只在按下下載時發生）\n")
+
+    calc = EstateTaxCalculator(TaxConstants())
+    print(f"{'clients':>8}{'fmt':>6}{'seconds':>10}{'size KB':>10}{'peak KB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.clients:
+            for fmt in ("csv", "xlsx"):
+                path = Path(tmp) / f"batch.{fmt}"
+                tracemalloc.start()
+                t = time.perf_counter()
+                with open(path, "wb") as f:
+                    write_batch(_clients(n), fmt, f, calc)
+                sec = time.perf_counter() - t
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{n:>8}{fmt:>6}{sec:>10.2f}{os.path.getsize(path) / 1024:>10,.0f}{peak / 1024:>10,.0f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
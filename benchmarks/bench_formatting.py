@@ -0,0 +1,61 @@
+# benchmarks/bench_formatting.py —— 表格格式化：逐格 lambda（舊 _fmt_table / .map(fmt)）vs. 整欄向量化 vs. 快取命中
+#
+# 用法：python benchmarks/bench_formatting.py [--rows 10000 1000000]
+import argparse, sys, time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.formatting import FMT_CACHE, fmt_column, fmt_table
+
+def legacy_fmt_table(df: pd.DataFrame) -> pd.DataFrame:
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        s = df[col]
+        s_num = pd.to_numeric(s, errors="coerce")
+        if s_num.notna().mean() >= 0.5:
+            out[col] = s_num.map(lambda x: f"{int(x):,}" if pd.notna(x) else "—")
+        else:
+            out[col] = s.map(lambda x: "—" if pd.isna(x) else str(x))
+    return out
+
+def _timeit(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best * 1000
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="格式化基準測試")
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 1_000_000])
+    args = ap.parse_args(argv)
+
+    print(f"{'rows':>10}  {'case':<22}{'legacy ms':>11}{'vector ms':>11}{'cached ms':>11}{'speedup':>9}")
+    for n in args.rows:
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            "遺產稅（萬）": rng.integers(0, 20_000, n),
+            "家人總共取得（萬）": rng.uniform(0, 1e5, n),
+        })
+        gift = pd.Series(rng.integers(0, 50_000_000, n), name="應納贈與稅（元）")
+        assert legacy_fmt_table(df).astype(object).equals(fmt_table(df, rounding="trunc").astype(object))
+
+        cases = [
+            ("_fmt_table (2 cols)", lambda: legacy_fmt_table(df), lambda: fmt_table(df, rounding="trunc")),
+            (".map(fmt_y)", lambda: gift.map(lambda x: f"{x:,.0f} 元"), lambda: fmt_column(gift, suffix=" 元")),
+        ]
+        for name, old, new in cases:
+            legacy = _timeit(old)
+            vector = _timeit(lambda: (FMT_CACHE.clear(), new()))
+            new()
+            cached = _timeit(new)
+            print(f"{n:>10,}  {name:<22}{legacy:>11.1f}{vector:>11.1f}{cached:>11.1f}{legacy / vector:>8.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
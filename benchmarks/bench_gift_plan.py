@@ -0,0 +1,43 @@
+# benchmarks/bench_gift_plan.py —— 多年度贈與排程 DP：30 年、以 10,000 元為格點（格數過多時自動放大）的求解時間，並以小題目窮舉驗證
+#
+# 用法：python benchmarks/bench_gift_plan.py [--targets 100000000 1000000000] [--years 30]
+import argparse, itertools, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.taxcore.gift_plan import _year_tax, optimize_gift_plan
+from modules.taxcore.rules import get_rules
+
+def _brute(target: int, years: int, unit: int) -> int:
+    rules, units = get_rules(), target // unit
+    return min(sum(int(_year_tax(a * unit, rules)) for a in combo)
+               for combo in itertools.product(range(units + 1), repeat=years) if sum(combo) == units)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="贈與排程 DP 基準測試")
+    ap.add_argument("--targets", type=int, nargs="+", default=[100_000_000, 1_000_000_000])
+    ap.add_argument("--years", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    premiums = [30_000_000] * args.years                       # 保單：年繳 3,000 萬，保價金約為累計保費 80%
+    cash_values = [int(30_000_000 * y * 0.8) for y in range(1, args.years + 1)]
+    print(f"{'target':>15}{'years':>7}{'grid':>10}{'cash ms':>10}{'+policy ms':>12}{'tax (cash)':>14}{'tax (+policy)':>15}")
+    for target in args.targets:
+        best_c = best_p = float("inf")
+        for _ in range(args.repeat):
+            t = time.perf_counter(); cash = optimize_gift_plan(target, args.years); best_c = min(best_c, time.perf_counter() - t)
+            t = time.perf_counter(); pol = optimize_gift_plan(target, args.years, premiums, cash_values)
+            best_p = min(best_p, time.perf_counter() - t)
+        print(f"{target:>15,}{args.years:>7}{-(-target // cash.unit):>10,}{best_c * 1000:>10.1f}{best_p * 1000:>12.1f}"
+              f"{cash.total_tax:>14,}{pol.total_tax:>15,}")
+
+    unit = 1_000_000
+    for target, years in [(60_000_000, 3), (90_000_000, 4)]:
+        dp = optimize_gift_plan(target, years, unit=unit).total_tax
+        print(f"窮舉驗證 {target:,} 元／{years} 年（格點 {unit:,}）：DP {dp:,}  窮舉 {_brute(target, years, unit):,}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+# benchmarks/bench_import.py —— 量測 import 時間：純計算核心 vs. UI 模組
+#
+# 用法：python benchmarks/bench_import.py [--repeat 7] [--max-ms 20]
+# 每次都開新的 Python process（冷啟動），取中位數；--max-ms 超標時回傳非 0。
+import argparse, statistics, subprocess, sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TARGETS = [
+    "modules.taxcore",
+    "modules.wrapped_estate",
+    "modules.wrapped_cvgift",
+]
+
+_CHILD = (
+    "import time; t=time.perf_counter(); import {mod}; "
+    "print((time.perf_counter()-t)*1000); "
+    "import sys; print(int('streamlit' in sys.modules), int('numpy' in sys.modules), int('pandas' in sys.modules))"
+)
+
+def measure(mod: str, repeat: int):
+    times, flags = [], None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _CHILD.format(mod=mod)], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.split("\n")
+        times.append(float(out[0]))
+        flags = out[1].split()
+    return statistics.median(times), min(times), flags
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="import 時間基準測試")
+    ap.add_argument("--repeat", type=int, default=7)
+    ap.add_argument("--max-ms", type=float, default=None, help="modules.taxcore 中位數上限（毫秒）")
+    args = ap.parse_args(argv)
+
+    print(f"{'module':<26}{'median ms':>11}{'min ms':>9}   streamlit numpy pandas")
+    core_ms = None
+    for mod in TARGETS:
+        med, best, (st_, np_, pd_) = measure(mod, args.repeat)
+        if mod == "modules.taxcore":
+            core_ms = med
+        print(f"{mod:<26}{med:>11.1f}{best:>9.1f}   {'yes' if st_ == '1' else 'no':>9} "
+              f"{'yes' if np_ == '1' else 'no':>5} {'yes' if pd_ == '1' else 'no':>6}")
+
+    if args.max_ms is not None and core_ms > args.max_ms:
+        print(f"FAIL: modules.taxcore import {core_ms:.1f} ms > {args.max_ms} ms")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,35 @@
+# benchmarks/bench_projection.py —— 遺產稅蒙地卡羅推估：路徑數 × 年數的單核心耗時，及同一種子的可重現性
+#
+# 用法：python benchmarks/bench_projection.py [--paths 10000 100000] [--years 30] [--repeat 3]
+import argparse, sys, time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.taxcore import EstateTaxCalculator, TaxConstants
+from modules.taxcore.projection import run_projection
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="蒙地卡羅推估基準測試")
+    ap.add_argument("--paths", type=int, nargs="+", default=[10_000, 100_000])
+    ap.add_argument("--years", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    calc = EstateTaxCalculator(TaxConstants())
+    family = (5000, True, 2, 0, 0, 0)
+    print(f"{'paths':>10}{'years':>7}{'best ms':>10}{'Mpath-yr/s':>12}  reproducible")
+    for n in args.paths:
+        best, results = float("inf"), []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            results.append(run_projection(calc, *family, years=args.years, paths=n, seed=42))
+            best = min(best, time.perf_counter() - t)
+        same = all(np.array_equal(r.band("assets"), results[0].band("assets")) for r in results)
+        print(f"{n:>10,}{args.years:>7}{best * 1000:>10.1f}{n * args.years / best / 1e6:>12.1f}  {same}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+# benchmarks/bench_scenario_store.py —— 客戶情境庫：儲存、載入單一客戶、整份客戶清單、稅制變動後批次重算
+#
+# 用法：python benchmarks/bench_scenario_store.py [--clients 500] [--advisors 20]
+# 每位顧問 --clients 位客戶；清單與載入各量 --repeat 次取中位數。重算以年度不同的稅制觸發全部過期。
+import argparse, dataclasses, random, statistics, sys, tempfile, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.scenario_store import ScenarioStore, compute_results_batch
+from modules.taxcore.rules import get_rules
+
+def _inputs(rng: random.Random) -> dict:
+    n = rng.randint(3, 10)
+    prem = rng.randrange(1_000_000, 20_000_000, 100_000)
+    return {
+        "estate": {"total": rng.randrange(1000, 100_000, 100), "spouse": rng.random() < 0.6,
+                   "adult_children": rng.randint(0, 4), "parents": rng.randint(0, 2), "disabled_people": 0,
+                   "other_dependents": 0, "premium": rng.randrange(0, 2000, 100), "claim": 0, "gift": 244,
+                   "claim_locked": False},
+        "cvgift": {"premiums": [prem] * n, "cash_values": [int(prem * y * 0.8) for y in range(1, n + 1)],
+                   "change_year": rng.randint(1, n)},
+    }
+
+def _median_ms(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t) * 1000)
+    return statistics.median(out)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="客戶情境庫效能")
+    ap.add_argument("--clients", type=int, default=500, help="每位顧問的客戶數")
+    ap.add_argument("--advisors", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args(argv)
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ScenarioStore(str(Path(tmp) / "scenarios.db"))
+        t = time.perf_counter()
+        for a in range(args.advisors):
+            for c in range(args.clients):
+                store.save(f"advisor{a}", f"客戶{c}", _inputs(rng))
+        total = args.advisors * args.clients
+        print(f"儲存 {total:,} 位客戶（含計算）：{(time.perf_counter() - t) / total * 1000:.2f} ms/位")
+
+        print(f"載入單一客戶：{_median_ms(lambda: store.load('advisor7', '客戶123'), args.repeat):.3f} ms")
+        print(f"整份清單（{args.clients} 位，含 JSON 解析）："
+              f"{_median_ms(lambda: store.list_clients('advisor7'), args.repeat):.2f} ms")
+
+        batch = [_inputs(rng) for _ in range(1000)]
+        print(f"結果計算 1,000 位（向量化批次）：{_median_ms(lambda: compute_results_batch(batch), 5):.1f} ms")
+
+        new_rules = dataclasses.replace(get_rules(), year=get_rules().year + 1)
+        t = time.perf_counter()
+        n = store.recompute(new_rules)
+        sec = time.perf_counter() - t
+        print(f"稅制變動重算：{n:,} 位，{sec:.2f} s（{n / sec:,.0f} 位/s），剩餘過期 {store.count_stale(new_rules)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# benchmarks/bench_session_registry.py —— _guard_session 的 SQLite 負載：舊版（每次 connect）vs. 連線池＋WAL
+#
+# 用法：python benchmarks/bench_session_registry.py [--sessions 200] [--reruns 50] [--threads 32]
+# 每個模擬 session 每次 rerun 做一次 guard：get → touch → cleanup_expired（與 app.py 相同）。
+import argparse, sqlite3, statistics, sys, tempfile, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.session_registry import SessionRegistry
+
+class LegacySessionRegistry(SessionRegistry):
+    """舊行為：每個操作都新開一條預設設定（rollback journal、synchronous=FULL）的連線。"""
+    @contextmanager
+    def _connect(self):
+        with sqlite3.connect(self.db_path) as conn:
+            yield conn
+        conn.close()
+
+def _guard(reg: SessionRegistry, username: str, sid: str) -> float:
+    t = time.perf_counter()
+    row = reg.get(username)
+    assert row is not None and row[0] == sid
+    reg.touch(username)
+    reg.cleanup_expired()
+    return time.perf_counter() - t
+
+def run(cls, db_path: str, sessions: int, reruns: int, threads: int):
+    reg = cls(db_path)
+    users = [(f"user{i}", uuid.uuid4().hex) for i in range(sessions)]
+    for u, sid in users:
+        reg.upsert(u, sid)
+
+    work = [users[i % sessions] for i in range(sessions * reruns)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        lat = list(pool.map(lambda us: _guard(reg, *us), work))
+    wall = time.perf_counter() - t0
+    if hasattr(reg, "close"):
+        reg.close()
+    lat.sort()
+    q = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1000
+    return {"guards": len(lat), "wall_s": wall, "guards_per_s": len(lat) / wall,
+            "p50_ms": q(0.50), "p95_ms": q(0.95), "p99_ms": q(0.99), "mean_ms": statistics.fmean(lat) * 1000}
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="SessionRegistry guard 延遲／吞吐量")
+    ap.add_argument("--sessions", type=int, default=200, help="同時登入的 session 數")
+    ap.add_argument("--reruns", type=int, default=50, help="每個 session 的 rerun 次數")
+    ap.add_argument("--threads", type=int, default=32, help="並行 script thread 數")
+    args = ap.parse_args(argv)
+
+    print(f"{'registry':<10}{'guards':>8}{'guards/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as d:
+        for name, cls in (("legacy", LegacySessionRegistry), ("pooled", SessionRegistry)):
+            r = run(cls, str(Path(d) / name / "sessions.db"), args.sessions, args.reruns, args.threads)
+            print(f"{name:<10}{r['guards']:>8}{r['guards_per_s']:>11,.0f}"
+                  f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+# benchmarks/bench_succession.py —— 多代連續繼承：記憶化 vs. 不記憶化（完整列舉）的子問題數與耗時
+#
+# 用法：python benchmarks/bench_succession.py [--children 3] [--generations 3 4]
+import argparse, sys, time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.taxcore import EstateTaxCalculator, TaxConstants
+from modules.taxcore.succession import FamilyNode, SuccessionPlanner
+
+def family_tree(generations: int, children: int) -> FamilyNode:
+    """每代皆為夫妻、每對有 children 位子女；最末代為繼承人（不課稅）。"""
+    node = FamilyNode(0.0)
+    for g in range(generations - 1, 0, -1):
+        node = FamilyNode(2000.0 * g, 1000.0 * g, tuple(node for _ in range(children)))
+    return FamilyNode(30000.0, 5000.0, tuple(node for _ in range(children)))
+
+def _run(planner: SuccessionPlanner, root: FamilyNode):
+    t = time.perf_counter()
+    plan = planner.plan(root)
+    return plan, (time.perf_counter() - t) * 1000
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="多代傳承規劃基準測試")
+    ap.add_argument("--children", type=int, default=3)
+    ap.add_argument("--generations", type=int, nargs="+", default=[3, 4])
+    ap.add_argument("--max-naive", type=int, default=3, help="不記憶化版本最多跑到幾代（指數成長）")
+    args = ap.parse_args(argv)
+
+    calc = EstateTaxCalculator(TaxConstants())
+    print(f"{'gens':>5}{'deaths':>8}{'memo ms':>10}{'subprobs':>10}{'naive ms':>11}{'subprobs':>11}  same tax")
+    for g in args.generations:
+        root = family_tree(g, args.children)
+        memo, t_memo = _run(SuccessionPlanner(calc), root)
+        if g <= args.max_naive:
+            naive, t_naive = _run(SuccessionPlanner(calc, memoize=False), root)
+            tail = f"{t_naive:>11.1f}{naive.subproblems:>11,}  {naive.total_tax == memo.total_tax}"
+        else:
+            tail = f"{'—':>11}{'—':>11}"
+        print(f"{g:>5}{len(memo.steps):>8}{t_memo:>10.1f}{memo.subproblems:>10,}{tail}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# benchmarks/bench_tab_isolation.py —— 每次互動的伺服器時間：整頁重跑 vs. 分頁 fragment 隔離（驅動 app.py）
+#
+# 用法：python benchmarks/bench_tab_isolation.py [--edits 30]
+# 以 streamlit AppTest 在同一個 process 內登入 app.py 兩次：
+#   full 模式（APP_RENDER_MODE=full）：改一個 widget → 整頁重跑（頁首、守護、兩個分頁）；
+#   fragment 模式（預設）：同樣的操作只重跑被操作分頁的 st.fragment（含 fragment 內的單一登入守護）。
+# AppTest 本身只會整頁重跑；fragment 模式改以 RerunData(fragment_id_queue=[該分頁]) 觸發，
+# 與瀏覽器中在分頁內操作 widget 時伺服器收到的 rerun 請求相同。兩者都包含 AppTest 解析元素樹的固定開銷。
+# session DB 寫在暫存目錄（APP_DATA_DIR）。
+import argparse, functools, os, statistics, sys, tempfile, time
+from pathlib import Path
+
+import bcrypt
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+from streamlit.testing.v1 import AppTest
+import streamlit.testing.v1.local_script_runner as local_script_runner
+
+ROOT = Path(__file__).resolve().parent.parent
+PASSWORD = "bench-password"
+
+def _login(mode: str, username: str, users) -> AppTest:
+    os.environ["APP_RENDER_MODE"] = mode          # app.py 每次執行時讀取
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=60)
+    at.secrets["users"] = users
+    at.run()
+    at.text_input[0].input(username)
+    at.text_input[1].input(PASSWORD)
+    next(b for b in at.button if b.label == "登入").click()
+    at.run()
+    if not at.session_state.auth.authenticated:
+        raise RuntimeError(f"{username} 登入失敗")
+    return at
+
+def _fragment_ids(at: AppTest):
+    """分頁函式名稱 → fragment id（st.fragment 保存的包裝函式以 non_optional_func 引用原函式）。"""
+    out = {}
+    for fid, wrapped in at._fragment_storage._fragments.items():
+        cells = dict(zip(wrapped.__code__.co_freevars, (c.cell_contents for c in wrapped.__closure__ or ())))
+        out[cells["non_optional_func"].__name__] = fid
+    return out
+
+def _run(at: AppTest, fragment_id=None) -> float:
+    original = local_script_runner.RerunData
+    if fragment_id:
+        local_script_runner.RerunData = functools.partial(RerunData, fragment_id_queue=[fragment_id],
+                                                          is_fragment_scoped_rerun=True)
+    try:
+        t = time.perf_counter()
+        at.run()
+        ms = (time.perf_counter() - t) * 1000
+    finally:
+        local_script_runner.RerunData = original
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    if not at.session_state.auth.authenticated:
+        raise RuntimeError("rerun 後被登出")
+    return ms
+
+def _edit_estate(at: AppTest, i: int):
+    next(n for n in at.number_input if n.label == "總資產（萬）").set_value(5000 + 100 * (i % 50))
+
+def _edit_gift(at: AppTest, i: int):
+    at.number_input(key="y1_prem").set_value(10_000_000 + 100_000 * (i % 50))
+
+def _time_edits(at: AppTest, edit, n: int, fragment_id=None):
+    out = []
+    for i in range(n):
+        edit(at, i)
+        out.append(_run(at, fragment_id))
+    return out
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="分頁隔離的每次互動伺服器時間（app.py）")
+    ap.add_argument("--edits", type=int, default=30)
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["APP_DATA_DIR"] = tmp.name
+    os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+    pwd_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    users = {u: {"name": u, "pwd_hash": pwd_hash, "end_date": "2099-12-31"} for u in ("full", "fragment")}
+
+    full = _login("full", "full", users)
+    frag = _login("fragment", "fragment", users)
+    ids = _fragment_ids(frag)
+    if set(ids) != {"run_estate", "run_cvgift"}:
+        raise RuntimeError(f"預期兩個分頁 fragment，實際：{sorted(ids)}")
+    for at, fid in ((full, None), (frag, ids["run_estate"])):      # 暖機
+        _time_edits(at, _edit_estate, 3, fid)
+
+    rows = []
+    for name, edit, fn in (("estate edit", _edit_estate, "run_estate"), ("gift edit", _edit_gift, "run_cvgift")):
+        _run(frag)                   # fragment rerun 後的元素樹只含該分頁：換分頁前先整頁重跑一次（不計時）
+        rows.append((name, _time_edits(full, edit, args.edits), _time_edits(frag, edit, args.edits, ids[fn])))
+    print(f"{'interaction':<14}{'full ms':>10}{'fragment ms':>13}{'saved':>8}")
+    for name, f, g in rows:
+        fm, gm = statistics.median(f), statistics.median(g)
+        print(f"{name:<14}{fm:>10.1f}{gm:>13.1f}{(1 - gm / fm):>8.0%}")
+    tmp.cleanup()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
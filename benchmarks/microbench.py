@@ -0,0 +1,191 @@
+# benchmarks/microbench.py —— 熱路徑微基準：計算核心、格式化、SessionRegistry 各操作；JSON 基準值＋退化警示
+#
+# 用法：
+#   python benchmarks/microbench.py --save                 # 量測並寫入基準值（預設 benchmarks/baseline.json）
+#   python benchmarks/microbench.py                        # 與基準值比較；任何項目慢於 --threshold 即回傳 1
+#   python benchmarks/microbench.py --threshold 0.3 -k registry   # 只跑名稱含 registry 的項目，容許 30%
+#
+# 每個項目以 timeit 自動決定迴圈次數，取 --repeat 次中最快的「每次呼叫耗時」；
+# 基準值依機器而異，請在同一台機器上比較（檔案內附 python／numpy／平台資訊）。
+import argparse, json, os, platform, sys, tempfile, time, timeit, uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from modules.taxcore import (
+    CachedEstateTaxCalculator, CachedGiftSchedule, EstateTaxCalculator, GiftSchedule, ResultCache, TaxConstants,
+    cached_tax_calc, tax_calc, tax_calc_batch,
+)
+from modules.assets import AssetCache
+from modules.formatting import FMT_CACHE, fmt_table
+from modules.session_registry import CachedSessionRegistry, SessionRegistry
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_THRESHOLD = 0.20
+NOISE_FLOOR = 100e-9          # 秒：絕對差距小於此值不算退化（次微秒項目的計時抖動）
+
+Case = Tuple[str, Callable[[], object]]
+
+def estate_cases() -> List[Case]:
+    calc = EstateTaxCalculator(TaxConstants())
+    cached = CachedEstateTaxCalculator(TaxConstants(), cache=ResultCache())
+    cached.calculate_estate_tax(8000, True, 2, 0, 0, 1)
+    rng = np.random.default_rng(0)
+    n = 10_000
+    totals = rng.uniform(0, 50_000, n)
+    kids = rng.integers(0, 5, n)
+    return [
+        ("estate.calculate_estate_tax", lambda: calc.calculate_estate_tax(8000, True, 2, 0, 0, 1)),
+        ("estate.calculate_estate_tax[cached]", lambda: cached.calculate_estate_tax(8000, True, 2, 0, 0, 1)),
+        ("estate.compute_deductions", lambda: calc.compute_deductions(True, 2, 0, 0, 1)),
+        ("estate.calculate_estate_tax_batch[10k]", lambda: calc.calculate_estate_tax_batch(totals, True, kids, 0, 0, 0)),
+    ]
+
+def gift_cases() -> List[Case]:
+    nets = np.random.default_rng(0).integers(0, 100_000_000, 10_000)
+    prem3, cv3 = [10_000_000] * 3, [5_000_000, 14_000_000, 24_000_000]
+    prem30, cv30 = [10_000_000] * 30, [int(10_000_000 * y * 0.8) for y in range(1, 31)]
+    sched = GiftSchedule(prem30, cv30, 10)
+    toggle = iter(range(10**12))
+    cache = ResultCache()
+    cached_tax_calc(21_560_000, cache=cache)
+    CachedGiftSchedule(prem30, cv30, 10, cache=cache)
+
+    def set_premium():
+        sched.set_premium(15, 10_000_000 + (next(toggle) % 2) * 1_000_000)
+
+    def build_and_read():
+        s = GiftSchedule(prem3, cv3, 3)
+        return s.nominal_transfer(), s.policy_gift(), s.cash_gift_tax()
+
+    return [
+        ("gift.tax_calc", lambda: tax_calc(21_560_000)),
+        ("gift.tax_calc[cached]", lambda: cached_tax_calc(21_560_000, cache=cache)),
+        ("gift.tax_calc_batch[10k]", lambda: tax_calc_batch(nets)),
+        ("schedule.build[3y]+results", build_and_read),
+        ("schedule.build[30y]", lambda: GiftSchedule(prem30, cv30, 10)),
+        ("schedule.build[30y,cached]", lambda: CachedGiftSchedule(prem30, cv30, 10, cache=cache)),
+        ("schedule.set_premium[30y]", set_premium),
+        ("schedule.years_table[30y]", sched.years_table),
+    ]
+
+def format_cases() -> List[Case]:
+    from modules.wrapped_estate import _fmt_table     # 與 UI 相同的進入點（含 span 計時包裝）
+    scenarios = pd.DataFrame({
+        "遺產稅（萬）": [698, 573, 525, 407, 560],
+        "家人總共取得（萬）": [4302, 4671, 5235, 5837, 5684],
+    }, index=["沒有規劃", "提前贈與", "購買保險", "提前贈與＋購買保險", "提前贈與＋購買保險（被實質課稅）"])
+    big = pd.DataFrame(np.random.default_rng(0).uniform(0, 1e8, (10_000, 3)), columns=["a", "b", "c"])
+
+    def uncached(df):
+        def run():
+            FMT_CACHE.clear()
+            return fmt_table(df, rounding="trunc")
+        return run
+
+    return [
+        ("format._fmt_table[scenarios]", lambda: _fmt_table(scenarios)),
+        ("format.fmt_table[scenarios,miss]", uncached(scenarios)),
+        ("format.fmt_table[10k x 3,miss]", uncached(big)),
+    ]
+
+def asset_cases() -> List[Case]:
+    assets_dir = Path(__file__).resolve().parent.parent / "assets"
+    cache = AssetCache()
+    cache.image(assets_dir, ["logo2.png"], 32)
+    return [("assets.image[hit]", lambda: cache.image(assets_dir, ["logo2.png"], 32))]
+
+def registry_cases(tmpdir: str) -> List[Case]:
+    reg = SessionRegistry(str(Path(tmpdir) / "bench" / "sessions.db"))
+    users = [f"user{i}" for i in range(200)]
+    for u in users:
+        reg.upsert(u, uuid.uuid4().hex)
+    sid = uuid.uuid4().hex
+    reg.upsert("hot", sid)
+    now = int(time.time())
+    batch = [(u, "", now) for u in users[:100]]
+    cached = CachedSessionRegistry(SessionRegistry(str(Path(tmpdir) / "cached" / "sessions.db")), start=False)
+    cached.upsert("hot", sid)
+
+    def upsert_delete():
+        reg.upsert("tmp", "x")
+        reg.delete_if_match("tmp", "x")
+
+    return [
+        ("registry.get", lambda: reg.get("hot")),
+        ("registry.touch", lambda: reg.touch("hot")),
+        ("registry.upsert", lambda: reg.upsert("hot", sid)),
+        ("registry.upsert+delete_if_match", upsert_delete),
+        ("registry.touch_many[100]", lambda: reg.touch_many(batch)),
+        ("registry.cleanup_expired", reg.cleanup_expired),
+        ("registry[cached].get", lambda: cached.get("hot")),
+        ("registry[cached].touch", lambda: cached.touch("hot")),
+        ("registry[cached].flush", cached.flush),
+    ]
+
+def measure(fn: Callable[[], object], repeat: int) -> float:
+    """每次呼叫的最佳耗時（秒）。"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def _fmt_time(sec: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if sec >= scale:
+            return f"{sec / scale:8.2f} {unit}"
+    return f"{sec / 1e-9:8.1f} ns"
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="熱路徑微基準（含基準值比較）")
+    ap.add_argument("--baseline", default=os.environ.get("MICROBENCH_BASELINE", str(DEFAULT_BASELINE)))
+    ap.add_argument("--save", action="store_true", help="把這次結果寫成基準值")
+    ap.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="容許變慢比例（0.2 = 20%%）")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("-k", "--filter", default="", help="只跑名稱包含此字串的項目")
+    args = ap.parse_args(argv)
+
+    baseline: Dict[str, float] = {}
+    if not args.save and Path(args.baseline).exists():
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))["results"]
+
+    results: Dict[str, float] = {}
+    regressions = []
+    print(f"{'case':<40}{'per call':>12}{'baseline':>12}{'change':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        cases = estate_cases() + gift_cases() + format_cases() + asset_cases() + registry_cases(tmp)
+        for name, fn in cases:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = sec = measure(fn, args.repeat)
+            base = baseline.get(name)
+            if base:
+                change = sec / base - 1
+                flag = "  ← 退化" if change > args.threshold and sec - base > NOISE_FLOOR else ""
+                if flag:
+                    regressions.append(name)
+                print(f"{name:<40}{_fmt_time(sec):>12}{_fmt_time(base):>12}{change:>+8.0%}{flag}")
+            else:
+                print(f"{name:<40}{_fmt_time(sec):>12}{'—':>12}{'':>9}")
+
+    if args.save:
+        Path(args.baseline).write_text(json.dumps({
+            "meta": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                     "platform": platform.platform(), "machine": platform.machine(),
+                     "saved_at": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "results": results,
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n已寫入基準值：{args.baseline}")
+        return 0
+    if regressions:
+        print(f"\n{len(regressions)} 項慢於基準值 {args.threshold:.0%} 以上：{', '.join(regressions)}")
+        return 1
+    if baseline:
+        print(f"\n全部項目皆在基準值 {args.threshold:.0%} 以內。")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+# bulk_calc.py —— 批次試算 CLI（不載入 streamlit）：大量戶數 CSV → 遺產稅／贈與稅結果 CSV
+#
+# 用法：
+#   python bulk_calc.py input.csv output.csv [--chunksize 100000] [--workers 4]
+#
+# 輸入欄位（缺欄視為 0）：
+#   遺產稅（萬）：total_assets, spouse, adult_children, other_dependents, disabled_people, parents
+#                 spouse 為是／否：1/0、true/false、yes/no、是/否 皆可；無法判斷的值會中止並指出列號
+#   贈與稅（元）：gift_amount（當年度贈與總額，先扣年免稅額再計稅）
+# 輸出欄位：原欄位 + taxable_amount, estate_tax, deductions, gift_net, gift_tax, gift_rate
+import argparse, os, sys, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modules.taxcore.estate import TaxConstants, EstateTaxCalculator
+from modules.taxcore.gift import EXEMPTION, tax_calc_batch
+
+ESTATE_COLUMNS = ["total_assets", "spouse", "adult_children", "other_dependents", "disabled_people", "parents"]
+GIFT_COLUMNS = ["gift_amount"]
+
+_CALCULATOR = None
+
+def _calculator() -> EstateTaxCalculator:
+    # 每個 worker process 只建立一次
+    global _CALCULATOR
+    if _CALCULATOR is None:
+        _CALCULATOR = EstateTaxCalculator(TaxConstants())
+    return _CALCULATOR
+
+def _col(df: pd.DataFrame, name: str, dtype) -> np.ndarray:
+    if name not in df.columns:
+        return np.zeros(len(df), dtype=dtype)
+    return pd.to_numeric(df[name], errors="coerce").fillna(0).to_numpy(dtype=dtype)
+
+_TRUE_TEXT = {"true", "t", "yes", "y", "是", "有"}
+_FALSE_TEXT = {"false", "f", "no", "n", "否", "無", "沒有", ""}
+
+def _bool_col(df: pd.DataFrame, name: str) -> np.ndarray:
+    """是／否欄位：數值非 0 為真；文字接受 true/false、yes/no、是/否 等（不分大小寫）；空值為否。
+    其餘文字無法判斷，拋出 ValueError 並指出第幾筆資料。"""
+    if name not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    col = df[name]
+    if col.dtype == bool:
+        return col.to_numpy()
+    num = pd.to_numeric(col, errors="coerce")
+    out = num.fillna(0).to_numpy() != 0
+    is_text = (num.isna() & col.notna()).to_numpy()
+    if is_text.any():
+        text = col[is_text].astype(str).str.strip().str.lower()
+        yes, no = text.isin(_TRUE_TEXT), text.isin(_FALSE_TEXT)
+        bad = ~(yes | no)
+        if bad.any():
+            i = bad.idxmax()             # read_csv 的 chunk 索引接續整個檔案：i 為第 i+1 筆資料
+            raise ValueError(f"{name} 欄第 {i + 1} 筆資料（CSV 第 {i + 2} 行）無法判斷是／否：{col[i]!r}")
+        out[is_text] = yes.to_numpy()
+    return out
+
+def process_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """計算一個 chunk（在 worker process 內執行）。"""
+    out = df.copy()
+    if any(c in df.columns for c in ESTATE_COLUMNS):
+        taxable, tax_due, deductions = _calculator().calculate_estate_tax_batch(
+            _col(df, "total_assets", float),
+            _bool_col(df, "spouse"),
+            _col(df, "adult_children", int),
+            _col(df, "other_dependents", int),
+            _col(df, "disabled_people", int),
+            _col(df, "parents", int),
+        )
+        out["taxable_amount"] = taxable
+        out["estate_tax"] = tax_due
+        out["deductions"] = deductions
+    if any(c in df.columns for c in GIFT_COLUMNS):
+        net = np.maximum(0, _col(df, "gift_amount", np.int64) - EXEMPTION)
+        gift_tax, gift_rate = tax_calc_batch(net)
+        out["gift_net"] = net
+        out["gift_tax"] = gift_tax
+        out["gift_rate"] = gift_rate
+    return out
+
+def run(input_path: str, output_path: str, chunksize: int = 100_000, workers: int = 0,
+        log=sys.stderr) -> int:
+    """串流讀取 → process pool 計算 → 依原順序逐 chunk 寫出；同時在途的 chunk 數有上限，記憶體不隨檔案大小成長。"""
+    workers = workers or (os.cpu_count() or 1)
+    max_in_flight = workers * 2
+    total_rows, header = 0, True
+    t0 = time.perf_counter()
+
+    def _write(df: pd.DataFrame):
+        nonlocal total_rows, header
+        df.to_csv(output_path, mode="w" if header else "a", header=header, index=False,
+                  encoding="utf-8-sig" if header else "utf-8")
+        header = False
+        total_rows += len(df)
+        elapsed = time.perf_counter() - t0
+        print(f"{total_rows:,} rows  {total_rows / max(elapsed, 1e-9):,.0f} rows/sec", file=log)
+
+    reader = pd.read_csv(input_path, chunksize=chunksize, encoding="utf-8-sig")
+    if workers == 1:
+        for chunk in reader:
+            _write(process_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for chunk in reader:
+                pending.append(pool.submit(process_chunk, chunk))
+                if len(pending) >= max_in_flight:
+                    _write(pending.popleft().result())
+            while pending:
+                _write(pending.popleft().result())
+
+    elapsed = time.perf_counter() - t0
+    print(f"完成：{total_rows:,} rows，{elapsed:.2f}s，平均 {total_rows / max(elapsed, 1e-9):,.0f} rows/sec", file=log)
+    return total_rows
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="批次試算遺產稅／贈與稅（不需 streamlit）")
+    ap.add_argument("input", help="輸入 CSV")
+    ap.add_argument("output", help="輸出 CSV")
+    ap.add_argument("--chunksize", type=int, default=100_000, help="每個 chunk 的列數（預設 100000）")
+    ap.add_argument("--workers", type=int, default=0, help="worker process 數（預設 = CPU 數；1 = 不開 pool）")
+    args = ap.parse_args(argv)
+    try:
+        run(args.input, args.output, chunksize=args.chunksize, workers=args.workers)
+    except ValueError as e:
+        print(f"輸入錯誤：{e}", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
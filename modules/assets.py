@@ -0,0 +1,75 @@
+# modules/assets.py — Logo／favicon 解碼快取：process 共用，預先縮成顯示尺寸並存成精簡的 PNG bytes
+#
+# 第一次使用時找出候選檔、解碼、縮圖並編碼；之後每次 rerun 只查記憶體（無檔案 I/O、無解碼）。
+# 每隔 RECHECK_SECONDS 才重新 stat 候選檔：檔案新增、刪除或 mtime 改變時重建。
+import io, threading, time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+RECHECK_SECONDS = 30.0
+PIXEL_RATIO = 2             # 以 2 倍像素輸出，高解析度螢幕上不會糊
+
+@dataclass(frozen=True)
+class ImageAsset:
+    data: bytes             # PNG
+    width: int              # 顯示寬度（px）
+    height: int             # 顯示高度（px）
+    path: Path
+    mtime_ns: int
+
+def _resolve(assets_dir: Path, candidates: Sequence[str]) -> Optional[Tuple[Path, int]]:
+    for name in candidates:
+        p = assets_dir / name
+        try:
+            return p, p.stat().st_mtime_ns
+        except OSError:
+            continue
+    return None
+
+def _encode(path: Path, mtime_ns: int, height: int, min_width: int) -> Optional[ImageAsset]:
+    from PIL import Image
+    try:
+        with Image.open(path) as img:
+            img.load()
+            w, h = img.size
+            disp_w = max(min_width, int(w * (height / max(1, h))))
+            disp_h = max(1, round(h * disp_w / max(1, w)))
+            px = (disp_w * PIXEL_RATIO, disp_h * PIXEL_RATIO)
+            if px[0] < w:                          # 只縮不放大
+                img = img.resize(px, Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format="PNG", optimize=True)
+    except Exception:
+        return None
+    return ImageAsset(buf.getvalue(), disp_w, disp_h, path, mtime_ns)
+
+class AssetCache:
+    """(目錄, 候選檔名, 顯示尺寸) → ImageAsset；找不到或無法解碼時回傳 None。"""
+    def __init__(self, recheck_seconds: float = RECHECK_SECONDS):
+        self.recheck_seconds = recheck_seconds
+        self._lock = threading.Lock()
+        # key -> (上次檢查時間, 解析到的 (路徑, mtime), 結果)
+        self._entries: Dict[tuple, Tuple[float, Optional[Tuple[Path, int]], Optional[ImageAsset]]] = {}
+
+    def image(self, assets_dir: Path, candidates: Sequence[str], height: int,
+              min_width: int = 0) -> Optional[ImageAsset]:
+        key = (str(assets_dir), tuple(candidates), height, min_width)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] < self.recheck_seconds:
+            return entry[2]
+        found = _resolve(Path(assets_dir), candidates)
+        if entry is not None and entry[1] == found:
+            asset = entry[2]
+        else:
+            asset = _encode(found[0], found[1], height, min_width) if found else None
+        with self._lock:
+            self._entries[key] = (now, found, asset)
+        return asset
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+ASSET_CACHE = AssetCache()
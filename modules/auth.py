@@ -0,0 +1,161 @@
+# modules/auth.py — 登入驗證：使用者索引（帳號／姓名，不分大小寫）、限流的 bcrypt 驗證、節流與延遲統計
+import threading, time
+from datetime import datetime
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import bcrypt
+
+from modules.perf import LatencyRecorder
+
+BCRYPT_WORKERS = 4            # 同時進行的 bcrypt 驗證上限
+BCRYPT_MAX_PENDING = 32       # 排隊中的驗證上限；超過直接回覆忙碌
+BCRYPT_TIMEOUT = 10.0         # 秒：等候驗證名額的上限
+MAX_FAILURES = 5              # 同一帳號在 FAILURE_WINDOW 內允許的失敗次數
+FAILURE_WINDOW = 5 * 60       # 秒
+LOCKOUT_SECONDS = 60          # 超過失敗次數後的冷卻時間
+
+class UserIndex:
+    """帳號鍵與顯示名稱的 case-folded 索引；secrets 來源不變就重複使用。"""
+    def __init__(self, users: Dict[str, Any], signature: Any = None):
+        self.users = users
+        self.signature = signature
+        self._by_key = {k.casefold(): k for k in users.keys()}
+        self._by_name: Dict[str, str] = {}
+        for k, info in users.items():
+            name = str(info.get("name", "")).strip().casefold()
+            if name:
+                self._by_name.setdefault(name, k)
+
+    def find(self, username_input: str) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """支援：帳號鍵或顯示名稱（皆不分大小寫）；帳號鍵優先。"""
+        u = (username_input or "").strip().casefold()
+        if not u: return None, None
+        key = self._by_key.get(u) or self._by_name.get(u)
+        if key is None:
+            return None, None
+        return key, self.users[key]
+
+_index_lock = threading.Lock()
+_index: Optional[UserIndex] = None
+
+def get_user_index(signature: Any, load_users: Callable[[], Dict[str, Any]]) -> UserIndex:
+    """回傳 signature 對應的索引。signature 為呼叫端提供的廉價變動訊號（例如 secrets 檔的 mtime），
+    以 == 比較；相同時直接回傳快取，不呼叫 load_users、也不走訪 users。變動時才載入並重建。"""
+    global _index
+    idx = _index
+    if idx is not None and idx.signature == signature:
+        return idx
+    with _index_lock:
+        if _index is None or _index.signature != signature:
+            _index = UserIndex(load_users(), signature)
+        return _index
+
+# ------------------------- 節流 -------------------------
+class LoginThrottle:
+    """每個帳號：同時只允許一個驗證進行；短時間內失敗過多則暫時鎖定。"""
+    def __init__(self, max_failures: int = MAX_FAILURES, window: float = FAILURE_WINDOW,
+                 lockout: float = LOCKOUT_SECONDS):
+        self.max_failures = max_failures
+        self.window = window
+        self.lockout = lockout
+        self._lock = threading.Lock()
+        self._failures: Dict[str, deque] = {}
+        self._locked_until: Dict[str, float] = {}
+        self._in_flight: set = set()
+
+    def acquire(self, key: str) -> Optional[str]:
+        """可以驗證時回傳 None，否則回傳錯誤訊息。"""
+        now = time.monotonic()
+        with self._lock:
+            if self._locked_until.get(key, 0) > now:
+                return "嘗試次數過多，請稍後再試"
+            if key in self._in_flight:
+                return "此帳號正在驗證中，請稍候"
+            self._in_flight.add(key)
+            return None
+
+    def release(self, key: str, ok: Optional[bool]):
+        """ok=None（忙碌／逾時）不計入失敗次數。"""
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight.discard(key)
+            if ok is None:
+                return
+            if ok:
+                self._failures.pop(key, None)
+                self._locked_until.pop(key, None)
+                return
+            q = self._failures.setdefault(key, deque())
+            q.append(now)
+            while q and q[0] < now - self.window:
+                q.popleft()
+            if len(q) >= self.max_failures:
+                self._locked_until[key] = now + self.lockout
+                q.clear()
+
+# ------------------------- bcrypt 驗證 -------------------------
+_workers = threading.BoundedSemaphore(BCRYPT_WORKERS)
+_pending = threading.BoundedSemaphore(BCRYPT_MAX_PENDING)
+THROTTLE = LoginThrottle()
+LOGIN_LATENCY = LatencyRecorder()
+
+def _check_password(pwd_plain: str, pwd_hash: str) -> bool:
+    try:
+        if pwd_hash is None: return False
+        return bcrypt.checkpw((pwd_plain or "").encode(), str(pwd_hash).strip().encode())
+    except Exception:
+        return False
+
+def verify_password(pwd_plain: str, pwd_hash: str) -> Optional[bool]:
+    """在呼叫端執行緒上同步驗證，呼叫端會阻塞到 bcrypt 完成（bcrypt 會釋放 GIL，不卡住其他 session）。
+
+    同時最多 BCRYPT_WORKERS 個驗證；排隊已滿或等候名額超過 BCRYPT_TIMEOUT 秒時回傳 None。
+    """
+    if not _pending.acquire(blocking=False):
+        return None
+    try:
+        if not _workers.acquire(timeout=BCRYPT_TIMEOUT):
+            return None
+        try:
+            return _check_password(pwd_plain, pwd_hash)
+        finally:
+            _workers.release()
+    finally:
+        _pending.release()
+
+def authenticate(index: UserIndex, username: str, password: str):
+    """回傳 (ok, key, info, error_message)；會記錄整體登入延遲。"""
+    t0 = time.perf_counter()
+    try:
+        key, info = index.find(username)
+        if not info:
+            return False, "", None, "查無此使用者（請確認輸入的「帳號」或「姓名」與 Secrets 一致）"
+        busy = THROTTLE.acquire(key)
+        if busy:
+            return False, key, info, busy
+        ok = None
+        try:
+            ok = verify_password(password, info.get("pwd_hash", ""))
+        finally:
+            THROTTLE.release(key, ok)
+        if ok is None:
+            return False, key, info, "系統忙碌，請稍後再試"
+        if not ok:
+            return False, key, info, "帳密錯誤"
+        return True, key, info, ""
+    finally:
+        LOGIN_LATENCY.record(time.perf_counter() - t0)
+
+def account_window_error(info: Dict[str, Any]) -> Optional[str]:
+    """start_date／end_date（YYYY-MM-DD）皆有設定時檢查是否在有效期間內；通過回傳 None。"""
+    s, e = info.get("start_date"), info.get("end_date")
+    if s and e:
+        try:
+            start_date = datetime.fromisoformat(s)
+            end_date = datetime.fromisoformat(e)
+        except Exception:
+            return "日期格式錯誤（YYYY-MM-DD）"
+        if not (start_date <= datetime.today() <= end_date):
+            return "權限尚未啟用或已過期"
+    return None
@@ -0,0 +1,96 @@
+# modules/charts.py — 遺產稅／家人總共取得曲線（plotly），圖表 JSON 依家庭組成與稅制版本快取
+#
+# 先以 calculate_estate_tax_batch 一次算完密集網格，再降採樣為「級距斷點 + 固定點數」：
+# 兩條曲線在斷點之間皆為直線，保留斷點即可精確重現形狀，JSON 也只有幾十個點。
+# 結果以 JSON 字串存在 FIG_CACHE（跨 session 共用）；同一字串還原的 Figure 另以 lru_cache 保留，
+# rerun 時兩層都命中，不再重算、也不再重跑 plotly 的 schema 驗證（約 20ms/張）。
+from functools import lru_cache
+from typing import TYPE_CHECKING, Sequence, Tuple
+
+from modules.taxcore.cache import RULE_VERSION, ResultCache, constants_key
+from modules.taxcore.estate import EstateTaxCalculator
+
+if TYPE_CHECKING:
+    import numpy as np
+    import plotly.graph_objects as go
+
+DENSE_POINTS = 4001       # 密集網格點數
+SAMPLE_POINTS = 41        # 降採樣後保留的等距點數（另加級距斷點）
+FIG_CACHE = ResultCache(maxsize=512, ttl_seconds=None)
+
+def _downsample(x: "np.ndarray", breakpoints: Sequence[float], n: int) -> "np.ndarray":
+    """密集網格中保留：等距 n 點 + 最接近各斷點的網格點（含兩端）。"""
+    import numpy as np
+    keep = np.linspace(0, len(x) - 1, n).round().astype(int)
+    bps = np.asarray([b for b in breakpoints if x[0] <= b <= x[-1]], dtype=float)
+    near = np.searchsorted(x, bps).clip(0, len(x) - 1)
+    return np.unique(np.concatenate([keep, near]))
+
+def _dense_with_breakpoints(lo: float, hi: float, breakpoints: Sequence[float]) -> "np.ndarray":
+    import numpy as np
+    inner = [b for b in breakpoints if lo < b < hi]
+    return np.unique(np.concatenate([np.linspace(lo, hi, DENSE_POINTS), inner]))
+
+def _estate_breakpoints(calc: EstateTaxCalculator, family: Tuple) -> list:
+    """以遺產總額表示的級距斷點（萬）：免稅額＋扣除額，再加各級上限。"""
+    c = calc.constants
+    start = c.EXEMPT_AMOUNT + float(calc.compute_deductions(*family))
+    return [start] + [start + u for u in calc.brackets.uppers if u != float("inf")]
+
+def _figure_json(x, tax, family_total, x_title: str, title: str) -> str:
+    import plotly.graph_objects as go
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x, y=family_total, name="家人總共取得（萬）", mode="lines"))
+    fig.add_trace(go.Scatter(x=x, y=tax, name="遺產稅（萬）", mode="lines", yaxis="y2"))
+    fig.update_layout(
+        title=title, xaxis_title=x_title, hovermode="x unified",
+        yaxis=dict(title="家人總共取得（萬）", tickformat=",d"),
+        yaxis2=dict(title="遺產稅（萬）", overlaying="y", side="right", tickformat=",d", showgrid=False),
+        legend=dict(orientation="h", y=-0.2), margin=dict(l=10, r=10, t=40, b=10),
+    )
+    return fig.to_json()
+
+def assets_curve_json(calc: EstateTaxCalculator, spouse: bool, adult_children: int, other_dependents: int,
+                      disabled_people: int, parents: int, max_assets: float,
+                      rule_version: str = RULE_VERSION, cache: ResultCache = FIG_CACHE) -> str:
+    """遺產稅與家人總共取得對「總資產」的曲線（0～max_assets 萬）。"""
+    family = (bool(spouse), int(adult_children), int(other_dependents), int(disabled_people), int(parents))
+    key = ("assets", rule_version, constants_key(calc.constants), family, float(max_assets))
+
+    def compute():
+        bps = _estate_breakpoints(calc, family)
+        x = _dense_with_breakpoints(0.0, float(max_assets), bps)
+        _, tax, _ = calc.calculate_estate_tax_batch(x, *family)
+        idx = _downsample(x, bps, SAMPLE_POINTS)
+        return _figure_json(x[idx], tax[idx], (x - tax)[idx], "總資產（萬）", "遺產稅與家人總共取得（依總資產）")
+    return cache.get_or_compute(key, compute)
+
+def premium_curve_json(calc: EstateTaxCalculator, total_assets: float, spouse: bool, adult_children: int,
+                       other_dependents: int, disabled_people: int, parents: int, gift: float = 0.0,
+                       claim_ratio: float = 1.5, claim_taxed: bool = False,
+                       rule_version: str = RULE_VERSION, cache: ResultCache = FIG_CACHE) -> str:
+    """固定總資產與提前贈與，遺產稅與家人總共取得對「保費」的曲線（理賠金 = 保費 × claim_ratio）。"""
+    family = (bool(spouse), int(adult_children), int(other_dependents), int(disabled_people), int(parents))
+    T, G = float(total_assets), float(gift)
+    key = ("premium", rule_version, constants_key(calc.constants), family, T, G,
+           round(float(claim_ratio), 6), bool(claim_taxed))
+
+    def compute():
+        k = (1.0 - claim_ratio) if claim_taxed else 1.0      # 遺產 = T − G − k·保費
+        hi = max(0.0, T - G)
+        bps = [(T - G - b) / k for b in _estate_breakpoints(calc, family)] if k else []
+        x = _dense_with_breakpoints(0.0, hi, bps)
+        claim = x * claim_ratio
+        estate = T - G - x + (claim if claim_taxed else 0.0)
+        _, tax, _ = calc.calculate_estate_tax_batch(estate, *family)
+        fam = estate - tax + G + (0.0 if claim_taxed else claim)
+        idx = _downsample(x, bps, SAMPLE_POINTS)
+        return _figure_json(x[idx], tax[idx], fam[idx], "保費（萬）",
+                            f"遺產稅與家人總共取得（依保費；總資產 {T:,.0f} 萬、提前贈與 {G:,.0f} 萬）")
+    return cache.get_or_compute(key, compute)
+
+@lru_cache(maxsize=64)
+def figure_from_json(fig_json: str) -> "go.Figure":
+    """快取中的 JSON → Figure（同一字串物件只驗證一次；呼叫端不可修改回傳的 Figure）。"""
+    import plotly.io as pio
+    return pio.from_json(fig_json)
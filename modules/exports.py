@@ -0,0 +1,238 @@
+# modules/exports.py — 下載／批次匯出：多工作表 CSV 與 XLSX，逐列串流寫出，結果依輸入雜湊快取
+#
+# 工作表的列由產生器提供，寫出時逐批（ROW_CHUNK 列）編碼後寫入檔案，不組出整張表：
+# 批次匯出上萬位客戶時記憶體維持固定。XLSX 直接以 zipfile 寫出最小 OOXML（inline 字串，
+# 不需 shared strings 表），不依賴 openpyxl／xlsxwriter。
+# UI 只在按下下載鈕時才產生內容（st.download_button(data=callable)），同一組輸入在 EXPORT_CACHE 命中。
+import csv, hashlib, io, zipfile
+from dataclasses import dataclass
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import escape
+
+from modules.taxcore.cache import ResultCache
+from modules.taxcore.estate import EstateTaxCalculator
+from modules.taxcore.rules import TaxRules, get_rules
+from modules.taxcore.scenarios import estate_scenarios
+from modules.taxcore.schedule import GiftSchedule
+
+ROW_CHUNK = 512
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MIME = {"csv": "text/csv", "xlsx": XLSX_MIME}
+EXPORT_CACHE = ResultCache(maxsize=64, ttl_seconds=30 * 60)   # 已產生的檔案（bytes）
+
+Row = Sequence[object]
+
+@dataclass(frozen=True)
+class Sheet:
+    name: str
+    columns: Tuple[str, ...]
+    rows: Callable[[], Iterable[Row]]      # 每次寫出時重新產生，不保留整張表
+
+def _chunks(rows: Iterable[Row]) -> Iterator[List[Row]]:
+    buf: List[Row] = []
+    for r in rows:
+        buf.append(r)
+        if len(buf) >= ROW_CHUNK:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+def _plain(v):
+    """numpy 純量 → Python 型別（csv／XML 輸出一致）。"""
+    return v.item() if hasattr(v, "item") else v
+
+# ---------------- CSV ----------------
+def write_csv(sheets: Sequence[Sheet], fp: IO[bytes]) -> None:
+    """UTF-8（含 BOM，Excel 可直接開）。多個工作表時，每段以「【名稱】」一列起頭、段與段之間空一列。"""
+    text = io.TextIOWrapper(fp, encoding="utf-8-sig", newline="", write_through=True)
+    w = csv.writer(text)
+    for i, sheet in enumerate(sheets):
+        if len(sheets) > 1:
+            if i:
+                w.writerow([])
+            w.writerow([f"【{sheet.name}】"])
+        w.writerow(sheet.columns)
+        for chunk in _chunks(sheet.rows()):
+            w.writerows([_plain(v) for v in r] for r in chunk)
+    text.detach()
+
+# ---------------- XLSX ----------------
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}</Types>'
+)
+_SHEET_TYPE = ('<Override PartName="/xl/worksheets/sheet{i}.xml" '
+               'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>')
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/></Relationships>'
+)
+_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="3" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+    '</styleSheet>'
+)
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+_BAD_NAME = str.maketrans({c: "_" for c in '[]:*?/\\'})
+
+def _cell(v, header: bool = False) -> str:
+    v = _plain(v)
+    if isinstance(v, int) and not isinstance(v, bool):
+        return f'<c s="2"><v>{v}</v></c>'                 # 千分位
+    if isinstance(v, float) and v == v and abs(v) != float("inf"):
+        return f"<c><v>{v!r}</v></c>"
+    style = ' s="1"' if header else ""
+    text = "" if v is None else escape(str(v))
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+def _row(values: Iterable[object], header: bool = False) -> str:
+    return "<row>" + "".join(_cell(v, header) for v in values) + "</row>"
+
+def _sheet_names(sheets: Sequence[Sheet]) -> List[str]:
+    names, seen = [], set()
+    for i, s in enumerate(sheets, 1):
+        name = (s.name.translate(_BAD_NAME) or f"Sheet{i}")[:31]
+        while name in seen:
+            name = f"{name[:28]}_{i}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+def write_xlsx(sheets: Sequence[Sheet], fp: IO[bytes]) -> None:
+    names = _sheet_names(sheets)
+    with zipfile.ZipFile(fp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="".join(_SHEET_TYPE.format(i=i) for i in range(1, len(sheets) + 1))))
+        zf.writestr("_rels/.rels", _ROOT_RELS)
+        zf.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="{escape(n)}" sheetId="{i}" r:id="rId{i}"/>' for i, n in enumerate(names, 1))
+            + "</sheets></workbook>"))
+        zf.writestr("xl/_rels/workbook.xml.rels", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                      f'relationships/worksheet" Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(sheets) + 1))
+            + f'<Relationship Id="rId{len(sheets) + 1}" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+              'relationships/styles" Target="styles.xml"/></Relationships>'))
+        zf.writestr("xl/styles.xml", _STYLES)
+        for i, sheet in enumerate(sheets, 1):
+            with zf.open(f"xl/worksheets/sheet{i}.xml", "w") as out:   # 逐批串流寫入 zip 成員
+                out.write((_SHEET_HEAD + _row(sheet.columns, header=True)).encode())
+                for chunk in _chunks(sheet.rows()):
+                    out.write("".join(_row(r) for r in chunk).encode())
+                out.write(_SHEET_TAIL.encode())
+
+WRITERS: Dict[str, Callable[[Sequence[Sheet], IO[bytes]], None]] = {"csv": write_csv, "xlsx": write_xlsx}
+
+def write_export(sheets: Sequence[Sheet], fmt: str, fp: IO[bytes]) -> None:
+    try:
+        writer = WRITERS[fmt]
+    except KeyError:
+        raise ValueError(f"不支援的匯出格式：{fmt}（可用：{', '.join(WRITERS)}）") from None
+    writer(sheets, fp)
+
+# ---------------- 依輸入雜湊快取（UI 下載） ----------------
+def input_key(*parts) -> str:
+    """輸入內容的雜湊（parts 需為 repr 穩定的基本型別／tuple）。"""
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+def export_bytes(fmt: str, key: str, sheets: Callable[[], Sequence[Sheet]],
+                 cache: Optional[ResultCache] = None) -> bytes:
+    def build() -> bytes:
+        buf = io.BytesIO()
+        write_export(sheets(), fmt, buf)
+        return buf.getvalue()
+    return (cache or EXPORT_CACHE).get_or_compute((fmt, key), build)
+
+def lazy_export(fmt: str, key: str, sheets: Callable[[], Sequence[Sheet]]) -> Callable[[], bytes]:
+    """給 st.download_button(data=...) 的無參數 callable：按下下載時才產生（或取快取）。"""
+    return lambda: export_bytes(fmt, key, sheets)
+
+# ---------------- 工作表 ----------------
+def table_sheet(name: str, table: Dict[str, Sequence[object]]) -> Sheet:
+    """欄名 → 欄值（GiftSchedule.years_table() 等）轉成工作表。"""
+    cols = tuple(table)
+    return Sheet(name, cols, lambda: zip(*(table[c] for c in cols)))
+
+def estate_scenario_sheet(scenarios: Sequence[Tuple[str, float, float]], name: str = "遺產稅情境") -> Sheet:
+    return Sheet(name, ("情境", "遺產稅（萬）", "家人總共取得（萬）"),
+                 lambda: ((label, int(t), int(n)) for label, t, n in scenarios))
+
+def gift_schedule_sheets(schedule: GiftSchedule) -> List[Sheet]:
+    return [table_sheet("年度明細", schedule.years_table()),
+            table_sheet("現金贈與逐年稅額", schedule.cash_gift_table())]
+
+@dataclass(frozen=True)
+class ClientInput:
+    """批次匯出的一位客戶（遺產：萬；保單：元）。"""
+    name: str
+    total_assets: float
+    spouse: bool = False
+    adult_children: int = 0
+    other_dependents: int = 0
+    disabled_people: int = 0
+    parents: int = 0
+    premium: float = 0
+    claim: float = 0
+    gift: float = 0
+    premiums: Tuple[int, ...] = ()
+    cash_values: Tuple[int, ...] = ()
+    change_year: int = 1
+
+def batch_sheets(clients: Callable[[], Iterable[ClientInput]], calc: EstateTaxCalculator,
+                 rules: Optional[TaxRules] = None) -> List[Sheet]:
+    """多位客戶：遺產稅情境＋保單贈與排程兩個工作表，每位客戶逐列展開。
+
+    clients 為可重複呼叫的來源（例如逐列讀檔的產生器函式）；每個工作表各走訪一次，不保留全部客戶。
+    """
+    rules = rules or get_rules()
+
+    def scenario_rows():
+        for c in clients():
+            for label, t, n in estate_scenarios(calc, c.total_assets, c.spouse, c.adult_children,
+                                                c.other_dependents, c.disabled_people, c.parents,
+                                                c.premium, c.claim, c.gift):
+                yield c.name, label, int(t), int(n)
+
+    def schedule_rows():
+        for c in clients():
+            if not c.premiums:
+                continue
+            s = GiftSchedule(c.premiums, c.cash_values, c.change_year, rules=rules)
+            policy = s.policy_gift()
+            for y in range(s.years):
+                in_cash = y < s.change_year
+                yield (c.name, y + 1, int(s.premiums[y]), int(s.cumulative[y]), int(s.cash_values[y]),
+                       int(s.tax[y]) if in_cash else "", int(policy["tax"]) if y + 1 == s.change_year else "")
+
+    return [
+        Sheet("遺產稅情境", ("客戶", "情境", "遺產稅（萬）", "家人總共取得（萬）"), scenario_rows),
+        Sheet("贈與排程", ("客戶", "年度", "每年投入（元）", "累計投入（元）", "年末現金價值（元）",
+                           "現金贈與稅（元）", "保單變更當年贈與稅（元）"), schedule_rows),
+    ]
+
+def write_batch(clients: Callable[[], Iterable[ClientInput]], fmt: str, fp: IO[bytes],
+                calc: EstateTaxCalculator, rules: Optional[TaxRules] = None) -> None:
+    write_export(batch_sheets(clients, calc, rules), fmt, fp)
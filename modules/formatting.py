@@ -0,0 +1,81 @@
+# modules/formatting.py — 表格數字格式化（整欄向量化＋依資料內容快取）
+# 取代逐格 lambda：千分位字串由 numpy 一次組出整欄，同一份資料再次格式化時直接取快取。
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+from modules.taxcore.cache import ResultCache
+
+NA_TEXT = "—"
+FMT_CACHE = ResultCache(maxsize=256, ttl_seconds=None)   # 欄位數量級，不是列數
+
+_COMMA = ord(",")
+_GROUP_LUT = np.array([[ord(c) for c in f"{i:03d}"] for i in range(1000)], dtype=np.uint32)   # 000..999 的 UCS-4 碼
+
+def _thousands(a: np.ndarray) -> np.ndarray:
+    """非負 int64 陣列 → 千分位字串陣列（'U'）。
+
+    每三位一組查表填入 UCS-4 矩陣 "ddd,ddd,ddd"，直接 view 成 numpy 字串後去掉前導的 0 與逗號。
+    """
+    n = len(a)
+    if n == 0:
+        return np.array([], dtype="U1")
+    groups = max(1, -(-len(str(int(a.max()))) // 3))
+    body = np.full((n, groups, 4), _COMMA, dtype=np.uint32)
+    rest = a.copy()
+    for k in range(groups - 1, -1, -1):
+        body[:, k, :3] = _GROUP_LUT[rest % 1000]
+        rest //= 1000
+    width = groups * 4 - 1
+    s = np.ascontiguousarray(body.reshape(n, groups * 4)[:, :width]).view(f"U{width}").ravel()
+    return np.where(a == 0, "0", np.char.lstrip(s, "0,"))
+
+def format_numbers(values, suffix: str = "", rounding: str = "round", na: str = NA_TEXT) -> np.ndarray:
+    """數值陣列 → 千分位字串（object 陣列）。
+
+    rounding="round" 等同 f"{x:,.0f}"（四捨六入五成雙），"trunc" 等同 f"{int(x):,}"；NaN → na。
+    """
+    v = np.asarray(values, dtype=float)
+    isna = np.isnan(v)
+    r = np.trunc(v) if rounding == "trunc" else np.rint(v)
+    r = np.where(isna, 0, r).astype(np.int64)
+    neg = (r < 0) | ((r == 0) & np.signbit(v) & ~isna & (rounding != "trunc"))   # 與 f"{-0.4:,.0f}" == "-0" 一致
+    s = _thousands(np.abs(r))
+    if neg.any():
+        s = np.where(neg, np.char.add("-", s), s)
+    if suffix:
+        s = np.char.add(s, suffix)
+    s = s.astype(object)
+    if isna.any():
+        s[isna] = na
+    return s
+
+def _data_key(s: pd.Series, *extra) -> tuple:
+    arr = s.to_numpy()
+    if arr.dtype == object:
+        payload = pd.util.hash_pandas_object(s, index=False).to_numpy().tobytes()
+    else:
+        payload = np.ascontiguousarray(arr).tobytes()
+    return (str(arr.dtype), len(arr), hashlib.blake2b(payload, digest_size=16).digest()) + extra
+
+def fmt_column(s: pd.Series, suffix: str = "", rounding: str = "round", na: str = NA_TEXT) -> pd.Series:
+    """整欄格式化；結果依欄位內容雜湊快取（index 沿用輸入）。"""
+    key = _data_key(s, "num", suffix, rounding, na)
+    values = FMT_CACHE.get_or_compute(key, lambda: format_numbers(pd.to_numeric(s, errors="coerce"),
+                                                                 suffix=suffix, rounding=rounding, na=na))
+    return pd.Series(values, index=s.index, name=s.name, dtype=object)
+
+def fmt_table(df: pd.DataFrame, na: str = NA_TEXT, numeric_threshold: float = 0.5,
+              rounding: str = "trunc") -> pd.DataFrame:
+    """多數為數值的欄位 → 千分位整數字串；其餘欄位轉字串（缺值 → na）。"""
+    out = pd.DataFrame(index=df.index)
+    for col in df.columns:
+        s = df[col]
+        s_num = s if pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) \
+            else pd.to_numeric(s, errors="coerce")
+        if len(s_num) and s_num.notna().mean() >= numeric_threshold:
+            out[col] = fmt_column(s_num, rounding=rounding, na=na)
+        else:
+            out[col] = pd.Series(np.where(s.notna(), s.astype(str), na), index=s.index, dtype=object)
+    return out
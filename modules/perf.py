@@ -0,0 +1,157 @@
+# modules/perf.py — 每次 rerun 的區段計時（span）：依 session／區段統計 p50/p95/p99，可選擇寫入 JSONL
+#
+# 開關：環境變數 APP_PERF=1（預設關閉；關閉時 span() 回傳共用的空 context manager，幾乎零成本）
+# JSONL：APP_PERF_JSONL=/path/to/spans.jsonl（每個 span 一行，供離線分析）
+# session：記錄時由 streamlit 的 ScriptRunContext 取得（fragment rerun 在別的執行緒上執行，thread-local 不可靠）；
+# 不在 streamlit 執行緒上（基準測試、API）時才用 set_session() 設定的值。
+import json, os, threading, time
+from collections import OrderedDict, deque
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+ENABLED = _env_flag("APP_PERF")
+JSONL_PATH: Optional[str] = os.environ.get("APP_PERF_JSONL") or None
+MAX_SAMPLES = 2000          # 每個區段保留的最近樣本數
+MAX_SESSIONS = 500          # 保留統計的 session 數（LRU）
+
+class LatencyRecorder:
+    """保留最近 N 筆耗時（秒），計算百分位數。"""
+    def __init__(self, maxlen: int = MAX_SAMPLES):
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=maxlen)
+        self.count = 0
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            data = sorted(self._samples)
+            count = self.count
+        if not data:
+            return {"count": count, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        q = lambda p: data[min(len(data) - 1, int(p * len(data)))] * 1000
+        return {"count": count, "p50_ms": q(0.50), "p95_ms": q(0.95), "p99_ms": q(0.99), "max_ms": data[-1] * 1000}
+
+class _Store:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sections: Dict[str, LatencyRecorder] = {}
+        self.sessions: "OrderedDict[str, Dict[str, LatencyRecorder]]" = OrderedDict()
+        self._jsonl = None
+
+    def record(self, session_id: str, section: str, seconds: float):
+        with self._lock:
+            rec = self.sections.get(section)
+            if rec is None:
+                rec = self.sections[section] = LatencyRecorder()
+            per = self.sessions.get(session_id)
+            if per is None:
+                per = self.sessions[session_id] = {}
+                while len(self.sessions) > MAX_SESSIONS:
+                    self.sessions.popitem(last=False)
+            else:
+                self.sessions.move_to_end(session_id)
+            srec = per.get(section)
+            if srec is None:
+                srec = per[section] = LatencyRecorder(maxlen=200)
+            if JSONL_PATH:
+                self._write_jsonl(session_id, section, seconds)
+        rec.record(seconds)
+        srec.record(seconds)
+
+    def _write_jsonl(self, session_id: str, section: str, seconds: float):
+        if self._jsonl is None or self._jsonl.name != JSONL_PATH:
+            if self._jsonl is not None:
+                self._jsonl.close()
+            self._jsonl = open(JSONL_PATH, "a", encoding="utf-8", buffering=1)
+        self._jsonl.write(json.dumps(
+            {"ts": round(time.time(), 3), "session": session_id, "section": section, "ms": round(seconds * 1000, 3)},
+            ensure_ascii=False) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self.sections.clear()
+            self.sessions.clear()
+
+_STORE = _Store()
+_local = threading.local()
+
+def configure(enabled: Optional[bool] = None, jsonl_path: Optional[str] = "") -> None:
+    """執行期切換；jsonl_path=None 代表關閉 JSONL 輸出，"" 代表不變更。"""
+    global ENABLED, JSONL_PATH
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if jsonl_path != "":
+        JSONL_PATH = jsonl_path
+
+def set_session(session_id: str) -> None:
+    """無 ScriptRunContext 時的後備：之後同一執行緒的 span 都歸到這個 session。"""
+    _local.session_id = session_id
+
+_get_ctx = None
+
+def current_session() -> str:
+    global _get_ctx
+    if _get_ctx is None:
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            _get_ctx = lambda: get_script_run_ctx(suppress_warning=True)
+        except ImportError:
+            _get_ctx = lambda: None
+    ctx = _get_ctx()
+    return ctx.session_id if ctx is not None else getattr(_local, "session_id", "-")
+
+class _Span:
+    __slots__ = ("name", "t0")
+    def __init__(self, name: str):
+        self.name = name
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+    def __exit__(self, *exc):
+        _STORE.record(current_session(), self.name, time.perf_counter() - self.t0)
+        return False
+
+class _NoopSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NOOP = _NoopSpan()
+
+def span(name: str):
+    """with span("estate.scenarios"): ...  — 關閉時回傳共用的空 context manager。"""
+    return _Span(name) if ENABLED else _NOOP
+
+def timed(name: str):
+    """函式版 span。"""
+    def deco(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+def summary(session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """各區段統計（全部 session 或指定 session），依 p95 由大到小排序。"""
+    with _STORE._lock:
+        src = _STORE.sections if session_id is None else _STORE.sessions.get(session_id, {})
+        items = list(src.items())
+    rows = [dict(section=name, **rec.snapshot()) for name, rec in items]
+    return sorted(rows, key=lambda r: r["p95_ms"], reverse=True)
+
+def session_ids() -> List[str]:
+    with _STORE._lock:
+        return list(reversed(_STORE.sessions.keys()))
+
+def reset() -> None:
+    _STORE.reset()
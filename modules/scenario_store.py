@@ -0,0 +1,161 @@
+# modules/scenario_store.py — 客戶情境庫：依登入帳號保存兩個模組的輸入與預先算好的結果（SQLite，與 sessions.db 同目錄）
+#
+# 一位客戶一列：inputs／results 為 JSON（estate、cvgift），rule_version 記錄結果所用的稅制版本。
+# 索引：(owner, client) 唯一、(owner, updated_at)、(rule_version)；載入單一客戶或整份客戶清單都只要一次查詢，
+# 清單直接讀預先算好的結果，不重算。稅制變動時 recompute() 依 rule_version 找出過期的列，
+# 每批 RECOMPUTE_BATCH 列以向量化計算（estate_scenarios_batch）後一次寫回。
+import json, time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from modules.session_registry import PooledSQLite, RegistryStats
+from modules.taxcore.estate import EstateTaxCalculator, TaxConstants
+from modules.taxcore.rules import TaxRules, get_rules
+from modules.taxcore.scenarios import SCENARIO_LABELS, estate_scenarios_batch
+from modules.taxcore.schedule import GiftSchedule
+
+RECOMPUTE_BATCH = 500
+DEFAULT_LIST_LIMIT = 1000
+
+ESTATE_DEFAULTS: Dict[str, Any] = {
+    "total": 5000, "spouse": False, "adult_children": 0, "other_dependents": 0, "disabled_people": 0,
+    "parents": 0, "premium": 0, "claim": 0, "gift": 0, "claim_locked": False,
+}
+
+_SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    owner        TEXT NOT NULL,
+    client       TEXT NOT NULL,
+    rule_version TEXT NOT NULL,
+    inputs       TEXT NOT NULL,
+    results      TEXT NOT NULL,
+    updated_at   INTEGER NOT NULL,
+    PRIMARY KEY (owner, client)
+)"""
+_SQL_CREATE_IDX_UPDATED = "CREATE INDEX IF NOT EXISTS idx_scenarios_owner_updated ON scenarios(owner, updated_at DESC)"
+_SQL_CREATE_IDX_RULE = "CREATE INDEX IF NOT EXISTS idx_scenarios_rule ON scenarios(rule_version)"
+_SQL_UPSERT = """
+INSERT INTO scenarios(owner, client, rule_version, inputs, results, updated_at)
+VALUES(?,?,?,?,?,?)
+ON CONFLICT(owner, client) DO UPDATE SET
+    rule_version=excluded.rule_version, inputs=excluded.inputs,
+    results=excluded.results, updated_at=excluded.updated_at
+"""
+_SQL_GET = "SELECT client, rule_version, inputs, results, updated_at FROM scenarios WHERE owner=? AND client=?"
+_SQL_LIST = ("SELECT client, rule_version, inputs, results, updated_at FROM scenarios "
+             "WHERE owner=? ORDER BY updated_at DESC LIMIT ?")
+_SQL_DELETE = "DELETE FROM scenarios WHERE owner=? AND client=?"
+_SQL_STALE = "SELECT rowid, inputs FROM scenarios WHERE rule_version<>? LIMIT ?"
+_SQL_STALE_OWNER = "SELECT rowid, inputs FROM scenarios WHERE rule_version<>? AND owner=? LIMIT ?"
+_SQL_COUNT_STALE = "SELECT COUNT(*) FROM scenarios WHERE rule_version<>?"
+_SQL_COUNT_STALE_OWNER = "SELECT COUNT(*) FROM scenarios WHERE rule_version<>? AND owner=?"
+_SQL_UPDATE_RESULTS = "UPDATE scenarios SET rule_version=?, results=? WHERE rowid=?"
+
+@dataclass
+class SavedScenario:
+    client: str
+    rule_version: str
+    inputs: Dict[str, Any]            # {"estate": {...}, "cvgift": {...}}
+    results: Dict[str, Any]
+    updated_at: int
+
+# ---------------- 結果計算（儲存與重算共用） ----------------
+def compute_results_batch(inputs: Sequence[Dict[str, Any]], rules: Optional[TaxRules] = None) -> List[Dict[str, Any]]:
+    """多位客戶一次計算：遺產稅五種情境走向量化批次，保單排程逐位建立 GiftSchedule。"""
+    import numpy as np
+    rules = rules or get_rules()
+    if not inputs:
+        return []
+    calc = EstateTaxCalculator(TaxConstants.from_rules(rules))
+    est = [{**ESTATE_DEFAULTS, **(i.get("estate") or {})} for i in inputs]
+    col = {k: np.array([e[k] for e in est]) for k in ESTATE_DEFAULTS if k != "claim_locked"}
+    taxable, tax, _ = calc.calculate_estate_tax_batch(col["total"], col["spouse"], col["adult_children"],
+                                                      col["other_dependents"], col["disabled_people"], col["parents"])
+    s_tax, s_net = estate_scenarios_batch(calc, col["total"], col["spouse"], col["adult_children"],
+                                          col["other_dependents"], col["disabled_people"], col["parents"],
+                                          col["premium"], col["claim"], col["gift"])
+    out = []
+    for k, i in enumerate(inputs):
+        best = int(np.argmax(s_net[k]))
+        res: Dict[str, Any] = {"estate": {
+            "taxable": float(taxable[k]), "tax": float(tax[k]),
+            "scenarios": [[label, float(s_tax[k, j]), float(s_net[k, j])] for j, label in enumerate(SCENARIO_LABELS)],
+            "best": SCENARIO_LABELS[best], "best_family_total": float(s_net[k, best]),
+        }}
+        cv = i.get("cvgift")
+        if cv and cv.get("premiums"):
+            s = GiftSchedule(cv["premiums"], cv["cash_values"], int(cv.get("change_year", 1)), rules=rules)
+            policy = s.policy_gift()
+            res["cvgift"] = {"nominal": s.nominal_transfer(), "policy_gift": int(policy["gift"]),
+                             "policy_tax": int(policy["tax"]), "cash_tax": s.cash_gift_tax(),
+                             "saving": s.cash_gift_tax() - int(policy["tax"])}
+        out.append(res)
+    return out
+
+def _row(r) -> SavedScenario:
+    return SavedScenario(r[0], r[1], json.loads(r[2]), json.loads(r[3]), r[4])
+
+class ScenarioStore(PooledSQLite):
+    """(登入帳號, 客戶) → 輸入＋結果。每位顧問只看得到自己的客戶。"""
+    SCHEMA = (_SQL_CREATE, _SQL_CREATE_IDX_UPDATED, _SQL_CREATE_IDX_RULE)
+
+    def __init__(self, db_path: str, **kwargs):
+        kwargs.setdefault("stats", RegistryStats())       # 與 session 登入的競爭計數分開
+        super().__init__(db_path, **kwargs)
+
+    def save(self, owner: str, client: str, inputs: Dict[str, Any],
+             rules: Optional[TaxRules] = None) -> SavedScenario:
+        rules = rules or get_rules()
+        client = client.strip()
+        if not client:
+            raise ValueError("請輸入客戶名稱")
+        results = compute_results_batch([inputs], rules)[0]
+        now = int(time.time())
+        with self._connect() as conn:
+            conn.execute(_SQL_UPSERT, (owner, client, rules.version, json.dumps(inputs, ensure_ascii=False),
+                                       json.dumps(results, ensure_ascii=False), now))
+            conn.commit()
+        return SavedScenario(client, rules.version, inputs, results, now)
+
+    def load(self, owner: str, client: str) -> Optional[SavedScenario]:
+        with self._connect() as conn:
+            r = conn.execute(_SQL_GET, (owner, client)).fetchone()
+        return _row(r) if r else None
+
+    def list_clients(self, owner: str, limit: int = DEFAULT_LIST_LIMIT) -> List[SavedScenario]:
+        """最近更新的在前；結果為儲存時（或最近一次重算）預先算好的值。"""
+        with self._connect() as conn:
+            rows = conn.execute(_SQL_LIST, (owner, limit)).fetchall()
+        return [_row(r) for r in rows]
+
+    def delete(self, owner: str, client: str):
+        with self._connect() as conn:
+            conn.execute(_SQL_DELETE, (owner, client))
+            conn.commit()
+
+    def count_stale(self, rules: Optional[TaxRules] = None, owner: Optional[str] = None) -> int:
+        version = (rules or get_rules()).version
+        with self._connect() as conn:
+            if owner is None:
+                return conn.execute(_SQL_COUNT_STALE, (version,)).fetchone()[0]
+            return conn.execute(_SQL_COUNT_STALE_OWNER, (version, owner)).fetchone()[0]
+
+    def recompute(self, rules: Optional[TaxRules] = None, owner: Optional[str] = None,
+                  batch: int = RECOMPUTE_BATCH) -> int:
+        """把 rule_version 與 rules 不同的列以 rules 重算（owner=None：全部帳號），回傳重算筆數。"""
+        rules = rules or get_rules()
+        done = 0
+        while True:
+            with self._connect() as conn:
+                if owner is None:
+                    rows = conn.execute(_SQL_STALE, (rules.version, batch)).fetchall()
+                else:
+                    rows = conn.execute(_SQL_STALE_OWNER, (rules.version, owner, batch)).fetchall()
+                if not rows:
+                    return done
+                results = compute_results_batch([json.loads(r[1]) for r in rows], rules)
+                conn.executemany(_SQL_UPDATE_RESULTS, [
+                    (rules.version, json.dumps(res, ensure_ascii=False), r[0]) for r, res in zip(rows, results)
+                ])
+                conn.commit()
+            done += len(rows)
@@ -0,0 +1,140 @@
+# modules/session_memory.py — 每個 session（依模組分列）的記憶體估算、精簡的型別化狀態、每個 process 的 session 上限
+#
+# 估算方式：每次 rerun 結束時走訪該 session 的 st.session_state，依鍵名歸到模組（MODULE_KEYS），
+# 以 deep_sizeof 估算（numpy 連同底層緩衝區、DataFrame 取 memory_usage(deep=True)，共用物件只算一次）。
+# 上限：APP_MAX_SESSIONS（0 或未設定＝不限制）；已關閉的 session 依 streamlit Runtime 判斷，
+# 取不到 Runtime（如 AppTest）時以 IDLE_SECONDS 未活動視為離開。
+import os, re, sys, threading, time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+IDLE_SECONDS = 30 * 60
+MAX_SESSIONS = int(os.environ.get("APP_MAX_SESSIONS", "0") or 0)
+
+# 鍵名 → 模組（依序比對；widget 的 key 必須留在 session_state，只能依鍵名歸類）
+MODULE_KEYS: List[Tuple[str, "re.Pattern[str]"]] = [
+    ("app", re.compile(r"^(auth|auth_notice|perf_scope)$")),
+    ("estate", re.compile(r"^(estate_|premium_case$|claim_case$|case_gift$|show_(optimizer|curves|succession|projection)$"
+                          r"|opt_|succ_|proj_)")),
+    ("cvgift", re.compile(r"^(cv_|n_years$|change_year$|y\d+_(prem|cv)$|plan_|show_gift_plan$)")),
+    ("clients", re.compile(r"^(client_|show_clients$)")),
+]
+MODULES = tuple(name for name, _ in MODULE_KEYS) + ("other",)
+
+# ---------------- 型別化狀態（取代零散的非 widget 鍵） ----------------
+@dataclass(slots=True)
+class AuthState:
+    authenticated: bool = False
+    username: str = ""
+    name: str = ""
+    session_id: str = ""
+    end_date: str = ""
+    role: str = ""
+
+    @property
+    def is_admin(self) -> bool:
+        return self.authenticated and self.role.lower() == "admin"
+
+@dataclass(slots=True)
+class EstateState:
+    premium_basis: Optional[int] = None     # 預設保費的計算基準（遺產稅額改變時重設保費／理賠金）
+    claim_locked: bool = False              # 使用者手動改過理賠金後，不再跟著保費同步
+
+# ---------------- 大小估算 ----------------
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    mod = type(obj).__module__
+    if mod.startswith("pandas") and hasattr(obj, "memory_usage"):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if mod == "numpy" and hasattr(obj, "nbytes"):
+        return sys.getsizeof(obj) + (deep_sizeof(obj.base, seen) if obj.base is not None else 0)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sum(deep_sizeof(x, seen) for x in obj)
+    if hasattr(obj, "__dict__"):
+        size += deep_sizeof(vars(obj), seen)
+    for name in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, name):
+            size += deep_sizeof(getattr(obj, name), seen)
+    return size
+
+def module_of(key: str) -> str:
+    for module, pattern in MODULE_KEYS:
+        if pattern.match(key):
+            return module
+    return "other"
+
+def footprint(items: Iterable[Tuple[str, Any]]) -> Dict[str, int]:
+    """(鍵, 值) → 各模組位元組數（同一物件被多個鍵引用時只算一次）。"""
+    out: Dict[str, int] = {}
+    seen: set = set()
+    for key, value in items:
+        m = module_of(str(key))
+        out[m] = out.get(m, 0) + deep_sizeof(key, seen) + deep_sizeof(value, seen)
+    return out
+
+# ---------------- process 層級登記 ----------------
+def _runtime_active(session_id: str) -> Optional[bool]:
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance().is_active_session(session_id) if Runtime.exists() else None
+    except Exception:
+        return None
+
+class SessionMemory:
+    """session_id → (最後活動時間, 使用者, 各模組位元組數)。thread-safe，process 共用。"""
+    def __init__(self, max_sessions: int = MAX_SESSIONS, idle_seconds: float = IDLE_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Tuple[float, str, Dict[str, int]]] = {}
+        self.rejected = 0
+
+    def _prune(self, now: float):
+        for sid, (seen_at, _, _) in list(self._sessions.items()):
+            active = _runtime_active(sid)
+            if active is False or (active is None and now - seen_at > self.idle_seconds):
+                del self._sessions[sid]
+
+    def admit(self, session_id: str) -> bool:
+        """已登記或未達上限 → 登記並回傳 True；否則回傳 False（呼叫端應停止此次 rerun）。"""
+        now = time.monotonic()
+        with self._lock:
+            if session_id in self._sessions:
+                return True
+            if self.max_sessions > 0 and len(self._sessions) >= self.max_sessions:
+                self._prune(now)
+                if len(self._sessions) >= self.max_sessions:
+                    self.rejected += 1
+                    return False
+            self._sessions[session_id] = (now, "", {})
+            return True
+
+    def record(self, session_id: str, user: str, items: Iterable[Tuple[str, Any]]) -> Dict[str, int]:
+        sizes = footprint(items)
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic(), user, sizes)
+        return sizes
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            rows = [{"session": sid[:8], "user": user, **sizes, "total": sum(sizes.values())}
+                    for sid, (_, user, sizes) in self._sessions.items()]
+        modules: Dict[str, int] = {}
+        for r in rows:
+            for m in MODULES:
+                modules[m] = modules.get(m, 0) + r.get(m, 0)
+        return {"sessions": len(rows), "max_sessions": self.max_sessions, "rejected": self.rejected,
+                "total_bytes": sum(r["total"] for r in rows), "modules": modules,
+                "rows": sorted(rows, key=lambda r: r["total"], reverse=True)}
+
+SESSION_MEMORY = SessionMemory()
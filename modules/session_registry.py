@@ -1,54 +1,292 @@
 # modules/session_registry.py
-import sqlite3, time, os
+import sqlite3, time, os, queue, threading, atexit
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Iterable, Optional, Tuple
 
 DEFAULT_TTL_SECONDS = 2 * 60 * 60  # 2 hours
+DEFAULT_POOL_SIZE = 8
+DEFAULT_BUSY_TIMEOUT_MS = 5000
+DEFAULT_FLUSH_INTERVAL = 15          # 秒：last_seen 批次寫回間隔
+DEFAULT_CLEANUP_INTERVAL = 5 * 60    # 秒：背景清除過期 session 間隔
+SLOW_OP_MS = 20                      # 單次操作超過此時間視為等待鎖（WAL 下正常寫入約 0.1 ms）
+# SQL 固定為模組常數：同一條連線上重複執行時會命中 sqlite3 的 prepared statement 快取
+# （預設容量 128 條；session 與情境庫的固定 SQL 約 20 條，使用預設值即可）
+_SQL_CREATE = """
+CREATE TABLE IF NOT EXISTS sessions (
+    username  TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    last_seen  INTEGER NOT NULL
+)"""
+_SQL_CREATE_IDX = "CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions(last_seen)"
+_SQL_UPSERT = """
+INSERT INTO sessions(username, session_id, last_seen)
+VALUES(?,?,?)
+ON CONFLICT(username) DO UPDATE SET
+    session_id=excluded.session_id,
+    last_seen=excluded.last_seen
+"""
+_SQL_GET = "SELECT session_id, last_seen FROM sessions WHERE username=?"
+_SQL_TOUCH = "UPDATE sessions SET last_seen=? WHERE username=?"
+_SQL_TOUCH_IF_MATCH = "UPDATE sessions SET last_seen=MAX(last_seen, ?) WHERE username=? AND session_id=?"
+_SQL_DELETE_IF_MATCH = "DELETE FROM sessions WHERE username=? AND session_id=?"
+_SQL_CLEANUP = "DELETE FROM sessions WHERE last_seen < ?"
 
-class SessionRegistry:
-    """SQLite-based single-login store (username -> latest session_id)."""
-    def __init__(self, db_path: str):
+class RegistryStats:
+    """連線池與 SQLite 鎖競爭計數（thread-safe，process 共用）。
+
+    pool_misses：池內無閒置連線而新開連線的次數；max_in_flight：同時使用中的連線數峰值；
+    slow_ops：耗時超過 SLOW_OP_MS 的操作（多半是在 busy_timeout 內等待寫入鎖）；
+    lock_errors：等到逾時仍拿不到鎖（database is locked / busy）的次數。
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.ops = self.pool_misses = self.slow_ops = self.lock_errors = 0
+            self.in_flight = self.max_in_flight = 0
+            self.total_ms = self.max_ms = 0.0
+
+    def _enter(self, miss: bool):
+        with self._lock:
+            self.pool_misses += miss
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _exit(self, ms: float, locked: bool):
+        with self._lock:
+            self.in_flight -= 1
+            self.ops += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+            self.slow_ops += ms > SLOW_OP_MS
+            self.lock_errors += locked
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {"ops": self.ops, "pool_misses": self.pool_misses, "max_in_flight": self.max_in_flight,
+                    "slow_ops": self.slow_ops, "lock_errors": self.lock_errors,
+                    "mean_ms": self.total_ms / self.ops if self.ops else 0.0, "max_ms": self.max_ms}
+
+REGISTRY_STATS = RegistryStats()
+
+class PooledSQLite:
+    """SQLite connection pool shared across threads (base of SessionRegistry / ScenarioStore).
+
+    Streamlit runs every rerun on a fresh thread, so thread-local connections would leak.
+    Each connection uses WAL journaling with synchronous=NORMAL and a busy timeout, so
+    readers never block the writer and commits do not fsync on every call. Subclasses
+    list their CREATE statements in SCHEMA.
+    """
+    SCHEMA: Tuple[str, ...] = ()
+
+    def __init__(self, db_path: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS, stats: Optional[RegistryStats] = None):
         self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.stats = stats if stats is not None else REGISTRY_STATS
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max(1, pool_size))
         Path(os.path.dirname(db_path)).mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                username  TEXT PRIMARY KEY,
-                session_id TEXT NOT NULL,
-                last_seen  INTEGER NOT NULL
-            )""")
+        with self._connect() as conn:
+            for sql in self.SCHEMA:
+                conn.execute(sql)
             conn.commit()
 
+    # ---------------- connection pool ----------------
+    def _new_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000,
+                               check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    @contextmanager
+    def _connect(self):
+        t = time.perf_counter()
+        try:
+            conn, miss = self._pool.get_nowait(), False
+        except queue.Empty:
+            conn, miss = self._new_connection(), True
+        self.stats._enter(miss)
+        locked = False
+        try:
+            yield conn
+        except BaseException as e:
+            locked = isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+            conn.rollback()
+            raise
+        finally:
+            self.stats._exit((time.perf_counter() - t) * 1000, locked)
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        """關閉池中所有連線（例如測試或程式結束時）。"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+class SessionRegistry(PooledSQLite):
+    """SQLite-based single-login store (username -> latest session_id)."""
+    SCHEMA = (_SQL_CREATE, _SQL_CREATE_IDX)
+
+    # ---------------- operations ----------------
     def upsert(self, username: str, session_id: str):
         now = int(time.time())
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-            INSERT INTO sessions(username, session_id, last_seen)
-            VALUES(?,?,?)
-            ON CONFLICT(username) DO UPDATE SET
-                session_id=excluded.session_id,
-                last_seen=excluded.last_seen
-            """, (username, session_id, now))
+        with self._connect() as conn:
+            conn.execute(_SQL_UPSERT, (username, session_id, now))
             conn.commit()
 
     def get(self, username: str) -> Optional[Tuple[str, int]]:
-        with sqlite3.connect(self.db_path) as conn:
-            cur = conn.execute("SELECT session_id, last_seen FROM sessions WHERE username=?", (username,))
-            row = cur.fetchone()
+        with self._connect() as conn:
+            row = conn.execute(_SQL_GET, (username,)).fetchone()
             return (row[0], row[1]) if row else None
 
     def touch(self, username: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("UPDATE sessions SET last_seen=? WHERE username=?", (int(time.time()), username))
+        with self._connect() as conn:
+            conn.execute(_SQL_TOUCH, (int(time.time()), username))
+            conn.commit()
+
+    def touch_many(self, rows: Iterable[Tuple[str, str, int]]):
+        """批次寫回 (username, session_id, last_seen)；只更新 session_id 仍相符的列。"""
+        params = [(last_seen, username, session_id) for username, session_id, last_seen in rows]
+        if not params:
+            return
+        with self._connect() as conn:
+            conn.executemany(_SQL_TOUCH_IF_MATCH, params)
             conn.commit()
 
     def delete_if_match(self, username: str, session_id: str):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM sessions WHERE username=? AND session_id=?", (username, session_id))
+        with self._connect() as conn:
+            conn.execute(_SQL_DELETE_IF_MATCH, (username, session_id))
             conn.commit()
 
     def cleanup_expired(self, ttl_seconds: int = DEFAULT_TTL_SECONDS):
         cutoff = int(time.time()) - ttl_seconds
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+        with self._connect() as conn:
+            conn.execute(_SQL_CLEANUP, (cutoff,))
             conn.commit()
+
+
+class CachedSessionRegistry:
+    """Write-behind cache in front of SessionRegistry (same public API).
+
+    - get() is served from memory (read-through on miss).
+    - touch() only updates memory; dirty last_seen values are flushed in one batch
+      every `flush_interval` seconds by a background thread.
+    - cleanup_expired() runs on the same background thread every `cleanup_interval`
+      seconds; calling it directly forces a flush + cleanup.
+    - upsert() / delete_if_match() write through immediately, so a new login
+      invalidates the older session at once (single-login semantics).
+
+    The cache is per process: run one Streamlit server process per database.
+    """
+    def __init__(self, backend: SessionRegistry, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 cleanup_interval: float = DEFAULT_CLEANUP_INTERVAL, start: bool = True):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.flush_interval = flush_interval
+        self.cleanup_interval = cleanup_interval
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Tuple[str, int]] = {}   # username -> (session_id, last_seen)
+        self._dirty: Dict[str, Tuple[str, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if start:
+            self.start()
+
+    # ---------------- background scheduler ----------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="session-registry-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 1)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        next_cleanup = time.monotonic() + self.cleanup_interval
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+                if time.monotonic() >= next_cleanup:
+                    self._cleanup()
+                    next_cleanup = time.monotonic() + self.cleanup_interval
+            except sqlite3.Error:
+                pass  # 下一輪再試；髒資料仍留在記憶體
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        try:
+            self.backend.touch_many((u, sid, ts) for u, (sid, ts) in dirty.items())
+        except sqlite3.Error:
+            with self._lock:
+                for u, v in dirty.items():
+                    self._dirty.setdefault(u, v)
+            raise
+
+    def _cleanup(self):
+        cutoff = int(time.time()) - self.ttl_seconds
+        with self._lock:
+            for u in [u for u, (_, ts) in self._sessions.items() if ts < cutoff]:
+                del self._sessions[u]
+                self._dirty.pop(u, None)
+        self.backend.cleanup_expired(self.ttl_seconds)
+
+    # ---------------- SessionRegistry API ----------------
+    def upsert(self, username: str, session_id: str):
+        self.backend.upsert(username, session_id)
+        with self._lock:
+            self._sessions[username] = (session_id, int(time.time()))
+            self._dirty.pop(username, None)
+
+    def get(self, username: str) -> Optional[Tuple[str, int]]:
+        with self._lock:
+            row = self._sessions.get(username)
+        if row is None:
+            row = self.backend.get(username)
+            if row is None:
+                return None
+            with self._lock:
+                row = self._sessions.setdefault(username, row)
+        if row[1] < int(time.time()) - self.ttl_seconds:
+            return None   # 視同已被清除
+        return row
+
+    def touch(self, username: str):
+        now = int(time.time())
+        with self._lock:
+            row = self._sessions.get(username)
+            if row is None:
+                return
+            self._sessions[username] = self._dirty[username] = (row[0], now)
+
+    def delete_if_match(self, username: str, session_id: str):
+        self.backend.delete_if_match(username, session_id)
+        with self._lock:
+            row = self._sessions.get(username)
+            if row is not None and row[0] == session_id:
+                del self._sessions[username]
+                self._dirty.pop(username, None)
+
+    def cleanup_expired(self, ttl_seconds: Optional[int] = None):
+        if ttl_seconds is not None:
+            self.ttl_seconds = ttl_seconds
+        self.flush()
+        self._cleanup()
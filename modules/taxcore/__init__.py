@@ -0,0 +1,30 @@
+# modules/taxcore — 純計算核心（遺產稅／贈與稅），不依賴 streamlit / pandas
+from modules.taxcore.rules import (
+    BracketTable, TaxRules, RULES_2025, register_rules, load_rules_file, available_years, get_rules,
+)
+from modules.taxcore.estate import TaxConstants, EstateTaxCalculator
+from modules.taxcore.gift import (
+    EXEMPTION, BR10_NET_MAX, BR15_NET_MAX, RATE_10, RATE_15, RATE_20, MAX_ANNUAL,
+    tax_calc, tax_calc_batch,
+)
+from modules.taxcore.schedule import GiftSchedule, MAX_YEARS
+from modules.taxcore.scenarios import SCENARIO_LABELS, estate_scenarios, estate_scenarios_batch
+from modules.taxcore.gift_plan import GiftPlan, GiftPlanYear, optimize_gift_plan
+from modules.taxcore.solver import AllocationResult, optimize_allocation
+from modules.taxcore.succession import FamilyNode, SuccessionPlan, SuccessionPlanner, SuccessionStep
+from modules.taxcore.projection import ProjectionStep, ProjectionResult, iter_projection, run_projection
+from modules.taxcore.cache import (
+    RULE_VERSION, ResultCache, RESULT_CACHE, CachedEstateTaxCalculator, CachedGiftSchedule, cached_tax_calc,
+)
+
+__all__ = [
+    "BracketTable", "TaxRules", "RULES_2025", "register_rules", "load_rules_file", "available_years", "get_rules",
+    "TaxConstants", "EstateTaxCalculator",
+    "EXEMPTION", "BR10_NET_MAX", "BR15_NET_MAX", "RATE_10", "RATE_15", "RATE_20", "MAX_ANNUAL",
+    "tax_calc", "tax_calc_batch",
+    "GiftSchedule", "MAX_YEARS", "SCENARIO_LABELS", "estate_scenarios", "estate_scenarios_batch", "GiftPlan", "GiftPlanYear", "optimize_gift_plan", "AllocationResult", "optimize_allocation",
+    "FamilyNode", "SuccessionPlan", "SuccessionPlanner", "SuccessionStep",
+    "ProjectionStep", "ProjectionResult", "iter_projection", "run_projection",
+    "RULE_VERSION", "ResultCache", "RESULT_CACHE", "CachedEstateTaxCalculator", "CachedGiftSchedule",
+    "cached_tax_calc",
+]
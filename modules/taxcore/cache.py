@@ -0,0 +1,135 @@
+# modules/taxcore/cache.py — 全 process 共用的計算結果快取（LRU + TTL，含命中率統計）
+# 取代 st.cache_data：鍵值包含稅制版本與 TaxConstants 內容，可跨 session 共用，且有容量上限。
+import sys, threading, time
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence
+
+from modules.taxcore.estate import TaxConstants, EstateTaxCalculator
+from modules.taxcore.gift import tax_calc, tax_calc_batch
+from modules.taxcore.rules import TaxRules, get_rules
+from modules.taxcore.schedule import GiftSchedule
+
+RULE_VERSION = get_rules().version   # 稅制版本（如 "TW-2025"）；規則變動時舊結果自然不會命中
+DEFAULT_MAXSIZE = 50_000
+DEFAULT_TTL_SECONDS = 6 * 60 * 60
+
+def _sizeof(obj) -> int:
+    if isinstance(obj, tuple):
+        return sys.getsizeof(obj) + sum(_sizeof(x) for x in obj)
+    return sys.getsizeof(obj)
+
+class ResultCache:
+    """Thread-safe bounded LRU cache with per-entry TTL and hit/miss/eviction counters."""
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()   # key -> (expires_at, value, nbytes)
+        self._bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[0] is None or entry[0] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                self._remove(key)
+                self.expirations += 1
+            self.misses += 1
+        value = compute()   # 在鎖外計算；同鍵併發時最多重算一次，結果相同
+        expires = None if self.ttl_seconds is None else now + self.ttl_seconds
+        nbytes = _sizeof(key) + _sizeof(value)
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (expires, value, nbytes)
+            self._bytes += nbytes
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+                self.evictions += 1
+        return value
+
+    def _remove(self, key: Hashable):
+        self._bytes -= self._data.pop(key)[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "approx_bytes": self._bytes,
+            }
+
+RESULT_CACHE = ResultCache()
+
+def constants_key(constants: TaxConstants) -> tuple:
+    """TaxConstants 的內容指紋（欄位值），讓不同參數的計算不會共用結果。"""
+    return tuple(
+        tuple(map(tuple, v)) if isinstance(v, list) else v
+        for v in (getattr(constants, f.name) for f in fields(constants))
+    )
+
+class CachedEstateTaxCalculator(EstateTaxCalculator):
+    """calculate_estate_tax 經過 RESULT_CACHE；鍵值 = (稅制版本, TaxConstants 內容, 輸入)。"""
+    def __init__(self, constants: TaxConstants, cache: ResultCache = RESULT_CACHE,
+                 rule_version: str = RULE_VERSION):
+        super().__init__(constants)
+        self.cache = cache
+        self.rule_version = rule_version
+        self._key_prefix = ("estate", rule_version, constants_key(constants))
+
+    def calculate_estate_tax(self, total_assets: float, spouse: bool, adult_children: int,
+                             other_dependents: int, disabled_people: int, parents: int):
+        args = (float(total_assets), bool(spouse), int(adult_children), int(other_dependents),
+                int(disabled_people), int(parents))
+        return self.cache.get_or_compute(
+            self._key_prefix + args, lambda: super(CachedEstateTaxCalculator, self).calculate_estate_tax(*args)
+        )
+
+def gift_key(rules: TaxRules) -> tuple:
+    """贈與稅鍵值前綴：稅制版本＋級距表內容（同版本號但級距不同的規則不會共用結果）。"""
+    return ("gift", rules.version, rules.gift_brackets)
+
+def cached_tax_calc(net: int, rules: Optional[TaxRules] = None, cache: ResultCache = RESULT_CACHE):
+    """tax_calc 經過 RESULT_CACHE；以 rules 計算，鍵值也由 rules 產生。"""
+    rules = rules or get_rules()
+    net = int(net)
+    return cache.get_or_compute(gift_key(rules) + (net,), lambda: tax_calc(net, rules))
+
+class CachedGiftSchedule(GiftSchedule):
+    """GiftSchedule 的逐年稅額查表經過 RESULT_CACHE（鍵值依該排程的 rules）。
+
+    單年查表以淨額為鍵；整批重算以整條淨額向量為鍵，存成 tuple（排程之後會就地修改自己的陣列）。
+    """
+    cache: ResultCache = RESULT_CACHE      # 類別屬性：排程存在 session_state，不讓共用快取算進 session 記憶體
+
+    def __init__(self, premiums: Sequence[int], cash_values: Sequence[int], change_year: int = 1,
+                 rules: Optional[TaxRules] = None, cache: Optional[ResultCache] = None):
+        if cache is not None:
+            self.cache = cache
+        super().__init__(premiums, cash_values, change_year, rules)
+
+    def _tax(self, net: int):
+        return cached_tax_calc(net, self.rules, self.cache)
+
+    def _tax_batch(self, net):
+        import numpy as np
+        key = gift_key(self.rules) + ("batch", tuple(net.tolist()))
+        def compute():
+            tax, rate = tax_calc_batch(net, self.rules)
+            return tuple(tax.tolist()), tuple(rate.tolist())
+        tax, rate = self.cache.get_or_compute(key, compute)
+        return np.array(tax, dtype=np.int64), np.array(rate)
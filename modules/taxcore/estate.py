@@ -0,0 +1,90 @@
+# modules/taxcore/estate.py — 遺產稅純計算（不依賴 streamlit，可供 CLI / 背景工作使用）
+# numpy 只在批次函式內載入，讓 `import modules.taxcore` 維持在數毫秒內
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional, Tuple, List
+from dataclasses import dataclass, field
+
+from modules.taxcore.rules import BracketTable, TaxRules, get_rules
+
+if TYPE_CHECKING:
+    import numpy as np
+
+@dataclass
+class TaxConstants:
+    EXEMPT_AMOUNT: float = 1333
+    FUNERAL_EXPENSE: float = 138
+    SPOUSE_DEDUCTION_VALUE: float = 553
+    ADULT_CHILD_DEDUCTION: float = 56
+    PARENTS_DEDUCTION: float = 138
+    DISABLED_DEDUCTION: float = 693
+    OTHER_DEPENDENTS_DEDUCTION: float = 56
+    TAX_BRACKETS: List[Tuple[float, float]] = field(
+        default_factory=lambda: [(5621, 0.10),(11242, 0.15),(float("inf"), 0.20)]
+    )
+
+    @classmethod
+    def from_rules(cls, rules: Optional[TaxRules] = None) -> "TaxConstants":
+        """由年度稅制規則建立（預設為目前年度）。"""
+        r = rules or get_rules()
+        return cls(
+            EXEMPT_AMOUNT=r.estate_exempt, FUNERAL_EXPENSE=r.funeral_expense,
+            SPOUSE_DEDUCTION_VALUE=r.spouse_deduction, ADULT_CHILD_DEDUCTION=r.adult_child_deduction,
+            PARENTS_DEDUCTION=r.parents_deduction, DISABLED_DEDUCTION=r.disabled_deduction,
+            OTHER_DEPENDENTS_DEDUCTION=r.other_dependents_deduction,
+            TAX_BRACKETS=r.estate_brackets.pairs(),
+        )
+
+@lru_cache(maxsize=32)
+def _compile_brackets(pairs: Tuple[Tuple[float, float], ...]) -> BracketTable:
+    return BracketTable.from_pairs(pairs)
+
+class EstateTaxCalculator:
+    def __init__(self, constants: TaxConstants):
+        self.constants = constants
+        # 級距預先編譯：各級下限與累積稅額，查表 = bisect + 一次乘加
+        self.brackets = _compile_brackets(tuple((float(b), float(r)) for b, r in constants.TAX_BRACKETS))
+
+    def compute_deductions(self, spouse: bool, adult_children: int, other_dependents: int,
+                           disabled_people: int, parents: int) -> float:
+        spouse_deduction = self.constants.SPOUSE_DEDUCTION_VALUE if spouse else 0
+        return (
+            spouse_deduction + self.constants.FUNERAL_EXPENSE +
+            disabled_people * self.constants.DISABLED_DEDUCTION +
+            adult_children * self.constants.ADULT_CHILD_DEDUCTION +
+            other_dependents * self.constants.OTHER_DEPENDENTS_DEDUCTION +
+            parents * self.constants.PARENTS_DEDUCTION
+        )
+
+    def compute_deductions_batch(self, spouse, adult_children, other_dependents,
+                                 disabled_people, parents) -> "np.ndarray":
+        """compute_deductions 的向量版：各參數可為純量或等長陣列。"""
+        import numpy as np
+        c = self.constants
+        spouse_deduction = np.where(np.asarray(spouse, dtype=bool), c.SPOUSE_DEDUCTION_VALUE, 0)
+        return (
+            spouse_deduction + c.FUNERAL_EXPENSE +
+            np.asarray(disabled_people) * c.DISABLED_DEDUCTION +
+            np.asarray(adult_children) * c.ADULT_CHILD_DEDUCTION +
+            np.asarray(other_dependents) * c.OTHER_DEPENDENTS_DEDUCTION +
+            np.asarray(parents) * c.PARENTS_DEDUCTION
+        ).astype(float)
+
+    def calculate_estate_tax_batch(self, total_assets, spouse, adult_children, other_dependents,
+                                   disabled_people, parents) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """一次計算多戶：回傳 (課稅遺產淨額, 應納稅額, 扣除額) 三個陣列，逐筆結果與純量版相同。"""
+        import numpy as np
+        total = np.asarray(total_assets, dtype=float)
+        deductions = self.compute_deductions_batch(spouse, adult_children, other_dependents,
+                                                   disabled_people, parents)
+        total, deductions = np.broadcast_arrays(total, deductions)
+        taxable_amount = np.maximum(0.0, total - self.constants.EXEMPT_AMOUNT - deductions)
+        tax_due, _ = self.brackets.tax_batch(taxable_amount)
+        return taxable_amount, np.round(tax_due, 0), deductions
+
+    def calculate_estate_tax(self, total_assets: float, spouse: bool, adult_children: int,
+                             other_dependents: int, disabled_people: int, parents: int):
+        """單戶：與批次版共用同一份編譯後級距（bisect），結果逐位相同，且不需載入 numpy。"""
+        deductions = float(self.compute_deductions(spouse, adult_children, other_dependents,
+                                                   disabled_people, parents))
+        taxable_amount = max(0.0, float(total_assets) - self.constants.EXEMPT_AMOUNT - deductions)
+        return taxable_amount, round(self.brackets.tax(taxable_amount), 0), deductions
@@ -0,0 +1,29 @@
+# modules/taxcore/gift.py — 贈與稅純計算（預設 114年/2025 稅制；單位：元）
+# numpy 只在批次函式內載入，讓 `import modules.taxcore` 維持在數毫秒內
+from typing import Optional
+
+from modules.taxcore.rules import TaxRules, get_rules, RULES_2025
+
+EXEMPTION    = RULES_2025.gift_exemption
+BR10_NET_MAX = int(RULES_2025.gift_brackets.uppers[0])
+BR15_NET_MAX = int(RULES_2025.gift_brackets.uppers[1])
+RATE_10, RATE_15, RATE_20 = RULES_2025.gift_brackets.rates
+MAX_ANNUAL   = 100_000_000
+
+def tax_calc(net:int, rules: Optional[TaxRules] = None):
+    """免稅後淨額 → (應納贈與稅, 適用稅率標籤)；查表 = bisect + 一次乘加。"""
+    if net <= 0: return 0, "—"
+    r = rules or get_rules()
+    b = r.gift_brackets
+    i = b.index(net)
+    return int(round(b.bases[i] + (net - b.lowers[i]) * b.rates[i])), r.rate_label(i)
+
+def tax_calc_batch(net, rules: Optional[TaxRules] = None):
+    """tax_calc 的向量版：回傳 (稅額 int64 陣列, 稅率標籤陣列)，逐筆結果與 tax_calc 相同。"""
+    import numpy as np
+    r = rules or get_rules()
+    net = np.asarray(net, dtype=np.int64)
+    tax, idx = r.gift_brackets.tax_batch(net)
+    labels = np.array([r.rate_label(i) for i in range(len(r.gift_brackets.rates))])
+    rate = np.where(net <= 0, "—", labels[idx])
+    return np.round(tax).astype(np.int64), rate
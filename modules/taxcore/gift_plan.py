@@ -0,0 +1,156 @@
+# modules/taxcore/gift_plan.py — 多年度贈與排程最佳化（動態規劃；單位：元，金額以 UNIT 為格點）
+#
+# 目標：在 horizon 年內移轉 target 元，使贈與稅總額最小。每年可做現金贈與；另可選擇在第 N 年
+# 變更要保人，把保單（至第 N 年累計保費為名目移轉）以當年保價金計入第 N 年的贈與。
+#
+# 單年稅額 c(x) = 贈與稅(x − 年免稅額) 為凸的分段線性函數，斷點只有「免稅額」與「免稅額＋各級上限」。
+# 這類問題必有一組最佳解：最多只有一年的金額落在斷點之間，其餘年度皆為 0 或斷點。因此 DP 的每一步
+# 只需考慮「斷點」與「把剩餘全部放在今年」兩類動作：W[k][u] = k 個現金年度移轉 u 格的最小稅額，
+# 每一步對全部 u 一次向量運算。保單年度的門檻要先扣掉保價金，對每個候選 N 再做一次 O(U) 合併即可。
+# 格點：目標進位到 unit 的整數倍；格數超過 MAX_GRID_UNITS 時自動改用較粗的格點（UNIT 的整數倍），
+# 記憶體維持在數 MB（只保留回溯用的 act 與最後兩列 W）。比較基準「每年平均」也在同一格點上分配，
+# 因此 total_tax ≤ cash_only_tax ≤ equal_split_tax 恆成立。
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+from modules.taxcore.rules import TaxRules, get_rules
+
+if TYPE_CHECKING:
+    import numpy as np
+
+UNIT = 10_000
+MAX_HORIZON = 30
+MAX_GRID_UNITS = 50_000       # 格數上限：30 年 × 50,001 格的 int32 回溯表約 6 MB
+
+@dataclass
+class GiftPlanYear:
+    year: int
+    cash_gift: int
+    policy_gift: int          # 變更要保人當年視為贈與的保價金（其餘年度為 0）
+    tax: int
+
+@dataclass
+class GiftPlan:
+    target: int
+    horizon: int
+    years: List[GiftPlanYear]
+    total_tax: int
+    change_year: Optional[int]        # None：不使用保單
+    policy_transfer: int              # 保單名目移轉（至變更年累計保費）
+    cash_only_tax: int                # 僅現金贈與的最佳稅額
+    equal_split_tax: int              # 每年平均現金贈與的稅額（比較基準；同一格點）
+    unit: int                         # 實際使用的格點（元）
+
+    @property
+    def nominal_transfer(self) -> int:
+        return self.policy_transfer + sum(y.cash_gift for y in self.years)
+
+def _year_tax(taxable, rules: TaxRules) -> "np.ndarray":
+    """單年贈與總額（元）→ 稅額（元，int64）。"""
+    import numpy as np
+    net = np.maximum(0, np.asarray(taxable, dtype=np.int64) - rules.gift_exemption)
+    tax, _ = rules.gift_brackets.tax_batch(net)
+    return np.round(tax).astype(np.int64)
+
+def _thresholds(rules: TaxRules) -> List[int]:
+    return [rules.gift_exemption] + [rules.gift_exemption + int(u) for u in rules.gift_brackets.uppers
+                                     if u != float("inf")]
+
+def _actions(rules: TaxRules, base: int, unit: int, limit: int) -> "np.ndarray":
+    """斷點動作（格數）：0 與「base 加上贈與後恰好落在各門檻」的上下取整格點。"""
+    import numpy as np
+    pts = [0]
+    for t in _thresholds(rules):
+        if t > base:
+            pts += [(t - base) // unit, -(-(t - base) // unit)]
+    a = np.unique(np.asarray(pts, dtype=np.int64))
+    return a[a <= limit]
+
+def grid_unit(target: int, unit: int = UNIT) -> int:
+    """target 的格數超過 MAX_GRID_UNITS 時，回傳足以容納的最小 unit 整數倍格點。"""
+    units = -(-int(target) // unit)
+    return unit if units <= MAX_GRID_UNITS else -(-units // MAX_GRID_UNITS) * unit
+
+def _cash_dp(units: int, years: int, rules: TaxRules, unit: int):
+    """回傳 (W[years-1], W[years], act)：W[k][u] 為 k 個現金年度移轉 u 格的最小稅額；
+    act[k][u] 為第 k 步（本年）的贈與格數。W 只保留最後兩列（保單年度合併用）。"""
+    import numpy as np
+    big = np.iinfo(np.int64).max // 4
+    u = np.arange(units + 1)
+    cost_all = _year_tax(u * unit, rules)             # 「剩餘全部放在今年」
+    acts = _actions(rules, 0, unit, units)
+    act = np.zeros((years + 1, units + 1), dtype=np.int32)
+    prev = np.full(units + 1, big, dtype=np.int64)
+    prev[0] = 0
+    for k in range(1, years + 1):
+        best = cost_all + prev[0]
+        choice = u.copy()
+        for a in acts:
+            cand = np.full(units + 1, big, dtype=np.int64)
+            cand[a:] = _year_tax(a * unit, rules) + prev[:units + 1 - a]
+            better = cand < best
+            best = np.where(better, cand, best)
+            choice = np.where(better, a, choice)
+        act[k] = choice
+        prev, cur = best, prev
+        if k == years:
+            return cur, best, act
+    raise ValueError("years 必須 ≥ 1")
+
+def optimize_gift_plan(target: int, horizon: int, premiums: Optional[Sequence[int]] = None,
+                       cash_values: Optional[Sequence[int]] = None, unit: int = UNIT,
+                       rules: Optional[TaxRules] = None) -> GiftPlan:
+    """horizon 年內移轉 target 元的最省稅排程；提供 premiums／cash_values 時一併評估各年變更要保人。"""
+    import numpy as np
+    rules = rules or get_rules()
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"年期需介於 1～{MAX_HORIZON} 年")
+    if target < 0:
+        raise ValueError("移轉目標不可為負數")
+    unit = grid_unit(target, unit)
+    units = -(-int(target) // unit)
+    W_prev, W_last, act = _cash_dp(units, horizon, rules, unit)
+
+    def cash_years(k: int, u: int) -> List[int]:
+        out = []
+        for step in range(k, 0, -1):
+            a = int(act[step, u])
+            out.append(a * unit)
+            u -= a
+        return out
+
+    q, r = divmod(units, horizon)                     # 比較基準：同一格點上平均分配（DP 的可行解之一）
+    equal = _year_tax([(q + (1 if y < r else 0)) * unit for y in range(horizon)], rules)
+    best = (int(W_last[units]), None, 0, 0, 0)        # (稅額, 變更年, 保單名目, 保價金, 保單年現金贈與)
+
+    if premiums is not None and cash_values is not None:
+        cum = np.cumsum(np.asarray(premiums, dtype=np.int64))
+        cvs = np.asarray(cash_values, dtype=np.int64)
+        g = np.arange(units + 1)
+        for n in range(1, min(len(cum), horizon) + 1):
+            cv, nominal = int(cvs[n - 1]), int(cum[n - 1])
+            rest = max(0, units - nominal // unit)
+            gg = g[:rest + 1]
+            total = _year_tax(cv + gg * unit, rules) + W_prev[rest - gg]
+            i = int(np.argmin(total))
+            if int(total[i]) < best[0]:
+                best = (int(total[i]), n, nominal, cv, int(gg[i]) * unit)
+
+    tax_total, change_year, nominal, cv, policy_cash = best
+    if change_year is None:
+        gifts = cash_years(horizon, units)
+        years = [GiftPlanYear(y, amt, 0, int(_year_tax(amt, rules))) for y, amt in enumerate(gifts, 1)]
+    else:
+        rest = max(0, units - nominal // unit) - policy_cash // unit
+        others = iter(cash_years(horizon - 1, rest))
+        years = []
+        for y in range(1, horizon + 1):
+            if y == change_year:
+                years.append(GiftPlanYear(y, policy_cash, cv, int(_year_tax(cv + policy_cash, rules))))
+            else:
+                amt = next(others)
+                years.append(GiftPlanYear(y, amt, 0, int(_year_tax(amt, rules))))
+    return GiftPlan(
+        target=int(target), horizon=horizon, years=years, total_tax=tax_total, change_year=change_year,
+        policy_transfer=nominal, cash_only_tax=int(W_last[units]), equal_split_tax=int(equal.sum()), unit=unit,
+    )
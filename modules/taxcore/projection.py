@@ -0,0 +1,97 @@
+# modules/taxcore/projection.py — 資產成長蒙地卡羅模擬：未來各年度身故時的遺產稅分布（單位：萬）
+#
+# 年報酬採對數常態：成長倍數 = exp((μ − σ²/2) + σ·Z)。所有路徑以 numpy 一次推進一年，
+# 每推進一年就對全部路徑套用遺產稅（批次查表）並產生分位數，可逐年串流給 UI。
+# 遺產稅與家人取得皆為遺產金額的非遞減函數，因此其分位數 = 資產分位數代入計算，不需對每條路徑排序三次。
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Optional, Sequence
+
+from modules.taxcore.estate import EstateTaxCalculator
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+MAX_PATHS = 200_000
+MAX_HORIZON = 50
+
+@dataclass
+class ProjectionStep:
+    """單一年度（年底身故）的模擬結果；percentile 陣列與 percentiles 對齊。"""
+    year: int
+    assets: "np.ndarray"            # 遺產總額分位數
+    estate_tax: "np.ndarray"        # 遺產稅分位數
+    family_total: "np.ndarray"      # 家人總共取得分位數（含未被課稅的理賠金）
+    mean_assets: float
+    mean_tax: float
+    taxable_share: float            # 需繳遺產稅的路徑比例
+
+@dataclass
+class ProjectionResult:
+    percentiles: Sequence[float]
+    steps: list
+    paths: int
+    seed: Optional[int]
+
+    def band(self, field: str) -> "np.ndarray":
+        """(年數, 分位數個數) 的矩陣，例如 band("estate_tax")。"""
+        import numpy as np
+        return np.vstack([getattr(s, field) for s in self.steps])
+
+    @property
+    def years(self) -> "np.ndarray":
+        import numpy as np
+        return np.array([s.year for s in self.steps])
+
+def iter_projection(calculator: EstateTaxCalculator, total_assets: float, spouse: bool,
+                    adult_children: int, other_dependents: int, disabled_people: int, parents: int, *,
+                    years: int = 20, paths: int = 100_000, mean_return: float = 0.04,
+                    volatility: float = 0.12, annual_withdrawal: float = 0.0,
+                    premium: float = 0.0, claim: float = 0.0, claim_taxed: bool = False,
+                    seed: Optional[int] = 0,
+                    percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Iterator[ProjectionStep]:
+    """逐年產生 ProjectionStep；同一 seed 與參數得到相同結果。
+
+    premium 於第 0 年自資產扣除，claim 為身故理賠金（claim_taxed 時計入遺產）；
+    annual_withdrawal 為每年年底的生活支出，資產不會低於 0。
+    """
+    import numpy as np
+    if not 1 <= years <= MAX_HORIZON:
+        raise ValueError(f"模擬年數需介於 1～{MAX_HORIZON}")
+    if not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f"路徑數需介於 1～{MAX_PATHS:,}")
+    rng = np.random.default_rng(seed)
+    family = (spouse, adult_children, other_dependents, disabled_people, parents)
+    q = np.asarray(percentiles, dtype=float)
+    drift = mean_return - 0.5 * volatility ** 2
+    extra_estate = claim if claim_taxed else 0.0
+    extra_family = 0.0 if claim_taxed else claim
+
+    assets = np.full(paths, max(0.0, float(total_assets) - premium))
+    z = np.empty(paths)
+    for year in range(1, years + 1):
+        rng.standard_normal(out=z)
+        np.multiply(z, volatility, out=z)
+        np.add(z, drift, out=z)
+        np.exp(z, out=z)
+        np.multiply(assets, z, out=assets)
+        if annual_withdrawal:
+            np.subtract(assets, annual_withdrawal, out=assets)
+            np.maximum(assets, 0.0, out=assets)
+
+        estate = assets + extra_estate
+        _, tax, _ = calculator.calculate_estate_tax_batch(estate, *family)
+        a_q = np.percentile(estate, q)
+        _, tax_q, _ = calculator.calculate_estate_tax_batch(a_q, *family)
+        yield ProjectionStep(
+            year=year, assets=a_q, estate_tax=tax_q,
+            family_total=a_q - tax_q + extra_family,
+            mean_assets=float(estate.mean()), mean_tax=float(tax.mean()),
+            taxable_share=float(np.count_nonzero(tax) / paths),
+        )
+
+def run_projection(*args, **kwargs) -> ProjectionResult:
+    """iter_projection 的一次性版本。"""
+    steps = list(iter_projection(*args, **kwargs))
+    return ProjectionResult(percentiles=tuple(kwargs.get("percentiles", DEFAULT_PERCENTILES)),
+                            steps=steps, paths=kwargs.get("paths", 100_000), seed=kwargs.get("seed", 0))
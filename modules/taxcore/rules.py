@@ -0,0 +1,143 @@
+# modules/taxcore/rules.py — 依年度版本化的稅制規則（遺產稅＋贈與稅），級距預先編譯
+#
+# 每個級距表預先算好各級下限與「下限處的累積稅額」，查表 = bisect 找級距 + 一次乘加；
+# 批次版本用 numpy.searchsorted，結果與逐級累加完全一致（相同的浮點運算順序）。
+# 新年度：register_rules(...) 或放 JSON 檔到 TAX_RULES_DIR（或呼叫 load_rules_file），UI 不需修改。
+import json, os
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+DEFAULT_YEAR = int(os.environ.get("TAX_RULES_YEAR", "2025"))   # 未指定年度時使用
+
+@dataclass(frozen=True)
+class BracketTable:
+    """累進級距：uppers[i] 為第 i 級上限（最後一級為 inf），rates[i] 為該級稅率。"""
+    uppers: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    lowers: Tuple[float, ...] = field(init=False)
+    bases: Tuple[float, ...] = field(init=False)       # 各級下限處的累積稅額
+
+    def __post_init__(self):
+        if len(self.uppers) != len(self.rates) or not self.uppers:
+            raise ValueError("uppers 與 rates 長度必須相同且不可為空")
+        if list(self.uppers) != sorted(self.uppers) or self.uppers[-1] != float("inf"):
+            raise ValueError("uppers 必須遞增，且最後一級為 inf")
+        lowers, bases, base, prev = [], [], 0.0, 0
+        for upper, rate in zip(self.uppers, self.rates):
+            lowers.append(prev)
+            bases.append(base)
+            base = base + (upper - prev) * rate
+            prev = upper
+        object.__setattr__(self, "lowers", tuple(lowers))
+        object.__setattr__(self, "bases", tuple(bases))
+
+    @classmethod
+    def from_pairs(cls, pairs: Sequence[Tuple[float, float]]) -> "BracketTable":
+        return cls(tuple(float(u) for u, _ in pairs), tuple(float(r) for _, r in pairs))
+
+    def pairs(self) -> List[Tuple[float, float]]:
+        return list(zip(self.uppers, self.rates))
+
+    def index(self, amount: float) -> int:
+        return bisect_left(self.uppers, amount)
+
+    def tax(self, amount: float) -> float:
+        """未四捨五入的稅額；amount ≤ 0 時為 0。"""
+        if amount <= 0:
+            return 0.0
+        i = bisect_left(self.uppers, amount)
+        return self.bases[i] + (amount - self.lowers[i]) * self.rates[i]
+
+    def tax_batch(self, amount) -> Tuple["np.ndarray", "np.ndarray"]:
+        """向量版：回傳 (未四捨五入稅額, 級距索引)；amount ≤ 0 的稅額為 0。"""
+        import numpy as np
+        a = np.asarray(amount)
+        idx = np.searchsorted(np.asarray(self.uppers), a, side="left")
+        tax = np.asarray(self.bases)[idx] + (a - np.asarray(self.lowers)[idx]) * np.asarray(self.rates)[idx]
+        return np.where(a > 0, tax, 0.0), idx
+
+@dataclass(frozen=True)
+class TaxRules:
+    """單一年度的遺產稅（萬）與贈與稅（元）規則。"""
+    year: int
+    # 遺產稅（萬）
+    estate_exempt: float
+    funeral_expense: float
+    spouse_deduction: float
+    adult_child_deduction: float
+    parents_deduction: float
+    disabled_deduction: float
+    other_dependents_deduction: float
+    estate_brackets: BracketTable
+    # 贈與稅（元）
+    gift_exemption: int
+    gift_brackets: BracketTable
+
+    @property
+    def version(self) -> str:
+        return f"TW-{self.year}"
+
+    def rate_label(self, index: int) -> str:
+        return f"{self.gift_brackets.rates[index] * 100:g}%"
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "TaxRules":
+        e, g = d["estate"], d["gift"]
+        inf = lambda v: float("inf") if v in (None, "inf") else float(v)
+        return cls(
+            year=int(d["year"]),
+            estate_exempt=e["exempt"], funeral_expense=e["funeral"], spouse_deduction=e["spouse"],
+            adult_child_deduction=e["adult_child"], parents_deduction=e["parents"],
+            disabled_deduction=e["disabled"], other_dependents_deduction=e["other_dependents"],
+            estate_brackets=BracketTable.from_pairs([(inf(u), r) for u, r in e["brackets"]]),
+            gift_exemption=int(g["exemption"]),
+            gift_brackets=BracketTable.from_pairs([(inf(u), r) for u, r in g["brackets"]]),
+        )
+
+RULES_2025 = TaxRules(
+    year=2025,
+    estate_exempt=1333, funeral_expense=138, spouse_deduction=553, adult_child_deduction=56,
+    parents_deduction=138, disabled_deduction=693, other_dependents_deduction=56,
+    estate_brackets=BracketTable.from_pairs([(5621, 0.10), (11242, 0.15), (float("inf"), 0.20)]),
+    gift_exemption=2_440_000,
+    gift_brackets=BracketTable.from_pairs([(28_110_000, 0.10), (56_210_000, 0.15), (float("inf"), 0.20)]),
+)
+
+_RULES: Dict[int, TaxRules] = {RULES_2025.year: RULES_2025}
+_dir_loaded = False
+
+def register_rules(rules: TaxRules) -> None:
+    _RULES[rules.year] = rules
+
+def load_rules_file(path) -> TaxRules:
+    """讀取單一年度 JSON（格式同 TaxRules.from_dict）並註冊。"""
+    rules = TaxRules.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+    register_rules(rules)
+    return rules
+
+def _load_rules_dir():
+    global _dir_loaded
+    if _dir_loaded:
+        return
+    _dir_loaded = True
+    d = os.environ.get("TAX_RULES_DIR")
+    if d and Path(d).is_dir():
+        for p in sorted(Path(d).glob("*.json")):
+            load_rules_file(p)
+
+def available_years() -> List[int]:
+    _load_rules_dir()
+    return sorted(_RULES)
+
+def get_rules(year: Optional[int] = None) -> TaxRules:
+    _load_rules_dir()
+    year = DEFAULT_YEAR if year is None else int(year)
+    try:
+        return _RULES[year]
+    except KeyError:
+        raise KeyError(f"尚未載入 {year} 年度稅制規則（可用：{sorted(_RULES)}）") from None
@@ -0,0 +1,45 @@
+# modules/taxcore/scenarios.py — 「模擬試算與效益評估」五種情境（UI 表格與匯出共用；單位：萬）
+from typing import TYPE_CHECKING, List, Tuple
+
+from modules.taxcore.estate import EstateTaxCalculator
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SCENARIO_LABELS = ("沒有規劃", "提前贈與", "購買保險", "提前贈與＋購買保險", "提前贈與＋購買保險（被實質課稅）")
+
+def estate_scenarios(calc: EstateTaxCalculator, total: float, spouse: bool, adult_children: int,
+                     other_dependents: int, disabled_people: int, parents: int,
+                     premium: float, claim: float, gift: float) -> List[Tuple[str, float, float]]:
+    """[(情境, 遺產稅, 家人總共取得)]，順序同 SCENARIO_LABELS。"""
+    def tax(estate):
+        _, t, _ = calc.calculate_estate_tax(estate, spouse, adult_children, other_dependents, disabled_people, parents)
+        return t
+
+    cases = [                                   # (計入遺產的金額, 遺產外另由家人取得)
+        (total, 0),
+        (total - gift, gift),
+        (total - premium, claim),
+        (total - gift - premium, claim + gift),
+        (total - gift - premium + claim, gift),
+    ]
+    out = []
+    for label, (estate, extra) in zip(SCENARIO_LABELS, cases):
+        t = tax(estate)
+        out.append((label, t, estate - t + extra))
+    return out
+
+def estate_scenarios_batch(calc: EstateTaxCalculator, total, spouse, adult_children, other_dependents,
+                           disabled_people, parents, premium, claim, gift) -> Tuple["np.ndarray", "np.ndarray"]:
+    """estate_scenarios 的向量版（多位客戶）：回傳 (遺產稅, 家人總共取得)，形狀皆為 (客戶數, 5)。"""
+    import numpy as np
+    total, premium, claim, gift = (np.asarray(x, dtype=float) for x in (total, premium, claim, gift))
+    cases = [(total, 0), (total - gift, gift), (total - premium, claim),
+             (total - gift - premium, claim + gift), (total - gift - premium + claim, gift)]
+    taxes, nets = [], []
+    for estate, extra in cases:
+        _, t, _ = calc.calculate_estate_tax_batch(estate, spouse, adult_children, other_dependents,
+                                                  disabled_people, parents)
+        taxes.append(t)
+        nets.append(estate - t + extra)
+    return np.stack(taxes, axis=-1), np.stack(nets, axis=-1)
@@ -0,0 +1,137 @@
+# modules/taxcore/schedule.py — N 年保單贈與試算引擎（保費／保價金向量、任意變更要保人年度）
+# 逐年現金贈與稅一次向量計算；之後只改某一年時，只重算該年稅額並以差值更新累計欄。
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+from modules.taxcore.gift import tax_calc, tax_calc_batch
+from modules.taxcore.rules import TaxRules, get_rules
+
+if TYPE_CHECKING:
+    import numpy as np
+
+MAX_YEARS = 30
+
+class GiftSchedule:
+    """保單贈與 vs. 逐年現金贈與（單位：元）。
+
+    premiums[i] / cash_values[i] 為第 i+1 年的保費與年末保價金；change_year 為變更要保人的年度（1 起算）。
+    """
+    def __init__(self, premiums: Sequence[int], cash_values: Sequence[int], change_year: int = 1,
+                 rules: Optional[TaxRules] = None):
+        import numpy as np
+        self.rules = rules or get_rules()
+        self.premiums = np.array(premiums, dtype=np.int64)
+        self.cash_values = np.array(cash_values, dtype=np.int64)
+        if len(self.premiums) != len(self.cash_values):
+            raise ValueError("premiums 與 cash_values 長度必須相同")
+        if not 1 <= len(self.premiums) <= MAX_YEARS:
+            raise ValueError(f"年期需介於 1～{MAX_YEARS} 年")
+        self.change_year = 1
+        self.set_change_year(change_year)
+        self._recompute_all()
+
+    @property
+    def years(self) -> int:
+        return len(self.premiums)
+
+    # 稅額查表（子類別可改走快取，見 modules.taxcore.cache.CachedGiftSchedule）
+    def _tax(self, net: int):
+        return tax_calc(net, self.rules)
+
+    def _tax_batch(self, net: "np.ndarray"):
+        return tax_calc_batch(net, self.rules)
+
+    def _recompute_all(self):
+        import numpy as np
+        self.cumulative = np.cumsum(self.premiums)
+        self.net = np.maximum(0, self.premiums - self.rules.gift_exemption)
+        self.tax, self.rate = self._tax_batch(self.net)
+        self.rate = self.rate.astype(object)
+        self.cumulative_tax = np.cumsum(self.tax)
+        self.recomputed_years = self.years
+
+    # ---------------- 增量更新 ----------------
+    def set_premium(self, year: int, premium: int):
+        """只重算第 year 年的稅額；累計投入／累計稅額以差值更新後段。"""
+        i = self._index(year)
+        premium = int(premium)
+        delta = premium - int(self.premiums[i])
+        if delta == 0:
+            return
+        self.premiums[i] = premium
+        self.cumulative[i:] += delta
+        net = max(0, premium - self.rules.gift_exemption)
+        tax, rate = self._tax(net)
+        tax_delta = tax - int(self.tax[i])
+        self.net[i], self.tax[i], self.rate[i] = net, tax, rate
+        if tax_delta:
+            self.cumulative_tax[i:] += tax_delta
+        self.recomputed_years = 1
+
+    def set_cash_value(self, year: int, cash_value: int):
+        self.cash_values[self._index(year)] = int(cash_value)
+
+    def set_change_year(self, year: int):
+        self.change_year = self._index(year) + 1
+
+    def update(self, premiums: Sequence[int], cash_values: Sequence[int], change_year: Optional[int] = None):
+        """與目前向量比對，只更新有變動的年度；年期改變時才整批重算。"""
+        import numpy as np
+        premiums = np.asarray(premiums, dtype=np.int64)
+        cash_values = np.asarray(cash_values, dtype=np.int64)
+        if len(premiums) != self.years:
+            self.__init__(premiums, cash_values, change_year or self.change_year, self.rules)
+            return
+        self.cash_values[:] = cash_values
+        changed = np.flatnonzero(premiums != self.premiums)
+        if len(changed) > 1:
+            self.premiums[:] = premiums
+            self._recompute_all()
+        else:
+            self.recomputed_years = 0
+            for i in changed:
+                self.set_premium(int(i) + 1, int(premiums[i]))
+        if change_year is not None:
+            self.set_change_year(change_year)
+
+    def _index(self, year: int) -> int:
+        year = int(year)
+        if not 1 <= year <= self.years:
+            raise ValueError(f"年度需介於 1～{self.years}")
+        return year - 1
+
+    # ---------------- 結果 ----------------
+    def nominal_transfer(self) -> int:
+        """累積移轉（名目）至變更年度。"""
+        return int(self.cumulative[self.change_year - 1])
+
+    def policy_gift(self) -> Dict[str, object]:
+        """變更要保人：以變更當年保價金視為贈與。"""
+        gift = int(self.cash_values[self.change_year - 1])
+        net = max(0, gift - self.rules.gift_exemption)
+        tax, rate = self._tax(net)
+        return {"gift": gift, "net": net, "tax": tax, "rate": rate}
+
+    def cash_gift_tax(self) -> int:
+        """現金贈與：第 1～變更年逐年贈與稅合計。"""
+        return int(self.cumulative_tax[self.change_year - 1])
+
+    def years_table(self) -> Dict[str, "np.ndarray"]:
+        import numpy as np
+        return {
+            "年度": np.arange(1, self.years + 1),
+            "每年投入（元）": self.premiums.copy(),
+            "累計投入（元）": self.cumulative.copy(),
+            "年末現金價值（元）": self.cash_values.copy(),
+        }
+
+    def cash_gift_table(self) -> Dict[str, "np.ndarray"]:
+        """第 1～變更年的逐年現金贈與稅。"""
+        import numpy as np
+        n = self.change_year
+        return {
+            "年度": np.arange(1, n + 1),
+            "現金贈與（元）": self.premiums[:n].copy(),
+            "免稅後淨額（元）": self.net[:n].copy(),
+            "應納贈與稅（元）": self.tax[:n].copy(),
+            "適用稅率": self.rate[:n].copy(),
+        }
@@ -0,0 +1,151 @@
+# modules/taxcore/solver.py — 最佳保費／提前贈與配置（最大化「家人總共取得」）
+#
+# 家人總共取得 = 遺產淨額 − 遺產稅 + 提前贈與 − 贈與稅 + 理賠金（理賠金被實質課稅時改計入遺產）
+# 保費、贈與取整數（萬）。遺產稅取整到萬，目標函數在同稅率的平坦段上呈鋸齒，最佳整數解不一定落在
+# 級距斷點附近，因此直接在整數格點上精確求解：
+#   理賠金不計入遺產：遺產淨額只與 s = 保費＋贈與 有關，目標拆成 φ(T − s) + c·s 與 ψ(g) − c·g 兩部分，
+#     後者在 g 的可行區間上取最大值（稀疏表），O(T log T)；
+#   理賠金計入遺產：固定贈與時目標隨保費單調（取整誤差有界），只列舉有利端附近的保費。
+# 同分時取投入（保費＋贈與）最少者。
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+from modules.taxcore.estate import EstateTaxCalculator
+from modules.taxcore.gift import tax_calc_batch
+from modules.taxcore.rules import TaxRules, get_rules
+
+if TYPE_CHECKING:
+    import numpy as np
+
+WAN = 10_000   # 遺產稅模組以「萬」為單位，贈與稅以「元」為單位
+
+@dataclass
+class AllocationResult:
+    premium: float
+    gift: float
+    family_total: float
+    estate_tax: float
+    gift_tax: float
+    baseline_family_total: float            # 不做任何規劃
+    candidates_evaluated: int               # 求解時計算的目標函數（或其分項）個數
+    curve_premium: "np.ndarray"             # 各保費下（贈與取最佳）的家人總共取得
+    curve_gift: "np.ndarray"
+    curve_family_total: "np.ndarray"
+
+def gift_tax_wan(gift_wan, rules: Optional[TaxRules] = None) -> "np.ndarray":
+    """贈與金額（萬）→ 贈與稅（萬），單年度、扣除年免稅額。"""
+    import numpy as np
+    r = rules or get_rules()
+    gift_yuan = np.rint(np.asarray(gift_wan, dtype=float) * WAN).astype(np.int64)
+    tax, _ = tax_calc_batch(np.maximum(0, gift_yuan - r.gift_exemption), r)
+    return tax / WAN
+
+def _window_argmax(values: "np.ndarray", lo: "np.ndarray", hi: "np.ndarray"):
+    """values[lo[i]:hi[i]+1] 的最大值與位置（lo ≤ hi）；稀疏表，同分取較小的位置。"""
+    import numpy as np
+    idx = [np.arange(len(values))]
+    span = 1
+    while span * 2 <= len(values):
+        a, b = idx[-1][:-span], idx[-1][span:]
+        idx.append(np.where(values[b] > values[a], b, a))
+        span *= 2
+    level = np.frexp(hi - lo + 1)[1] - 1                     # floor(log2(區間長度))
+    at = np.empty(len(lo), dtype=np.int64)
+    for j in np.unique(level):
+        m = level == j
+        a, b = idx[j][lo[m]], idx[j][hi[m] - (1 << int(j)) + 1]
+        at[m] = np.where(values[b] > values[a], b, a)
+    return values[at], at
+
+def _family_total(calc: EstateTaxCalculator, family, total, premium, gift, claim_ratio,
+                  claim_taxed: bool, include_gift_tax: bool, rules: Optional[TaxRules] = None):
+    import numpy as np
+    claim = premium * claim_ratio
+    estate = total - gift - premium + (claim if claim_taxed else 0.0)
+    _, estate_tax, _ = calc.calculate_estate_tax_batch(estate, *family)
+    g_tax = gift_tax_wan(gift, rules) if include_gift_tax else np.zeros_like(gift)
+    fam = estate - estate_tax + gift - g_tax + (0.0 if claim_taxed else claim)
+    return fam, estate_tax, g_tax
+
+def optimize_allocation(calculator: EstateTaxCalculator, total_assets: float, spouse: bool,
+                        adult_children: int, other_dependents: int, disabled_people: int, parents: int,
+                        claim_ratio: float = 1.5, max_premium: Optional[float] = None,
+                        max_gift: Optional[float] = None, claim_taxed: bool = False,
+                        include_gift_tax: bool = True, curve_points: int = 101,
+                        rules: Optional[TaxRules] = None) -> AllocationResult:
+    """在 0 ≤ 保費 ≤ max_premium、0 ≤ 贈與 ≤ max_gift、保費＋贈與 ≤ 總資產 下求最佳配置（單位：萬）。"""
+    import numpy as np
+    T = float(total_assets)
+    P = T if max_premium is None else min(float(max_premium), T)
+    G = T if max_gift is None else min(float(max_gift), T)
+    family = (spouse, adult_children, other_dependents, disabled_people, parents)
+    c = calculator.constants
+    deductions = float(calculator.compute_deductions(*family))
+
+    k = (1.0 - claim_ratio) if claim_taxed else 1.0          # 遺產淨額 = T − k·p − g
+    estate_bps = [c.EXEMPT_AMOUNT + deductions] + [
+        c.EXEMPT_AMOUNT + deductions + b for b, _ in c.TAX_BRACKETS if np.isfinite(b)
+    ]
+    rules = rules or get_rules()
+    gift_bps = [rules.gift_exemption / WAN] + [
+        (rules.gift_exemption + u) / WAN for u in rules.gift_brackets.uppers if np.isfinite(u)
+    ]
+
+    Ti, Pi, Gi = int(np.floor(T)), int(np.floor(P)), int(np.floor(G))
+    g = np.arange(Gi + 1)
+    if not claim_taxed:
+        # F = φ(T − s) + c·s + max{ψ(g) − c·g : g ∈ [s − P, s] ∩ [0, G]}，s = p + g
+        s = np.arange(min(Ti, Pi + Gi) + 1)
+        _, e_tax, _ = calculator.calculate_estate_tax_batch(T - s, *family)
+        g_tax = gift_tax_wan(g, rules) if include_gift_tax else np.zeros(len(g))
+        inner, g_at = _window_argmax(g - g_tax - claim_ratio * g, np.maximum(0, s - Pi), np.minimum(Gi, s))
+        fam = (T - s) - e_tax + claim_ratio * s + inner
+        i = int(np.argmax(np.round(fam, 4)))                  # 同分時 argmax 取第一個：投入（s）最少
+        best_p, best_g = int(s[i] - g_at[i]), int(g_at[i])
+        evaluated = len(s) + len(g)
+    else:
+        # 固定 g 時，遺產淨額隨 p 以 |k| 的斜率單調變化；稅額取整最多補回 1 萬，
+        # 離有利端超過 reach 的 p 必定較差，只需列舉有利端起 reach+1 個保費
+        p_hi = np.minimum(Pi, Ti - g)
+        slope = (1.0 - max(calculator.brackets.rates)) * abs(k)
+        reach = min(Pi, int(1.0 / slope)) if k != 0 else 0
+        best_key, evaluated = None, 0
+        for d in range(reach + 1):
+            p = p_hi - d if k < 0 else np.full(len(g), d)
+            ok = (p >= 0) & (p <= p_hi)
+            if not ok.any():
+                continue
+            pp, gg = p[ok], g[ok]
+            fam, _, _ = _family_total(calculator, family, T, pp, gg, claim_ratio, True, include_gift_tax, rules)
+            j = np.lexsort((pp + gg, -np.round(fam, 4)))[0]
+            key = (-round(float(fam[j]), 4), int(pp[j] + gg[j]))
+            if best_key is None or key < best_key:
+                best_key, best_p, best_g = key, int(pp[j]), int(gg[j])
+            evaluated += len(pp)
+
+    fam, e_tax, g_tax = _family_total(calculator, family, T, np.array([best_p], dtype=float),
+                                      np.array([best_g], dtype=float), claim_ratio, claim_taxed, include_gift_tax, rules)
+
+    # 周邊曲線：每個保費下，贈與在候選值中取最佳
+    cp = np.unique(np.concatenate([np.linspace(0, P, max(2, curve_points)), [best_p]]))
+    g_cands = np.concatenate([[0.0, G], gift_bps, np.floor(gift_bps), np.ceil(gift_bps)])
+    g_grid = np.concatenate([
+        np.broadcast_to(g_cands, (len(cp), len(g_cands))),
+        (T - np.array(estate_bps))[None, :] - k * cp[:, None],                # 贈與讓遺產淨額落在斷點
+        (T - cp)[:, None],
+    ], axis=1)
+    g_grid = np.clip(g_grid, 0, np.minimum(G, T - cp)[:, None])
+    p_grid = np.broadcast_to(cp[:, None], g_grid.shape)
+    f_grid, _, _ = _family_total(calculator, family, T, p_grid.ravel(), g_grid.ravel(),
+                                 claim_ratio, claim_taxed, include_gift_tax, rules)
+    f_grid = f_grid.reshape(g_grid.shape)
+    col = np.argmax(f_grid, axis=1)
+    rows = np.arange(len(cp))
+
+    base, _, _ = _family_total(calculator, family, T, np.zeros(1), np.zeros(1), claim_ratio, claim_taxed, include_gift_tax, rules)
+    return AllocationResult(
+        premium=float(best_p), gift=float(best_g), family_total=float(fam[0]),
+        estate_tax=float(e_tax[0]), gift_tax=float(g_tax[0]),
+        baseline_family_total=float(base[0]), candidates_evaluated=int(evaluated),
+        curve_premium=cp, curve_gift=g_grid[rows, col], curve_family_total=f_grid[rows, col],
+    )
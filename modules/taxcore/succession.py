@@ -0,0 +1,167 @@
+# modules/taxcore/succession.py — 多代連續繼承（先一位配偶、再另一位、再子女）的遺產稅最小化
+#
+# 每個 FamilyNode 代表一個家庭：本人（可有配偶）的財產與下一代各子女的家庭。夫妻兩人的身故順序、
+# 第一位身故者稅後遺產分給「生存配偶」的比例皆列舉；其餘由子女均分，子女再以「自有財產＋繼承」
+# 進入下一代。結構相同的子樹取得同一個 id，子問題以 (子樹 id, 繼承金額) 記憶化：
+# 同樣的子女、同樣的繼承額只算一次，避免列舉數隨代數呈指數成長。
+# 假設：同一代內先於下一代身故；沒有下一代的子女為末代繼承人，所得不再課稅；
+# 繼承金額以 AMOUNT_RESOLUTION（萬）取整作為記憶化鍵。
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from modules.taxcore.estate import EstateTaxCalculator
+
+AMOUNT_RESOLUTION = 1.0     # 萬
+DEFAULT_SPLIT_STEPS = 10    # 生存配偶分得比例：0%、10%…100%
+
+@dataclass(frozen=True)
+class FamilyNode:
+    """一個家庭（單位：萬）。spouse_assets=None 表示無配偶；children 為下一代各子女的家庭。"""
+    assets: float
+    spouse_assets: Optional[float] = None
+    children: Tuple["FamilyNode", ...] = ()
+    parents: int = 0                 # 本人身故時尚生存的父母數
+    disabled: int = 0                # 繼承人中重度以上身心障礙者數
+    other_dependents: int = 0
+    name: str = ""
+
+@dataclass
+class SuccessionStep:
+    decedent: str
+    estate: float                    # 遺產總額（自有＋繼承）
+    tax: float
+    to_spouse: float
+    to_each_child: float
+    children: int
+
+@dataclass
+class SuccessionPlan:
+    total_tax: float
+    total_assets: float              # 全家族自有財產合計
+    steps: List[SuccessionStep]
+    subproblems: int                 # 實際計算的子問題數
+    memo_hits: int
+
+@dataclass
+class _Decision:
+    tax: float
+    spouse_first: bool = False       # True：配偶先身故
+    split: float = 0.0               # 第一位身故者稅後遺產分給生存配偶的比例
+    child_amounts: Tuple[float, ...] = field(default_factory=tuple)
+
+class SuccessionPlanner:
+    """statutory=True 時不做列舉：本人先身故、配偶依法定應繼分（與子女均分），作為「未規劃」的比較基準。"""
+    def __init__(self, calculator: EstateTaxCalculator, split_steps: int = DEFAULT_SPLIT_STEPS,
+                 memoize: bool = True, statutory: bool = False):
+        self.calculator = calculator
+        self.splits = [i / split_steps for i in range(split_steps + 1)]
+        self.memoize = memoize
+        self.statutory = statutory
+        self._ids: Dict[tuple, int] = {}
+        self._id_of: Dict[int, Tuple[FamilyNode, int]] = {}   # id(node) -> (node, 子樹 id)
+        self._memo: Dict[Tuple[int, float], _Decision] = {}
+        self.subproblems = self.memo_hits = 0
+
+    # ---------------- 子樹 id ----------------
+    def _node_id(self, node: FamilyNode) -> int:
+        """結構相同（忽略 name）的子樹回傳同一個 id；每個節點物件只算一次。"""
+        hit = self._id_of.get(id(node))
+        if hit is not None and hit[0] is node:
+            return hit[1]
+        key = (node.assets, node.spouse_assets, tuple(self._node_id(c) for c in node.children),
+               node.parents, node.disabled, node.other_dependents)
+        nid = self._ids.setdefault(key, len(self._ids))
+        self._id_of[id(node)] = (node, nid)
+        return nid
+
+    def _tax(self, estate: float, spouse: bool, node: FamilyNode) -> float:
+        _, tax, _ = self.calculator.calculate_estate_tax(
+            estate, spouse, len(node.children), node.other_dependents, node.disabled, node.parents
+        )
+        return tax
+
+    # ---------------- 求解 ----------------
+    def _children_tax(self, node: FamilyNode, ids: Tuple[int, ...], each: float) -> float:
+        return sum(self._solve(c, cid, each).tax for c, cid in zip(node.children, ids) if c.children)
+
+    def _solve(self, node: FamilyNode, node_id: int, inherited: float) -> _Decision:
+        inherited = round(inherited / AMOUNT_RESOLUTION) * AMOUNT_RESOLUTION
+        key = (node_id, inherited)
+        if self.memoize:
+            hit = self._memo.get(key)
+            if hit is not None:
+                self.memo_hits += 1
+                return hit
+        self.subproblems += 1
+        ids = tuple(self._node_id(c) for c in node.children)
+        k = len(node.children)
+        own = node.assets + inherited
+        if node.spouse_assets is None:
+            tax = self._tax(own, False, node)
+            each = (own - tax) / k if k else 0.0
+            best = _Decision(tax + (self._children_tax(node, ids, each) if k else 0.0),
+                             child_amounts=(each,))
+        else:
+            best = None
+            for spouse_first in ((False,) if self.statutory else (False, True)):
+                first, second = (node.spouse_assets, own) if spouse_first else (own, node.spouse_assets)
+                t1 = self._tax(first, True, node)
+                net1 = first - t1
+                if not k:
+                    splits = [1.0]                          # 無子女：全數由配偶繼承
+                else:
+                    splits = [1 / (k + 1)] if self.statutory else self.splits
+                for s in splits:
+                    estate2 = second + s * net1
+                    t2 = self._tax(estate2, False, node)
+                    each1 = (1 - s) * net1 / k if k else 0.0
+                    each2 = (estate2 - t2) / k if k else 0.0
+                    total = t1 + t2 + (self._children_tax(node, ids, each1 + each2) if k else 0.0)
+                    if best is None or total < best.tax - 1e-9:
+                        best = _Decision(total, spouse_first, s, (each1, each2))
+        if self.memoize:
+            self._memo[key] = best
+        return best
+
+    def plan(self, root: FamilyNode) -> SuccessionPlan:
+        """回傳整個家族的最小遺產稅總額與逐次身故明細（依身故順序）。"""
+        self.subproblems = self.memo_hits = 0
+        best = self._solve(root, self._node_id(root), 0.0)
+        steps: List[SuccessionStep] = []
+        self._trace(root, 0.0, root.name or "第1代", steps)
+        return SuccessionPlan(best.tax, _total_assets(root), steps, self.subproblems, self.memo_hits)
+
+    def _trace(self, node: FamilyNode, inherited: float, label: str, steps: List[SuccessionStep]):
+        inherited = round(inherited / AMOUNT_RESOLUTION) * AMOUNT_RESOLUTION
+        d = self._solve(node, self._node_id(node), inherited)
+        k = len(node.children)
+        own = node.assets + inherited
+        if node.spouse_assets is None:
+            tax = self._tax(own, False, node)
+            steps.append(SuccessionStep(label, own, tax, 0.0, d.child_amounts[0], k))
+            each = d.child_amounts[0]
+        else:
+            names = (f"{label} 配偶", label) if d.spouse_first else (label, f"{label} 配偶")
+            first, second = (node.spouse_assets, own) if d.spouse_first else (own, node.spouse_assets)
+            t1 = self._tax(first, True, node)
+            to_spouse = d.split * (first - t1)
+            steps.append(SuccessionStep(names[0], first, t1, to_spouse, d.child_amounts[0], k))
+            estate2 = second + to_spouse
+            steps.append(SuccessionStep(names[1], estate2, self._tax(estate2, False, node), 0.0,
+                                        d.child_amounts[1], k))
+            each = sum(d.child_amounts)
+        for i, child in enumerate(node.children, 1):
+            if child.children:
+                self._trace(child, each, child.name or f"{label}-子女{i}", steps)
+
+def _total_assets(node: FamilyNode) -> float:
+    return node.assets + (node.spouse_assets or 0.0) + sum(_total_assets(c) for c in node.children)
+
+def uniform_family(assets: float, spouse_assets: Optional[float], children: int, child_assets: float = 0.0,
+                   child_spouse_assets: Optional[float] = None, grandchildren: int = 0,
+                   parents: int = 0, disabled: int = 0, other_dependents: int = 0) -> FamilyNode:
+    """三代、每位子女條件相同的家族樹（UI 與基準測試使用）。parents／disabled／other_dependents 只套用在第一代。"""
+    grand = tuple(FamilyNode(0.0) for _ in range(grandchildren))
+    kids = tuple(FamilyNode(child_assets, child_spouse_assets, grand) for _ in range(children))
+    return FamilyNode(assets, spouse_assets, kids, parents=parents, disabled=disabled,
+                      other_dependents=other_dependents)
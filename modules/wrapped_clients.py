@@ -0,0 +1,93 @@
+# modules/wrapped_clients.py — 客戶情境庫：儲存／載入兩個模組的輸入、跨客戶比較、稅制變動後批次重算
+import pandas as pd
+import streamlit as st
+
+from modules.scenario_store import ESTATE_DEFAULTS, SavedScenario, ScenarioStore
+from modules.session_memory import EstateState
+from modules.taxcore.rules import get_rules
+from modules.wrapped_estate import INPUT_DEFAULTS
+
+# 遺產稅模組：情境庫欄位 ↔ session_state 的 widget key
+ESTATE_KEYS = {
+    "total": "estate_total", "spouse": "estate_spouse", "adult_children": "estate_children",
+    "parents": "estate_parents", "disabled_people": "estate_disabled", "other_dependents": "estate_other",
+    "premium": "premium_case", "claim": "claim_case", "gift": "case_gift",
+}
+
+def _current_inputs() -> dict:
+    ss = st.session_state
+    estate = {f: ss.get(k, INPUT_DEFAULTS.get(k, ESTATE_DEFAULTS[f])) for f, k in ESTATE_KEYS.items()}
+    state = ss.get("estate_state")
+    estate["claim_locked"] = bool(state.claim_locked) if isinstance(state, EstateState) else False
+    inputs = {"estate": {k: (bool(v) if isinstance(v, bool) else int(v)) for k, v in estate.items()}}
+    n = int(ss.get("n_years", 0) or 0)
+    if n and "y1_prem" in ss:
+        inputs["cvgift"] = {
+            "premiums": [int(ss.get(f"y{y}_prem", ss.y1_prem)) for y in range(1, n + 1)],
+            "cash_values": [int(ss.get(f"y{y}_cv", 0)) for y in range(1, n + 1)],
+            "change_year": int(ss.get("change_year", 1)),
+        }
+    return inputs
+
+def _apply(saved: SavedScenario):
+    """on_click：在下一次 rerun 建立 widget 之前，把客戶的輸入寫回 session_state。"""
+    ss = st.session_state
+    estate = {**ESTATE_DEFAULTS, **saved.inputs.get("estate", {})}
+    for f, k in ESTATE_KEYS.items():
+        ss[k] = estate[f]
+    # premium_basis=None：下一次 rerun 以載入後的稅額為基準，不會把保費／理賠金重設成預設值
+    ss["estate_state"] = EstateState(premium_basis=None, claim_locked=bool(estate["claim_locked"]))
+    cv = saved.inputs.get("cvgift")
+    if cv:
+        ss["n_years"] = len(cv["premiums"])
+        ss["change_year"] = int(cv["change_year"])
+        for y, (p, v) in enumerate(zip(cv["premiums"], cv["cash_values"]), 1):
+            ss[f"y{y}_prem"], ss[f"y{y}_cv"] = int(p), int(v)
+    ss["client_name"] = saved.client
+
+def _summary(rows, version: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        "客戶": [r.client for r in rows],
+        "更新時間": pd.to_datetime([r.updated_at for r in rows], unit="s", utc=True)
+                      .tz_convert("Asia/Taipei").strftime("%Y-%m-%d %H:%M"),
+        "稅制": [r.rule_version + ("" if r.rule_version == version else "（待重算）") for r in rows],
+        "總資產（萬）": [int(r.inputs["estate"]["total"]) for r in rows],
+        "預估遺產稅（萬）": [int(r.results["estate"]["tax"]) for r in rows],
+        "最佳情境": [r.results["estate"]["best"] for r in rows],
+        "最佳家人總共取得（萬）": [int(r.results["estate"]["best_family_total"]) for r in rows],
+        "保單節省贈與稅（元）": [r.results["cvgift"]["saving"] if "cvgift" in r.results else None for r in rows],
+    })
+
+def run_clients(store: ScenarioStore, owner: str):
+    if not st.checkbox("客戶情境庫（儲存／載入／跨客戶比較）", key="show_clients"):
+        return
+    rules = get_rules(st.session_state.get("estate_rule_year", get_rules().year))
+    c1, c2 = st.columns([3, 1], vertical_alignment="bottom")
+    name = c1.text_input("客戶名稱", key="client_name", placeholder="例如：王大明家族")
+    if c2.button("儲存目前輸入", use_container_width=True, key="client_save"):
+        try:
+            saved = store.save(owner, name, _current_inputs(), rules)
+            st.success(f"已儲存「{saved.client}」（{saved.rule_version}）")
+        except ValueError as e:
+            st.error(str(e))
+
+    rows = store.list_clients(owner)          # 一次查詢；結果皆為預先算好的值
+    if not rows:
+        st.caption("尚未儲存任何客戶。")
+        return
+    by_name = {r.client: r for r in rows}
+    l1, l2, l3 = st.columns([3, 1, 1], vertical_alignment="bottom")
+    pick = l1.selectbox("已儲存的客戶（最近更新在前）", list(by_name), key="client_pick")
+    l2.button("載入", use_container_width=True, key="client_load", on_click=_apply, args=(by_name[pick],))
+    if l3.button("刪除", use_container_width=True, key="client_delete"):
+        store.delete(owner, pick)
+        st.rerun()
+
+    stale = sum(r.rule_version != rules.version for r in rows)
+    if stale and st.button(f"以 {rules.version} 重算 {stale} 位客戶", key="client_recompute"):
+        n = store.recompute(rules, owner)
+        st.success(f"已重算 {n} 位客戶。")
+        st.rerun()
+    df = _summary(rows, rules.version)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+    del df
@@ -2,11 +2,13 @@
 import pandas as pd
 import streamlit as st
 
-EXEMPTION    = 2_440_000
-BR10_NET_MAX = 28_110_000
-BR15_NET_MAX = 56_210_000
-RATE_10, RATE_15, RATE_20 = 0.10, 0.15, 0.20
-MAX_ANNUAL   = 100_000_000
+from modules.taxcore.gift import MAX_ANNUAL
+from modules.taxcore.rules import get_rules
+from modules.taxcore.gift_plan import MAX_HORIZON, optimize_gift_plan
+from modules.taxcore.cache import CachedGiftSchedule
+from modules.taxcore.schedule import MAX_YEARS
+from modules.formatting import fmt_column
+from modules.exports import MIME, gift_schedule_sheets, input_key, lazy_export
 
 def card(label: str, value: str, note: str = ""):
     html = f'<div class="kpi"><div class="label">{label}</div><div class="value">{value}</div>'
@@ -18,96 +20,92 @@ def card(label: str, value: str, note: str = ""):
 def fmt(n: float) -> str: return f"{n:,.0f}"
 def fmt_y(n: float) -> str: return f"{fmt(n)} 元"
 
-def tax_calc(net:int):
-    if net <= 0: return 0, "—"
-    if net <= BR10_NET_MAX: return int(round(net * RATE_10)), "10%"
-    if net <= BR15_NET_MAX:
-        base = BR10_NET_MAX * RATE_10
-        extra = (net - BR10_NET_MAX) * RATE_15
-        return int(round(base + extra)), "15%"
-    base = BR10_NET_MAX * RATE_10 + (BR15_NET_MAX - BR10_NET_MAX) * RATE_15
-    extra = (net - BR15_NET_MAX) * RATE_20
-    return int(round(base + extra)), "20%"
+DEFAULT_YEARS = 3
+DEFAULT_CV = {1: 5_000_000, 2: 14_000_000, 3: 24_000_000}   # 其餘年度預設 0
+
+def _n_years() -> int:
+    return int(st.session_state.get("n_years", DEFAULT_YEARS))
 
 def _on_prem_change():
     p = int(st.session_state.y1_prem)
-    st.session_state.y2_prem = p
-    st.session_state.y3_prem = p
-    st.session_state.y1_cv = 0
-    st.session_state.y2_cv = 0
-    st.session_state.y3_cv = 0
+    for y in range(1, _n_years() + 1):
+        if y > 1:
+            st.session_state[f"y{y}_prem"] = p
+        st.session_state[f"y{y}_cv"] = 0
+
+def _schedule(premiums, cash_values, change_year) -> CachedGiftSchedule:
+    """同一個 session 重複使用引擎：只有變動的年度會重算；稅額查表與其他 session 共用 RESULT_CACHE。"""
+    engine = st.session_state.get("cv_schedule")
+    if isinstance(engine, CachedGiftSchedule):
+        engine.update(premiums, cash_values, change_year)
+    else:
+        engine = CachedGiftSchedule(premiums, cash_values, change_year)
+        st.session_state["cv_schedule"] = engine
+    return engine
 
 def run_cvgift():
     DEFAULTS = {
+        "n_years": DEFAULT_YEARS,
         "change_year": 1,
         "y1_prem": 10_000_000,
-        "y2_prem": 10_000_000,
-        "y3_prem": 10_000_000,
-        "y1_cv":   5_000_000,
-        "y2_cv":  14_000_000,
-        "y3_cv":  24_000_000,
     }
     for k, v in DEFAULTS.items():
         if k not in st.session_state:
             st.session_state[k] = v
 
     st.title("保單規劃｜用同樣現金流，更聰明完成贈與")
-    st.caption("單位：新台幣。稅制假設（114年/2025）：年免稅 2,440,000；10% 淨額上限 28,110,000；15% 淨額上限 56,210,000。")
-
-    st.number_input("年繳保費（元）",
-        min_value=0, max_value=MAX_ANNUAL, step=100_000, format="%d",
-        key="y1_prem", on_change=_on_prem_change)
-
-    st.selectbox("第幾年變更要保人（交棒）",
-        options=[1, 2, 3], index=0, key="change_year")
-
-    p = int(st.session_state.y1_prem)
-    max_y1, max_y2, max_y3 = p*1, p*2, p*3
-
-    st.subheader("前三年保價金（年末現金價值）")
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        st.number_input("第 1 年保價金（元）", min_value=0, max_value=max_y1, step=100_000, format="%d", key="y1_cv")
-    with c2:
-        st.number_input("第 2 年保價金（元）", min_value=0, max_value=max_y2, step=100_000, format="%d", key="y2_cv")
-    with c3:
-        st.number_input("第 3 年保價金（元）", min_value=0, max_value=max_y3, step=100_000, format="%d", key="y3_cv")
-
-    st.session_state.y2_prem = st.session_state.y1_prem
-    st.session_state.y3_prem = st.session_state.y1_prem
-
-    def build_schedule_3y():
-        rows, cum = [], 0
-        for y in (1, 2, 3):
-            premium = int(st.session_state.y1_prem)
-            cum += premium
-            cv = int(st.session_state[f"y{y}_cv"])
-            rows.append({"年度": y, "每年投入（元）": premium, "累計投入（元）": cum, "年末現金價值（元）": cv})
-        return pd.DataFrame(rows)
-
-    df_years = build_schedule_3y()
+    rules = get_rules()
+    caps = "；".join(f"{r * 100:g}% 淨額上限 {int(u):,}"
+                    for u, r in rules.gift_brackets.pairs() if u != float("inf"))
+    st.caption(f"單位：新台幣。稅制假設（{rules.year - 1911}年/{rules.year}）：年免稅 {rules.gift_exemption:,}；{caps}。")
+
+    c_prem, c_years, c_change = st.columns([2, 1, 1])
+    with c_prem:
+        st.number_input("年繳保費（元）",
+            min_value=0, max_value=MAX_ANNUAL, step=100_000, format="%d",
+            key="y1_prem", on_change=_on_prem_change)
+    with c_years:
+        st.number_input("繳費年期（年）", min_value=1, max_value=MAX_YEARS, step=1, format="%d", key="n_years")
+    n_years = _n_years()
+    for y in range(2, n_years + 1):
+        st.session_state.setdefault(f"y{y}_prem", int(st.session_state.y1_prem))
+    for y in range(1, n_years + 1):
+        st.session_state.setdefault(f"y{y}_cv", DEFAULT_CV.get(y, 0))
+    if int(st.session_state.change_year) > n_years:
+        st.session_state.change_year = n_years
+    with c_change:
+        st.selectbox("第幾年變更要保人（交棒）", options=list(range(1, n_years + 1)), key="change_year")
+
+    if n_years > 1:
+        with st.expander("逐年保費（預設與年繳保費相同，可逐年調整）", expanded=False):
+            cols = st.columns(5)
+            for y in range(2, n_years + 1):
+                with cols[(y - 2) % 5]:
+                    st.number_input(f"第 {y} 年保費（元）", min_value=0, max_value=MAX_ANNUAL,
+                                    step=100_000, format="%d", key=f"y{y}_prem")
+
+    premiums = [int(st.session_state.y1_prem)] + [int(st.session_state[f"y{y}_prem"]) for y in range(2, n_years + 1)]
+
+    st.subheader(f"逐年保價金（年末現金價值，第 1～{n_years} 年）")
+    cols = st.columns(min(5, n_years))
+    cum = 0
+    for y in range(1, n_years + 1):
+        cum += premiums[y - 1]
+        key = f"y{y}_cv"
+        if int(st.session_state[key]) > cum:      # 保費調低後，保價金不得超過累計保費
+            st.session_state[key] = cum
+        with cols[(y - 1) % len(cols)]:
+            st.number_input(f"第 {y} 年保價金（元）", min_value=0, max_value=cum, step=100_000, format="%d", key=key)
+
+    cash_values = [int(st.session_state[f"y{y}_cv"]) for y in range(1, n_years + 1)]
     change_year = int(st.session_state.change_year)
+    schedule = _schedule(premiums, cash_values, change_year)
 
-    cv_at_change = int(df_years.loc[df_years["年度"] == change_year, "年末現金價值（元）"].iloc[0])
-    nominal_transfer_to_N = int(df_years.loc[df_years["年度"] <= change_year, "每年投入（元）"].sum())
-
-    gift_with_policy = cv_at_change
-    net_with_policy  = max(0, gift_with_policy - EXEMPTION)
-    tax_with_policy, rate_with = tax_calc(net_with_policy)
-
-    total_tax_no_policy, yearly_tax_list = 0, []
-    for _, r in df_years[df_years["年度"] <= change_year].iterrows():
-        annual_i = int(r["每年投入（元）"])
-        net = max(0, annual_i - EXEMPTION)
-        t, rate = tax_calc(net)
-        total_tax_no_policy += t
-        yearly_tax_list.append({
-            "年度": int(r["年度"]),
-            "現金贈與（元）": annual_i,
-            "免稅後淨額（元）": net,
-            "應納贈與稅（元）": t,
-            "適用稅率": rate
-        })
+    nominal_transfer_to_N = schedule.nominal_transfer()
+    policy = schedule.policy_gift()
+    gift_with_policy = policy["gift"]
+    tax_with_policy, rate_with = policy["tax"], policy["rate"]
+    total_tax_no_policy = schedule.cash_gift_tax()
 
     tax_saving   = total_tax_no_policy - tax_with_policy
     saving_label = "節省之贈與稅" if tax_saving >= 0 else "增加之贈與稅"
@@ -126,26 +124,57 @@ def run_cvgift():
         st.markdown("**稅負差異**")
         card(f"至第 {change_year} 年{saving_label}", fmt_y(abs(tax_saving)))
 
-    with st.expander("年度明細與逐年稅額（1～3 年）", expanded=False):
-        st.markdown("**年度現金價值（1～3 年皆為手動輸入）**")
+    with st.expander(f"年度明細與逐年稅額（1～{n_years} 年）", expanded=False):
+        st.markdown(f"**年度現金價值（1～{n_years} 年皆為手動輸入）**")
+        df_years = pd.DataFrame(schedule.years_table())
         df_show = df_years.copy()
-        df_show["每年投入（元）"] = df_show["每年投入（元）"].map(fmt)
-        df_show["累計投入（元）"] = df_show["累計投入（元）"].map(fmt)
-        df_show["年末現金價值（元）"] = df_show["年末現金價值（元）"].map(fmt)
+        for c in ["每年投入（元）", "累計投入（元）", "年末現金價值（元）"]:
+            df_show[c] = fmt_column(df_show[c])
         st.dataframe(df_show, use_container_width=True, hide_index=True)
 
         st.markdown("**現金贈與：逐年稅額（第 1～變更年）**")
-        df_no = pd.DataFrame(sorted(yearly_tax_list, key=lambda x: x["年度"]))
+        df_no = pd.DataFrame(schedule.cash_gift_table())
         df_no_show = df_no.copy()
         for c in ["現金贈與（元）", "免稅後淨額（元）", "應納贈與稅（元）"]:
-            df_no_show[c] = df_no_show[c].map(fmt_y)
+            df_no_show[c] = fmt_column(df_no_show[c], suffix=" 元")
         st.dataframe(df_no_show, use_container_width=True, hide_index=True)
-
-        # 匯出 CSV
-        csv_all = pd.concat([df_years, df_no], axis=1)
-        st.download_button(
-            "下載明細（CSV）",
-            data=csv_all.to_csv(index=False).encode("utf-8-sig"),
-            file_name="年度明細_逐年稅額.csv",
-            mime="text/csv"
-        )
+        del df_years, df_show, df_no, df_no_show     # 衍生表格畫完即釋放；下載檔另由 exports 依需要產生
+
+        # 匯出：按下才產生（同一組輸入走 EXPORT_CACHE），rerun 時不做任何轉檔
+        prem_t, cv_t = tuple(premiums), tuple(cash_values)
+        key = input_key("cvgift", prem_t, cv_t, change_year, rules.version)
+        sheets = lambda: gift_schedule_sheets(CachedGiftSchedule(prem_t, cv_t, change_year, rules=rules))
+        d1, d2 = st.columns(2)
+        for col, ext, label in ((d1, "csv", "下載明細（CSV）"), (d2, "xlsx", "下載明細（Excel）")):
+            col.download_button(label, data=lazy_export(ext, key, sheets), file_name=f"年度明細_逐年稅額.{ext}",
+                                mime=MIME[ext], on_click="ignore", key=f"cv_export_{ext}")
+
+    # 多年度贈與排程：DP 在年免稅額與級距門檻上分配每年贈與，並評估各年變更要保人
+    st.subheader("最省稅的多年度贈與排程")
+    if st.checkbox("依移轉目標試算最佳排程（現金贈與＋變更要保人）", key="show_gift_plan"):
+        g1, g2, g3 = st.columns([2, 1, 1])
+        target = g1.number_input("移轉目標（元）", min_value=0, max_value=MAX_ANNUAL * MAX_HORIZON,
+                                 value=100_000_000, step=1_000_000, format="%d", key="plan_target")
+        horizon = g2.number_input("規劃年數", min_value=1, max_value=MAX_HORIZON, value=10, step=1, key="plan_years")
+        use_policy = g3.checkbox("納入上方保單", value=True, key="plan_policy")
+        plan = optimize_gift_plan(int(target), int(horizon), premiums if use_policy else None,
+                                  cash_values if use_policy else None, rules=schedule.rules)
+        colP, colQ, colR = st.columns(3)
+        with colP:
+            note = f"第 {plan.change_year} 年變更要保人" if plan.change_year else "僅現金贈與"
+            card("最佳排程：贈與稅合計", fmt_y(plan.total_tax), note=note)
+        with colQ:
+            card("每年平均現金贈與：贈與稅合計", fmt_y(plan.equal_split_tax))
+        with colR:
+            card("節省之贈與稅", fmt_y(plan.equal_split_tax - plan.total_tax),
+                 note=f"名目移轉 {fmt(plan.nominal_transfer)} 元（以 {plan.unit:,} 元為單位）")
+        df_plan = pd.DataFrame({
+            "年度": [y.year for y in plan.years],
+            "現金贈與（元）": [y.cash_gift for y in plan.years],
+            "保單視為贈與（元）": [y.policy_gift for y in plan.years],
+            "應納贈與稅（元）": [y.tax for y in plan.years],
+        })
+        for c in ["現金贈與（元）", "保單視為贈與（元）", "應納贈與稅（元）"]:
+            df_plan[c] = fmt_column(df_plan[c], suffix=" 元")
+        st.dataframe(df_plan, use_container_width=True, hide_index=True)
+        del df_plan
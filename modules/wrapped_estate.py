@@ -2,63 +2,28 @@
 import streamlit as st
 import pandas as pd
 import math
-from typing import Tuple, List
-from dataclasses import dataclass, field
-
-@dataclass
-class TaxConstants:
-    EXEMPT_AMOUNT: float = 1333
-    FUNERAL_EXPENSE: float = 138
-    SPOUSE_DEDUCTION_VALUE: float = 553
-    ADULT_CHILD_DEDUCTION: float = 56
-    PARENTS_DEDUCTION: float = 138
-    DISABLED_DEDUCTION: float = 693
-    OTHER_DEPENDENTS_DEDUCTION: float = 56
-    TAX_BRACKETS: List[Tuple[float, float]] = field(
-        default_factory=lambda: [(5621, 0.10),(11242, 0.15),(float("inf"), 0.20)]
-    )
-
-class EstateTaxCalculator:
-    def __init__(self, constants: TaxConstants):
-        self.constants = constants
-
-    def compute_deductions(self, spouse: bool, adult_children: int, other_dependents: int,
-                           disabled_people: int, parents: int) -> float:
-        spouse_deduction = self.constants.SPOUSE_DEDUCTION_VALUE if spouse else 0
-        return (
-            spouse_deduction + self.constants.FUNERAL_EXPENSE +
-            disabled_people * self.constants.DISABLED_DEDUCTION +
-            adult_children * self.constants.ADULT_CHILD_DEDUCTION +
-            other_dependents * self.constants.OTHER_DEPENDENTS_DEDUCTION +
-            parents * self.constants.PARENTS_DEDUCTION
-        )
 
-    @st.cache_data
-    def calculate_estate_tax(_self, total_assets: float, spouse: bool, adult_children: int,
-                             other_dependents: int, disabled_people: int, parents: int):
-        deductions = _self.compute_deductions(spouse, adult_children, other_dependents, disabled_people, parents)
-        if total_assets < _self.constants.EXEMPT_AMOUNT + deductions:
-            return 0, 0, deductions
-        taxable_amount = max(0, total_assets - _self.constants.EXEMPT_AMOUNT - deductions)
-        tax_due = 0.0
-        previous = 0
-        for bracket, rate in _self.constants.TAX_BRACKETS:
-            if taxable_amount > previous:
-                taxable_at = min(taxable_amount, bracket) - previous
-                tax_due += taxable_at * rate
-                previous = bracket
-        return taxable_amount, round(tax_due, 0), deductions
+from modules.taxcore.estate import TaxConstants
+from modules.taxcore.rules import available_years, get_rules
+from modules.taxcore.scenarios import estate_scenarios
+from modules.taxcore.solver import optimize_allocation
+from modules.taxcore.succession import SuccessionPlanner, uniform_family
+from modules.taxcore.projection import DEFAULT_PERCENTILES, MAX_HORIZON, iter_projection
+from modules.perf import span, timed
+from modules.formatting import fmt_table
+from modules.session_memory import EstateState
+from modules.exports import MIME, estate_scenario_sheet, input_key, lazy_export
+from modules.charts import assets_curve_json, figure_from_json, premium_curve_json
+# 計算結果走全 process 共用的 LRU/TTL 快取（鍵值含稅制版本與 TaxConstants 內容）
+from modules.taxcore.cache import CachedEstateTaxCalculator as EstateTaxCalculator
 
+@timed("estate.fmt_table")
 def _fmt_table(df: pd.DataFrame) -> pd.DataFrame:
-    out = pd.DataFrame(index=df.index)
-    for col in df.columns:
-        s = df[col]
-        s_num = pd.to_numeric(s, errors="coerce")
-        if s_num.notna().mean() >= 0.5:
-            out[col] = s_num.map(lambda x: f"{int(x):,}" if pd.notna(x) else "—")
-        else:
-            out[col] = s.map(lambda x: "—" if pd.isna(x) else str(x))
-    return out
+    # 整欄向量化格式化（數值欄 → f"{int(x):,}"，缺值 → —），結果依資料內容快取
+    return fmt_table(df, rounding="trunc")
+
+INPUT_DEFAULTS = {"estate_total": 5000, "estate_spouse": False, "estate_children": 0, "estate_parents": 0,
+                  "estate_disabled": 0, "estate_other": 0}
 
 class EstateTaxUI:
     def __init__(self, calculator: EstateTaxCalculator):
@@ -66,18 +31,28 @@ class EstateTaxUI:
 
     def render_ui(self):
         st.markdown("<h1 class='main-header'>AI秒算遺產稅</h1>", unsafe_allow_html=True)
-        st.selectbox("選擇適用地區", ["台灣（2025年起）"], index=0)
+        years = available_years()
+        year = st.selectbox("選擇適用地區", years, index=years.index(get_rules().year),
+                            format_func=lambda y: f"台灣（{y}年起）", key="estate_rule_year")
+        self.rules = get_rules(year)
+        if self.rules is not get_rules():   # 預設年度沿用 run_estate 建好的計算器
+            self.calculator = EstateTaxCalculator(TaxConstants.from_rules(self.rules),
+                                                  rule_version=self.rules.version)
+        c = self.calculator.constants
 
         with st.container():
             st.markdown("## 請輸入資產及家庭資訊")
-            total_assets_input = st.number_input("總資產（萬）", min_value=1000, max_value=100000, value=5000, step=100)
+            for k, v in INPUT_DEFAULTS.items():       # 以 key 保存輸入，客戶情境庫可直接載入
+                st.session_state.setdefault(k, v)
+            total_assets_input = st.number_input("總資產（萬）", min_value=1000, max_value=100000, step=100, key="estate_total")
             st.markdown("---")
-            has_spouse = st.checkbox("是否有配偶（扣除額 553 萬）", value=False)
-            adult_children_input = st.number_input("直系血親卑親屬數（每人 56 萬）", min_value=0, max_value=10, value=0)
-            parents_input = st.number_input("父母數（每人 138 萬，最多 2 人）", min_value=0, max_value=2, value=0)
+            has_spouse = st.checkbox(f"是否有配偶（扣除額 {c.SPOUSE_DEDUCTION_VALUE:g} 萬）", key="estate_spouse")
+            adult_children_input = st.number_input(f"直系血親卑親屬數（每人 {c.ADULT_CHILD_DEDUCTION:g} 萬）", min_value=0, max_value=10, key="estate_children")
+            parents_input = st.number_input(f"父母數（每人 {c.PARENTS_DEDUCTION:g} 萬，最多 2 人）", min_value=0, max_value=2, key="estate_parents")
             max_disabled = (1 if has_spouse else 0) + adult_children_input + parents_input
-            disabled_people_input = st.number_input("重度以上身心障礙者數（每人 693 萬）", min_value=0, max_value=max_disabled, value=0)
-            other_dependents_input = st.number_input("受撫養之兄弟姊妹、祖父母數（每人 56 萬）", min_value=0, max_value=5, value=0)
+            if st.session_state["estate_disabled"] > max_disabled: st.session_state["estate_disabled"] = max_disabled
+            disabled_people_input = st.number_input(f"重度以上身心障礙者數（每人 {c.DISABLED_DEDUCTION:g} 萬）", min_value=0, max_value=max_disabled, key="estate_disabled")
+            other_dependents_input = st.number_input(f"受撫養之兄弟姊妹、祖父母數（每人 {c.OTHER_DEPENDENTS_DEDUCTION:g} 萬）", min_value=0, max_value=5, key="estate_other")
 
         taxable_amount, tax_due, _ = self.calculator.calculate_estate_tax(
             total_assets_input, has_spouse, adult_children_input, other_dependents_input, disabled_people_input, parents_input
@@ -102,6 +77,7 @@ class EstateTaxUI:
                 ]
             }, index=["免稅額","喪葬費扣除額","配偶扣除額","直系血親卑親屬扣除額","父母扣除額","重度身心障礙扣除額","其他撫養扣除額"])
             st.table(_fmt_table(df_d))
+            del df_d                              # 衍生表格畫完即釋放（render_ui 後面還有長時間的試算）
         with c3:
             st.markdown("**稅務計算**")
             st.table(_fmt_table(pd.DataFrame({"金額（萬）":[int(taxable_amount), int(tax_due)]}, index=["課稅遺產淨額","預估遺產稅"])))
@@ -121,19 +97,20 @@ class EstateTaxUI:
         default_claim = int(default_premium * 1.5)
 
         basis = int(default_premium)
-        if "premium_basis" not in st.session_state: st.session_state.premium_basis = basis
-        if st.session_state.premium_basis != basis and not st.session_state.get("claim_locked", False):
+        state = st.session_state.setdefault("estate_state", EstateState())
+        if state.premium_basis is None: state.premium_basis = basis
+        if state.premium_basis != basis and not state.claim_locked:
             st.session_state["premium_case"] = default_premium
             st.session_state["claim_case"] = default_claim
-            st.session_state.premium_basis = basis
+            state.premium_basis = basis
         if "premium_case" not in st.session_state: st.session_state["premium_case"] = default_premium
         if "claim_case" not in st.session_state: st.session_state["claim_case"] = default_claim
 
         def _sync_claim_from_premium():
-            if not st.session_state.get("claim_locked", False):
+            if not state.claim_locked:
                 st.session_state["claim_case"] = int(st.session_state["premium_case"] * 1.5)
 
-        def _lock_claim(): st.session_state["claim_locked"] = True
+        def _lock_claim(): state.claim_locked = True
 
         premium_case = st.number_input("購買保險保費（萬）", min_value=0, max_value=CASE_TOTAL_ASSETS,
                                        value=st.session_state["premium_case"], step=100, key="premium_case", format="%d",
@@ -151,24 +128,136 @@ class EstateTaxUI:
         if premium_case > CASE_TOTAL_ASSETS: st.error("錯誤：保費不得高於總資產！")
         if gift_case > CASE_TOTAL_ASSETS - premium_case: st.error("錯誤：提前贈與金額不得高於【總資產】-【保費】！")
 
-        def _calc(total):
-            _, t, _ = self.calculator.calculate_estate_tax(total, CASE_SPOUSE, CASE_ADULT_CHILDREN, CASE_OTHER, CASE_DISABLED, CASE_PARENTS)
-            return t
+        with span("estate.scenarios"):
+            scenarios = estate_scenarios(self.calculator, CASE_TOTAL_ASSETS, CASE_SPOUSE, CASE_ADULT_CHILDREN,
+                                         CASE_OTHER, CASE_DISABLED, CASE_PARENTS, premium_case, claim_case, gift_case)
+        df_case_results = pd.DataFrame({
+            "遺產稅（萬）": [int(t) for _, t, _ in scenarios],
+            "家人總共取得（萬）": [int(n) for _, _, n in scenarios],
+        }, index=[label for label, _, _ in scenarios])
+        with span("estate.table"):
+            st.table(_fmt_table(df_case_results))
+        del df_case_results
+        key = input_key("estate", self.rules.version, CASE_TOTAL_ASSETS, CASE_SPOUSE, CASE_ADULT_CHILDREN,
+                        CASE_OTHER, CASE_DISABLED, CASE_PARENTS, premium_case, claim_case, gift_case)
+        sheets = lambda: [estate_scenario_sheet(scenarios)]
+        d1, d2, _ = st.columns([1, 1, 2])
+        for col, ext, label in ((d1, "csv", "下載情境表（CSV）"), (d2, "xlsx", "下載情境表（Excel）")):
+            col.download_button(label, data=lazy_export(ext, key, sheets), file_name=f"遺產稅情境.{ext}",
+                                mime=MIME[ext], on_click="ignore", key=f"estate_export_{ext}")
 
-        tax_case_no_plan = _calc(CASE_TOTAL_ASSETS); net_case_no_plan = CASE_TOTAL_ASSETS - tax_case_no_plan
-        effective_case_gift = CASE_TOTAL_ASSETS - gift_case; tax_case_gift = _calc(effective_case_gift); net_case_gift = effective_case_gift - tax_case_gift + gift_case
-        effective_case_insurance = CASE_TOTAL_ASSETS - premium_case; tax_case_insurance = _calc(effective_case_insurance); net_case_insurance = effective_case_insurance - tax_case_insurance + claim_case
-        effective_case_combo_not_tax = CASE_TOTAL_ASSETS - gift_case - premium_case; tax_case_combo_not_tax = _calc(effective_case_combo_not_tax); net_case_combo_not_tax = effective_case_combo_not_tax - tax_case_combo_not_tax + claim_case + gift_case
-        effective_case_combo_tax = CASE_TOTAL_ASSETS - gift_case - premium_case + claim_case; tax_case_combo_tax = _calc(effective_case_combo_tax); net_case_combo_tax = effective_case_combo_tax - tax_case_combo_tax + gift_case
+        # 最佳配置：在「提前贈與＋購買保險」架構下，求使家人總共取得最大的保費與贈與
+        st.markdown("---"); st.markdown("## 最佳保費／贈與配置")
+        if st.checkbox("計算最佳配置（贈與超過年免稅額 244 萬的部分計入贈與稅）", key="show_optimizer"):
+            claim_ratio = (claim_case / premium_case) if premium_case > 0 else 1.5
+            o1, o2 = st.columns(2)
+            max_premium = o1.number_input("保費預算上限（萬）", min_value=0, max_value=CASE_TOTAL_ASSETS,
+                                          value=min(int(premium_case) or CASE_TOTAL_ASSETS, CASE_TOTAL_ASSETS),
+                                          step=100, key="opt_max_premium", format="%d")
+            claim_taxed = o2.checkbox("理賠金被實質課稅（計入遺產）", value=False, key="opt_claim_taxed")
+            with span("estate.optimizer"):
+                opt = optimize_allocation(self.calculator, CASE_TOTAL_ASSETS, CASE_SPOUSE, CASE_ADULT_CHILDREN,
+                                          CASE_OTHER, CASE_DISABLED, CASE_PARENTS, claim_ratio=claim_ratio,
+                                          max_premium=max_premium, claim_taxed=claim_taxed, rules=self.rules)
+            st.caption(f"理賠金／保費倍數 {claim_ratio:.2f}（依上方輸入）；於整數（萬）格點精確求解，計算 {opt.candidates_evaluated:,} 個候選值。")
+            st.table(_fmt_table(pd.DataFrame({"金額（萬）": [
+                int(opt.premium), int(opt.gift), int(opt.estate_tax), int(opt.gift_tax),
+                int(opt.family_total), int(opt.family_total - opt.baseline_family_total)
+            ]}, index=["建議保費", "建議提前贈與", "遺產稅", "贈與稅", "家人總共取得", "較沒有規劃增加"])))
+            st.line_chart(pd.DataFrame({"家人總共取得（萬）": opt.curve_family_total,
+                                        "最佳提前贈與（萬）": opt.curve_gift},
+                                       index=pd.Index(opt.curve_premium, name="保費（萬）")))
 
-        df_case_results = pd.DataFrame({
-            "遺產稅（萬）": list(map(int, [tax_case_no_plan, tax_case_gift, tax_case_insurance, tax_case_combo_not_tax, tax_case_combo_tax])),
-            "家人總共取得（萬）": list(map(int, [net_case_no_plan, net_case_gift, net_case_insurance, net_case_combo_not_tax, net_case_combo_tax]))
-        }, index=["沒有規劃","提前贈與","購買保險","提前贈與＋購買保險","提前贈與＋購買保險（被實質課稅）"])
-        st.table(_fmt_table(df_case_results))
+        # 稅額曲線：批次計算後降採樣，圖表 JSON 依家庭組成與稅制版本快取，rerun 不重算
+        st.markdown("---"); st.markdown("## 稅額曲線")
+        if st.checkbox("顯示遺產稅／家人總共取得曲線", key="show_curves"):
+            family = (CASE_SPOUSE, CASE_ADULT_CHILDREN, CASE_OTHER, CASE_DISABLED, CASE_PARENTS)
+            t_assets, t_premium = st.tabs(["依總資產", "依保費"])
+            with span("estate.curves"):
+                with t_assets:
+                    fig_json = assets_curve_json(self.calculator, *family, max_assets=max(2 * CASE_TOTAL_ASSETS, 20_000),
+                                                 rule_version=self.rules.version)
+                    st.plotly_chart(figure_from_json(fig_json), key="curve_assets")
+                with t_premium:
+                    fig_json = premium_curve_json(self.calculator, CASE_TOTAL_ASSETS, *family, gift=gift_case,
+                                                  claim_ratio=(claim_case / premium_case) if premium_case > 0 else 1.5,
+                                                  rule_version=self.rules.version)
+                    st.plotly_chart(figure_from_json(fig_json), key="curve_premium")
+
+        # 多代連續繼承：列舉夫妻身故順序與配偶分得比例，子女再傳孫輩；子問題記憶化
+        st.markdown("---"); st.markdown("## 多代傳承試算")
+        if st.checkbox("試算配偶、子女連續繼承的遺產稅（求最省稅的順序與分配）", key="show_succession"):
+            s1, s2, s3, s4 = st.columns(4)
+            spouse_assets = s1.number_input("配偶自有財產（萬）", min_value=0, max_value=100_000, value=0, step=100,
+                                            key="succ_spouse_assets", disabled=not CASE_SPOUSE)
+            child_assets = s2.number_input("每位子女自有財產（萬）", min_value=0, max_value=100_000, value=0, step=100, key="succ_child_assets")
+            child_married = s3.checkbox("子女已婚（配偶財產同右）", value=False, key="succ_child_married")
+            child_spouse_assets = s3.number_input("子女配偶財產（萬）", min_value=0, max_value=100_000, value=0, step=100,
+                                                  key="succ_child_spouse_assets", disabled=not child_married)
+            grandchildren = s4.number_input("每位子女的子女數", min_value=0, max_value=6, value=2, step=1, key="succ_grandchildren")
+            if CASE_ADULT_CHILDREN == 0:
+                st.info("請先於上方輸入直系血親卑親屬數（子女數）。")
+            else:
+                root = uniform_family(CASE_TOTAL_ASSETS, spouse_assets if CASE_SPOUSE else None, CASE_ADULT_CHILDREN,
+                                      child_assets=child_assets, grandchildren=grandchildren, parents=CASE_PARENTS,
+                                      disabled=CASE_DISABLED, other_dependents=CASE_OTHER,
+                                      child_spouse_assets=child_spouse_assets if child_married else None)
+                with span("estate.succession"):
+                    best = SuccessionPlanner(self.calculator).plan(root)
+                    base = SuccessionPlanner(self.calculator, statutory=True).plan(root)
+                st.caption(f"全家族財產 {best.total_assets:,.0f} 萬；計算 {best.subproblems} 個子問題（記憶化命中 {best.memo_hits} 次）。"
+                           "比較基準：本人先身故、配偶依法定應繼分與子女均分。")
+                st.table(_fmt_table(pd.DataFrame({"金額（萬）": [
+                    int(base.total_tax), int(best.total_tax), int(base.total_tax - best.total_tax),
+                ]}, index=["依法定應繼分：遺產稅合計", "最佳順序與分配：遺產稅合計", "可節省遺產稅"])))
+                st.table(_fmt_table(pd.DataFrame({
+                    "遺產總額（萬）": [step.estate for step in best.steps],
+                    "遺產稅（萬）": [step.tax for step in best.steps],
+                    "分給配偶（萬）": [step.to_spouse for step in best.steps],
+                    "每位子女取得（萬）": [step.to_each_child for step in best.steps],
+                }, index=pd.Index([f"{i}. {step.decedent}" for i, step in enumerate(best.steps, 1)], name="身故順序"))))
+
+        # 未來資產成長：蒙地卡羅模擬各年度身故時的遺產稅分布，逐年串流更新圖表
+        st.markdown("---"); st.markdown("## 未來遺產稅推估（資產成長模擬）")
+        if st.checkbox("模擬未來 10～30 年資產成長下的遺產稅", key="show_projection"):
+            p1, p2, p3, p4 = st.columns(4)
+            horizon = p1.number_input("推估年數", min_value=1, max_value=MAX_HORIZON, value=20, step=1, key="proj_years")
+            mean_return = p2.number_input("年化報酬率（%）", min_value=-10.0, max_value=20.0, value=4.0, step=0.5, key="proj_return")
+            volatility = p3.number_input("年化波動度（%）", min_value=0.0, max_value=50.0, value=12.0, step=1.0, key="proj_vol")
+            n_paths = p4.selectbox("模擬路徑數", [10_000, 50_000, 100_000], index=2, key="proj_paths",
+                                   format_func=lambda n: f"{n:,}")
+            q1, q2, q3 = st.columns(3)
+            withdrawal = q1.number_input("每年生活支出（萬）", min_value=0, max_value=10_000, value=0, step=10, key="proj_withdrawal")
+            with_policy = q2.checkbox("含上方保單（保費先扣、理賠金身故給付）", value=False, key="proj_policy")
+            seed = q3.number_input("亂數種子（相同種子結果可重現）", min_value=0, max_value=2**31 - 1, value=0, step=1, key="proj_seed")
+
+            chart = st.empty()
+            labels = [f"P{int(q)}" for q in DEFAULT_PERCENTILES]
+            rows = []
+            with span("estate.projection"):
+                for step in iter_projection(
+                    self.calculator, CASE_TOTAL_ASSETS, CASE_SPOUSE, CASE_ADULT_CHILDREN, CASE_OTHER,
+                    CASE_DISABLED, CASE_PARENTS, years=int(horizon), paths=int(n_paths),
+                    mean_return=mean_return / 100, volatility=volatility / 100, annual_withdrawal=withdrawal,
+                    premium=premium_case if with_policy else 0, claim=claim_case if with_policy else 0,
+                    seed=int(seed),
+                ):
+                    rows.append(step)
+                    if step.year % 5 == 0 or step.year == horizon:
+                        chart.line_chart(pd.DataFrame([s.estate_tax for s in rows], columns=labels,
+                                                      index=pd.Index([s.year for s in rows], name="年後身故")))
+            last = rows[-1]
+            st.caption(f"{int(n_paths):,} 條路徑；{int(horizon)} 年後平均遺產稅 {last.mean_tax:,.0f} 萬，"
+                       f"需繳稅機率 {last.taxable_share:.0%}。圖為遺產稅（萬）分位數。")
+            pick = [s for s in rows if s.year % 5 == 0 or s.year == horizon]
+            st.table(_fmt_table(pd.DataFrame(
+                {f"遺產總額 {l}（萬）": [s.assets[i] for s in pick] for i, l in enumerate(labels) if l in ("P5", "P50", "P95")}
+                | {f"遺產稅 {l}（萬）": [s.estate_tax[i] for s in pick] for i, l in enumerate(labels) if l in ("P5", "P50", "P95")}
+                | {"家人總共取得 P50（萬）": [s.family_total[labels.index("P50")] for s in pick]},
+                index=pd.Index([f"{s.year} 年後" for s in pick]))))
 
 def run_estate():
-    constants = TaxConstants()
+    constants = TaxConstants.from_rules()
     calculator = EstateTaxCalculator(constants)
     ui = EstateTaxUI(calculator)
     ui.render_ui()
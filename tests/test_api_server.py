@@ -0,0 +1,32 @@
+# tests/test_api_server.py — 本機 API：HTTP 請求解析、是／否欄位
+import pytest
+
+from api_server import ApiError, _parse_request, estate_batch, estate_single
+
+def _request(content_length: str) -> bytearray:
+    return bytearray(f"POST /v1/estate HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\nhello".encode())
+
+@pytest.mark.parametrize("value", ["-1", "abc", "+5", "1_0"])
+def test_invalid_content_length_rejected(value):
+    with pytest.raises(ApiError) as e:
+        _parse_request(_request(value))
+    assert e.value.status == 400
+
+def test_content_length_reads_body():
+    assert _parse_request(_request("5"))[4] == b"hello"
+
+@pytest.mark.parametrize("spouse", ["false", "true", "", 2, None, 1.0])
+def test_non_boolean_spouse_rejected(spouse):
+    with pytest.raises(ApiError) as e:
+        estate_single({"total_assets": 5000, "spouse": spouse})
+    assert e.value.status == 400
+    with pytest.raises(ApiError) as e:
+        estate_batch({"total_assets": [5000], "spouse": [spouse]})
+    assert e.value.status == 400
+
+def test_boolean_spouse_accepted():
+    single = estate_single({"total_assets": 5000, "spouse": True})
+    assert single["deductions"] == estate_single({"total_assets": 5000, "spouse": 1})["deductions"]
+    assert single["deductions"] > estate_single({"total_assets": 5000, "spouse": False})["deductions"]
+    batch = estate_batch({"total_assets": [5000, 5000], "spouse": [True, 0]})
+    assert batch["deductions"] == [single["deductions"], estate_single({"total_assets": 5000})["deductions"]]
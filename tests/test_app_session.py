@@ -0,0 +1,81 @@
+# tests/test_app_session.py — 單一登入：分頁（fragment）內的 rerun 也要經過守護，被後登入者取代即登出
+import functools, os, tempfile
+from pathlib import Path
+
+import bcrypt
+import pytest
+from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+from streamlit.testing.v1 import AppTest
+import streamlit.testing.v1.local_script_runner as local_script_runner
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+PASSWORD = "pw"
+
+@pytest.fixture(scope="module", autouse=True)
+def _data_dir():
+    tmp = tempfile.TemporaryDirectory()
+    old = os.environ.get("APP_DATA_DIR")
+    os.environ["APP_DATA_DIR"] = tmp.name
+    yield
+    if old is None:
+        os.environ.pop("APP_DATA_DIR", None)
+    else:
+        os.environ["APP_DATA_DIR"] = old
+    tmp.cleanup()
+
+def _login(username: str) -> AppTest:
+    pwd_hash = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(rounds=4)).decode()
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.secrets["users"] = {username: {"name": username, "pwd_hash": pwd_hash, "end_date": "2099-12-31"}}
+    at.run()
+    at.text_input[0].input(username)
+    at.text_input[1].input(PASSWORD)
+    next(b for b in at.button if b.label == "登入").click()
+    at.run()
+    assert at.session_state.auth.authenticated
+    return at
+
+def _run_fragments(at: AppTest):
+    """AppTest 只會整頁重跑；這裡改成只重跑已登記的 fragment（與瀏覽器中在分頁內操作 widget 相同）。"""
+    fragment_ids = list(at._fragment_storage._fragments)
+    assert fragment_ids, "APP_RENDER_MODE=fragment 應登記兩個分頁的 fragment"
+    original = local_script_runner.RerunData
+    local_script_runner.RerunData = functools.partial(RerunData, fragment_id_queue=fragment_ids,
+                                                      is_fragment_scoped_rerun=True)
+    try:
+        at.run()
+    finally:
+        local_script_runner.RerunData = original
+
+def test_fragment_rerun_keeps_valid_session():
+    at = _login("keep")
+    at.number_input(key="y1_prem").set_value(12_000_000)
+    _run_fragments(at)
+    assert not at.exception
+    assert at.session_state.auth.authenticated
+
+def test_fragment_rerun_logs_out_displaced_session():
+    first = _login("twice")
+    _login("twice")                              # 後登入者取代前者
+    first.number_input(key="y1_prem").set_value(12_000_000)
+    _run_fragments(first)
+    assert not first.exception
+    assert not first.session_state.auth.authenticated
+    assert any("其他裝置" in w.value for w in first.warning)
+
+def test_fragment_rerun_spans_recorded_under_session():
+    from modules import perf
+    was_enabled = perf.ENABLED
+    perf.configure(enabled=True)
+    try:
+        at = _login("spans")
+        perf.reset()
+        at.number_input(key="y1_prem").set_value(12_000_000)
+        _run_fragments(at)
+        sid = next(s for s in perf.session_ids() if s != "-")
+        sections = {r["section"] for r in perf.summary(sid)}
+        assert {"auth.guard", "tab.estate", "tab.gift"} <= sections
+        assert "-" not in perf.session_ids()
+    finally:
+        perf.configure(enabled=was_enabled)
+        perf.reset()
@@ -0,0 +1,25 @@
+# tests/test_auth.py — 使用者索引：signature 不變時不重新載入 users；bcrypt 驗證
+import bcrypt
+
+from modules import auth
+
+USERS = {"Alice": {"name": "王小明", "pwd_hash": bcrypt.hashpw(b"pw", bcrypt.gensalt(rounds=4)).decode()}}
+
+def test_index_reused_until_signature_changes():
+    calls = []
+    def load():
+        calls.append(1)
+        return dict(USERS)
+    first = auth.get_user_index(("secrets", 1), load)
+    assert auth.get_user_index(("secrets", 1), load) is first
+    assert len(calls) == 1
+    assert auth.get_user_index(("secrets", 2), load) is not first
+    assert len(calls) == 2
+
+def test_authenticate_by_key_or_name():
+    index = auth.UserIndex(USERS)
+    assert auth.authenticate(index, "alice", "pw")[:2] == (True, "Alice")
+    assert auth.authenticate(index, "王小明", "pw")[:2] == (True, "Alice")
+    ok, _, _, err = auth.authenticate(index, "alice", "wrong")
+    assert not ok and err == "帳密錯誤"
+    assert auth.verify_password("pw", "not-a-hash") is False
@@ -0,0 +1,15 @@
+# tests/test_bulk_calc.py — 批次 CLI：spouse 欄以文字表示是／否時的解讀
+import pandas as pd
+import pytest
+
+from bulk_calc import process_chunk
+
+def test_spouse_text_values_match_numeric():
+    text = pd.DataFrame({"total_assets": [8000] * 6, "spouse": ["True", "1", " yes ", "否", "", "FALSE"]})
+    numeric = pd.DataFrame({"total_assets": [8000] * 6, "spouse": [1, 1, 1, 0, 0, 0]})
+    assert process_chunk(text)["estate_tax"].tolist() == process_chunk(numeric)["estate_tax"].tolist()
+
+def test_spouse_unparseable_value_names_row():
+    df = pd.DataFrame({"total_assets": [8000, 8000], "spouse": ["1", "maybe"]}, index=[10, 11])
+    with pytest.raises(ValueError, match="第 12 筆"):
+        process_chunk(df)
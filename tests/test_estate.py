@@ -0,0 +1,30 @@
+# tests/test_estate.py — 遺產稅：批次版逐筆與純量版相同（級距邊界、各扣除額欄位）
+import numpy as np
+import pytest
+
+from modules.taxcore.estate import EstateTaxCalculator, TaxConstants
+
+CALC = EstateTaxCalculator(TaxConstants.from_rules())
+FAMILIES = [                                    # (配偶, 子女, 其他受扶養, 身心障礙, 父母)
+    (False, 0, 0, 0, 0), (True, 0, 0, 0, 0), (False, 3, 0, 0, 0), (False, 0, 2, 0, 0),
+    (False, 0, 0, 1, 0), (False, 0, 0, 0, 2), (True, 2, 1, 1, 2),
+]
+
+def _edge_totals(family):
+    """讓課稅遺產淨額落在 0 與各級距上限兩側的總資產。"""
+    base = CALC.constants.EXEMPT_AMOUNT + float(CALC.compute_deductions(*family))
+    edges = [0.0] + [u for u in CALC.brackets.uppers if np.isfinite(u)]
+    return [base + e + d for e in edges for d in (-1, -0.5, 0, 0.5, 1)] + [0.0, base * 10]
+
+@pytest.mark.parametrize("family", FAMILIES)
+def test_batch_matches_scalar(family):
+    totals = _edge_totals(family)
+    taxable, tax, deductions = CALC.calculate_estate_tax_batch(totals, *family)
+    for i, total in enumerate(totals):
+        assert (taxable[i], tax[i], deductions[i]) == CALC.calculate_estate_tax(total, *family)
+
+def test_batch_broadcasts_family_columns():
+    totals = np.array([_edge_totals(f)[7] for f in FAMILIES])
+    cols = [np.array(c) for c in zip(*FAMILIES)]
+    _, tax, _ = CALC.calculate_estate_tax_batch(totals, *cols)
+    assert list(tax) == [CALC.calculate_estate_tax(t, *f)[1] for t, f in zip(totals, FAMILIES)]
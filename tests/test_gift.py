@@ -0,0 +1,14 @@
+# tests/test_gift.py — 贈與稅：批次版逐筆與純量版相同（級距邊界）
+import pytest
+
+from modules.taxcore.gift import tax_calc, tax_calc_batch
+from modules.taxcore.rules import available_years, get_rules
+
+@pytest.mark.parametrize("year", available_years())
+def test_batch_matches_scalar(year):
+    rules = get_rules(year)
+    edges = [0] + [int(u) for u in rules.gift_brackets.uppers if u != float("inf")]
+    nets = [max(-1, e + d) for e in edges for d in (-1, 0, 1)] + [-5_000_000, 123_456_789]
+    tax, rate = tax_calc_batch(nets, rules)
+    for i, net in enumerate(nets):
+        assert (int(tax[i]), str(rate[i])) == tax_calc(net, rules)
@@ -0,0 +1,61 @@
+# tests/test_gift_plan.py — 多年度贈與排程 DP：小格點窮舉比對、比較基準不低於最佳解、大目標自動放大格點
+import itertools, random
+
+import pytest
+
+from modules.taxcore.gift import MAX_ANNUAL
+from modules.taxcore.gift_plan import MAX_GRID_UNITS, MAX_HORIZON, UNIT, _year_tax, optimize_gift_plan
+from modules.taxcore.rules import get_rules
+
+RULES = get_rules()
+BRUTE_UNIT = 1_000_000
+
+def _brute_cash(units: int, years: int, unit: int) -> int:
+    return min(sum(int(_year_tax(a * unit, RULES)) for a in combo)
+               for combo in itertools.product(range(units + 1), repeat=years) if sum(combo) == units)
+
+def _brute_policy(units: int, years: int, unit: int, premiums, cash_values) -> int:
+    best = _brute_cash(units, years, unit)
+    for n in range(1, min(len(premiums), years) + 1):
+        nominal, cv = sum(premiums[:n]), cash_values[n - 1]
+        rest = max(0, units - nominal // unit)
+        for g in range(rest + 1):
+            others = _brute_cash(rest - g, years - 1, unit) if years > 1 else (0 if rest == g else None)
+            if others is not None:
+                best = min(best, int(_year_tax(cv + g * unit, RULES)) + others)
+    return best
+
+@pytest.mark.parametrize("target,years", [(0, 2), (3_000_000, 2), (60_000_000, 3), (90_000_000, 4),
+                                          (75_500_000, 3), (120_000_000, 2)])
+def test_cash_dp_matches_brute_force(target, years):
+    plan = optimize_gift_plan(target, years, unit=BRUTE_UNIT)
+    units = -(-target // BRUTE_UNIT)
+    assert plan.total_tax == plan.cash_only_tax == _brute_cash(units, years, BRUTE_UNIT)
+    assert sum(y.cash_gift for y in plan.years) == units * BRUTE_UNIT
+    assert sum(y.tax for y in plan.years) == plan.total_tax
+
+@pytest.mark.parametrize("target,years", [(60_000_000, 3), (90_000_000, 3), (40_000_000, 2)])
+def test_policy_dp_matches_brute_force(target, years):
+    premiums = [20_000_000] * years
+    cash_values = [int(20_000_000 * y * 0.6) for y in range(1, years + 1)]
+    plan = optimize_gift_plan(target, years, premiums, cash_values, unit=BRUTE_UNIT)
+    units = -(-target // BRUTE_UNIT)
+    assert plan.total_tax == _brute_policy(units, years, BRUTE_UNIT, premiums, cash_values)
+    assert sum(y.tax for y in plan.years) == plan.total_tax
+
+def test_equal_split_never_beats_plan():
+    plan = optimize_gift_plan(100_000_000, 30)
+    assert plan.total_tax <= plan.equal_split_tax
+    rng = random.Random(7)
+    for _ in range(30):
+        target, years = rng.randrange(0, 500_000_000), rng.randint(1, MAX_HORIZON)
+        plan = optimize_gift_plan(target, years)
+        assert plan.total_tax <= plan.cash_only_tax <= plan.equal_split_tax
+
+def test_large_target_uses_coarser_grid():
+    target = MAX_ANNUAL * MAX_HORIZON
+    plan = optimize_gift_plan(target, MAX_HORIZON)
+    assert plan.unit > UNIT and plan.unit % UNIT == 0
+    assert -(-target // plan.unit) <= MAX_GRID_UNITS
+    assert plan.nominal_transfer >= target
+    assert plan.total_tax <= plan.equal_split_tax
@@ -0,0 +1,30 @@
+# tests/test_rules.py — 累進級距表：tax_batch／index 逐筆與純量版 tax／index 相同，且與逐級累加一致
+import numpy as np
+import pytest
+
+from modules.taxcore.rules import BracketTable, available_years, get_rules
+
+def _tables():
+    out = [BracketTable.from_pairs([(100, 0.1), (300, 0.2), (float("inf"), 0.3)])]
+    for year in available_years():
+        r = get_rules(year)
+        out += [r.estate_brackets, r.gift_brackets]
+    return out
+
+def _naive(table: BracketTable, amount: float) -> float:
+    tax, prev = 0.0, 0.0
+    for upper, rate in table.pairs():
+        if amount > prev:
+            tax += (min(amount, upper) - prev) * rate
+        prev = upper
+    return tax
+
+@pytest.mark.parametrize("table", _tables())
+def test_batch_matches_scalar(table):
+    edges = [0.0] + [u for u in table.uppers if np.isfinite(u)]
+    amounts = [e + d for e in edges for d in (-1, -0.5, 0, 0.5, 1)] + [edges[-1] * 3]
+    tax, idx = table.tax_batch(amounts)
+    for i, a in enumerate(amounts):
+        assert tax[i] == table.tax(a)
+        assert idx[i] == table.index(a)
+        assert table.tax(a) == pytest.approx(_naive(table, a))
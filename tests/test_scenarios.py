@@ -0,0 +1,28 @@
+# tests/test_scenarios.py — 五種情境：批次版（多位客戶）逐筆與純量版相同
+import numpy as np
+
+from modules.taxcore.estate import EstateTaxCalculator, TaxConstants
+from modules.taxcore.scenarios import SCENARIO_LABELS, estate_scenarios, estate_scenarios_batch
+
+CALC = EstateTaxCalculator(TaxConstants.from_rules())
+CLIENTS = [   # (總資產, 配偶, 子女, 其他受扶養, 身心障礙, 父母, 保費, 理賠金, 贈與)
+    (0, False, 0, 0, 0, 0, 0, 0, 0),
+    (3000, True, 2, 0, 0, 0, 500, 750, 244),
+    (8000, False, 3, 1, 1, 2, 2000, 3000, 1000),
+    (20000, True, 1, 0, 0, 1, 6000, 9000, 5865),
+    (2576, False, 1, 0, 0, 0, 100, 150, 0.5),
+]
+# 純遺產情境的課稅淨額落在級距上限兩側
+_BASE = CALC.constants.EXEMPT_AMOUNT + float(CALC.compute_deductions(True, 2, 0, 0, 0))
+CLIENTS += [(_BASE + u + d, True, 2, 0, 0, 0, 300, 450, 100)
+            for u in CALC.brackets.uppers if np.isfinite(u) for d in (-0.5, 0, 0.5)]
+
+def test_batch_matches_scalar():
+    cols = [np.array(c) for c in zip(*CLIENTS)]
+    taxes, nets = estate_scenarios_batch(CALC, *cols)
+    assert taxes.shape == nets.shape == (len(CLIENTS), len(SCENARIO_LABELS))
+    for i, client in enumerate(CLIENTS):
+        rows = estate_scenarios(CALC, *client)
+        assert [label for label, _, _ in rows] == list(SCENARIO_LABELS)
+        assert [t for _, t, _ in rows] == list(taxes[i])
+        assert [n for _, _, n in rows] == list(nets[i])
@@ -0,0 +1,36 @@
+# tests/test_solver.py — 最佳保費／贈與配置：整數（萬）格點上與窮舉結果相同
+import numpy as np
+import pytest
+
+from modules.taxcore.estate import EstateTaxCalculator, TaxConstants
+from modules.taxcore.solver import _family_total, optimize_allocation
+
+CALC = EstateTaxCalculator(TaxConstants.from_rules())
+
+def _brute(T, family, P, claim_ratio, claim_taxed):
+    best = (-np.inf, 0)
+    for p in range(int(P) + 1):
+        g = np.arange(int(T) - p + 1, dtype=float)
+        fam, _, _ = _family_total(CALC, family, T, np.full(len(g), float(p)), g, claim_ratio, claim_taxed, True)
+        fam = np.round(fam, 4)
+        j = int(np.argmax(fam))
+        best = max(best, (float(fam[j]), -(p + j)))
+    return best[0], -best[1]
+
+@pytest.mark.parametrize("T,spouse,children,P,claim_ratio,claim_taxed", [
+    (8000, False, 2, 0, 1.5, False),
+    (8000, False, 3, 0, 1.5, False),
+    (20000, True, 2, 40, 1.5, False),
+    (3000, True, 1, 3000, 1.5, False),
+    (2500, False, 1, 2500, 1.2, False),
+    (6000, True, 2, 60, 1.5, True),
+    (6000, False, 2, 60, 0.8, True),
+    (1500, False, 0, 1500, 1.5, True),
+])
+def test_matches_brute_force(T, spouse, children, P, claim_ratio, claim_taxed):
+    family = (spouse, children, 0, 0, 0)
+    res = optimize_allocation(CALC, T, *family, claim_ratio=claim_ratio, max_premium=P, claim_taxed=claim_taxed)
+    fam, spent = _brute(T, family, P, claim_ratio, claim_taxed)
+    assert round(res.family_total, 4) == fam
+    assert res.premium + res.gift == spent
+    assert res.premium == int(res.premium) and res.gift == int(res.gift)
@@ -0,0 +1,23 @@
+# tests/test_succession.py — 多代連續繼承：第一代的扣除額與主畫面的遺產稅試算一致
+import pytest
+
+from modules.taxcore.estate import EstateTaxCalculator, TaxConstants
+from modules.taxcore.succession import SuccessionPlanner, uniform_family
+
+CALC = EstateTaxCalculator(TaxConstants())
+
+@pytest.mark.parametrize("total, children, parents, disabled, other", [
+    (8000, 2, 0, 0, 0), (8000, 2, 1, 1, 0), (30000, 3, 2, 1, 2), (1500, 1, 0, 2, 1),
+])
+def test_single_generation_matches_estate_tax(total, children, parents, disabled, other):
+    # 無配偶、子女為末代：唯一一次課稅就是本人身故，不發生任何再移轉
+    root = uniform_family(total, None, children, parents=parents, disabled=disabled, other_dependents=other)
+    plan = SuccessionPlanner(CALC).plan(root)
+    _, tax, _ = CALC.calculate_estate_tax(total, False, children, other, disabled, parents)
+    assert plan.total_tax == pytest.approx(tax)
+
+def test_statutory_first_death_matches_estate_tax_with_spouse():
+    root = uniform_family(20000, 0, 2, parents=1, disabled=1, other_dependents=1)
+    plan = SuccessionPlanner(CALC, statutory=True).plan(root)
+    _, tax, _ = CALC.calculate_estate_tax(20000, True, 2, 1, 1, 1)
+    assert plan.steps[0].tax == pytest.approx(tax)
@@ -0,0 +1,26 @@
+# tests/test_wrapped_cvgift.py — 保單贈與分頁：開啟「最省稅的多年度贈與排程」後，首次與後續 rerun 皆可正常繪製
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = str(Path(__file__).resolve().parent.parent)
+
+def _render(root: str):
+    import sys
+    sys.path.insert(0, root)
+    from modules.wrapped_cvgift import run_cvgift
+    run_cvgift()
+
+def test_gift_plan_section_renders():
+    at = AppTest.from_function(_render, kwargs={"root": ROOT}, default_timeout=60)
+    at.run()
+    assert not at.exception
+
+    at.checkbox(key="show_gift_plan").check()
+    at.run()
+    assert not at.exception, at.exception[0].message
+    assert any("節省之贈與稅" in m.value for m in at.markdown)
+
+    at.number_input(key="plan_target").set_value(50_000_000)   # 後續 rerun 也不可失敗
+    at.run()
+    assert not at.exception, at.exception[0].message